@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Vérifie le mode API batch contre un serveur local imitant OpenAI et Anthropic.
+
+Le serveur expose les routes batch des deux fournisseurs (téléversement,
+création, suivi, résultats) et répond "Alice" à chaque requête ; chaque
+batch n'est terminé qu'au deuxième suivi. Pour chaque fournisseur, un run
+complet passe par `ModelEvaluator.evaluate_offline`, puis est relancé pour
+vérifier la reprise du suivi sans nouvelle soumission.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+from aiohttp import web
+
+from tree_evaluator.evaluation.model_evaluator import ModelEvaluator
+from tree_evaluator.evaluation.runner import run_benchmark_evaluation
+
+BENCHMARK = {"name": "batch_api_check", "people": 20, "depth": 3, "questions": 10, "seed": 1, "language": "en"}
+ANSWER = "Alice"
+
+
+class StandInBatchServer:
+    """Routes batch d'OpenAI (/openai/v1) et d'Anthropic (/anthropic/v1)."""
+
+    def __init__(self):
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.submitted = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/openai/v1/files", self.upload_file)
+        app.router.add_get("/openai/v1/files/{id}/content", self.file_content)
+        app.router.add_post("/openai/v1/batches", self.create_openai_batch)
+        app.router.add_get("/openai/v1/batches/{id}", self.openai_status)
+        app.router.add_post("/anthropic/v1/messages/batches", self.create_anthropic_batch)
+        app.router.add_get("/anthropic/v1/messages/batches/{id}", self.anthropic_status)
+        app.router.add_get("/anthropic/v1/messages/batches/{id}/results", self.anthropic_results)
+        return app
+
+    def _new_batch(self, requests: List[Dict[str, Any]]) -> str:
+        self.submitted += 1
+        batch_id = f"batch_{self.submitted}"
+        self.batches[batch_id] = {"requests": requests, "polls": 0}
+        return batch_id
+
+    def _poll(self, batch_id: str) -> bool:
+        """Compte un suivi ; le batch est terminé à partir du deuxième."""
+        batch = self.batches[batch_id]
+        batch["polls"] += 1
+        return batch["polls"] >= 2
+
+    async def upload_file(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        file_id = f"file_{len(self.files) + 1}"
+        self.files[file_id] = form["file"].file.read()
+        return web.json_response({"id": file_id, "purpose": form["purpose"]})
+
+    async def file_content(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.files[request.match_info["id"]], content_type="application/jsonl")
+
+    async def create_openai_batch(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        lines = self.files[data["input_file_id"]].decode("utf-8").splitlines()
+        batch_id = self._new_batch([json.loads(line) for line in lines if line.strip()])
+        return web.json_response({"id": batch_id, "status": "validating"})
+
+    async def openai_status(self, request: web.Request) -> web.Response:
+        batch_id = request.match_info["id"]
+        if not self._poll(batch_id):
+            return web.json_response({"id": batch_id, "status": "in_progress"})
+        output_id = f"output_{batch_id}"
+        self.files[output_id] = "".join(json.dumps({
+            "custom_id": line["custom_id"],
+            "response": {"status_code": 200, "body": {
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": ANSWER}}],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 2}
+            }}
+        }) + "\n" for line in self.batches[batch_id]["requests"]).encode("utf-8")
+        return web.json_response({"id": batch_id, "status": "completed", "output_file_id": output_id})
+
+    async def create_anthropic_batch(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        batch_id = self._new_batch(data["requests"])
+        return web.json_response({"id": batch_id, "processing_status": "in_progress"})
+
+    async def anthropic_status(self, request: web.Request) -> web.Response:
+        batch_id = request.match_info["id"]
+        status = "ended" if self._poll(batch_id) else "in_progress"
+        return web.json_response({"id": batch_id, "processing_status": status})
+
+    async def anthropic_results(self, request: web.Request) -> web.Response:
+        body = "".join(json.dumps({
+            "custom_id": line["custom_id"],
+            "result": {"type": "succeeded", "message": {
+                "content": [{"type": "text", "text": ANSWER}],
+                "usage": {"input_tokens": 100, "output_tokens": 2}
+            }}
+        }) + "\n" for line in self.batches[request.match_info["id"]]["requests"])
+        return web.Response(text=body, content_type="application/jsonl")
+
+
+async def check_provider(server: StandInBatchServer, provider: str, port: int, directory: str) -> List[str]:
+    """Évalue un run via le client batch du fournisseur ; retourne les anomalies."""
+    model = ModelEvaluator({
+        "name": f"stand-in-{provider}",
+        "model": "stand-in",
+        "api_base": f"http://127.0.0.1:{port}/{provider}/v1",
+        "api_key": "none",
+        "batch_api": {"poll_interval": 0.05, "max_wait": 30, "dir": directory}
+    })
+    problems = []
+    for attempt in ("submit", "resume"):
+        submitted = server.submitted
+        results = await run_benchmark_evaluation(model, BENCHMARK)
+        errors = [result.error for result in results if result.error]
+        if len(results) != BENCHMARK["questions"] or errors:
+            problems.append(f"{provider} ({attempt}): {len(results)} results, errors: {errors[:3]}")
+        if any(result.model_answer != ANSWER for result in results if not result.error):
+            problems.append(f"{provider} ({attempt}): unexpected answers")
+        expected_submissions = 1 if attempt == "submit" else 0
+        if server.submitted - submitted != expected_submissions:
+            problems.append(f"{provider} ({attempt}): {server.submitted - submitted} batch(es) submitted, expected {expected_submissions}")
+    return problems
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Vérifie les clients API batch contre un serveur local")
+    parser.add_argument("--port", type=int, default=8798, help="Port du serveur local")
+    args = parser.parse_args()
+
+    server = StandInBatchServer()
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+
+    problems = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for provider in ("openai", "anthropic"):
+                problems.extend(await check_provider(server, provider, args.port, directory))
+    finally:
+        await runner.cleanup()
+
+    for problem in problems:
+        print(f"ÉCHEC : {problem}")
+    if not problems:
+        print("API batch OpenAI et Anthropic : soumission, suivi, résultats et reprise OK")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -14,8 +14,15 @@ from typing import Dict, List
 import yaml
 from dotenv import load_dotenv
 
+from tree_evaluator.benchmark_package import find_packages
+from tree_evaluator.evaluation.batch_api import has_batch_api
+from tree_evaluator.evaluation.concurrency import ConcurrencyLimiter
+from tree_evaluator.evaluation.http_pool import HttpPool
 from tree_evaluator.evaluation.model_evaluator import ModelEvaluator
-from tree_evaluator.evaluation.runner import run_benchmark_evaluation
+from tree_evaluator.evaluation.rate_limiter import RateLimiterRegistry
+from tree_evaluator.evaluation.retry_policy import CircuitBreakerRegistry
+from tree_evaluator.evaluation.preparation import open_package
+from tree_evaluator.evaluation.scheduler import expand_jobs, run_jobs
 from tree_evaluator.evaluation.stats import calculate_summary_stats
 from tree_evaluator.evaluation.io import save_results_csv, save_results_json
 
@@ -42,6 +49,10 @@ async def main():
                       help="Liste des modèles à évaluer (override la config)")
     parser.add_argument("--benchmarks", type=str, nargs='+',
                       help="Liste des benchmarks à exécuter (override la config)")
+    parser.add_argument("--packages", type=str, nargs='+',
+                      help="Paquets de benchmarks pré-construits (.fbpk) ou dossiers de paquets (remplace les benchmarks de la config)")
+    parser.add_argument("--batch-api", action="store_true",
+                      help="Soumet les requêtes via l'API batch des fournisseurs (hors ligne, tarif réduit)")
     
     args = parser.parse_args()
     
@@ -62,44 +73,115 @@ async def main():
         models_to_eval = [m for m in config['models'] if m['name'] in args.models]
     
     benchmarks_to_run = config['benchmarks']
+    if args.packages:
+        benchmarks_to_run = [
+            {'name': open_package(path).name, 'package': str(path)}
+            for path in find_packages(args.packages)
+        ]
     if args.benchmarks:
-        benchmarks_to_run = [b for b in config['benchmarks'] if b['name'] in args.benchmarks]
+        benchmarks_to_run = [b for b in benchmarks_to_run if b['name'] in args.benchmarks]
+    
+    # Limites de concurrence partagées par tous les modèles
+    limiter = ConcurrencyLimiter.from_config(config['evaluation'].get('concurrency'))
+    # Limites de débit partagées par fournisseur et clé API
+    rate_limiters = RateLimiterRegistry()
+    circuit_breakers = CircuitBreakerRegistry()
+    
+    if args.batch_api:
+        # Seuls les fournisseurs dotés d'une API batch passent en mode hors ligne
+        batch_models = []
+        for model_config in models_to_eval:
+            if model_config.get('batch_api') or (not model_config.get('local') and has_batch_api(model_config.get('api_base', ''))):
+                model_config = {**model_config, 'batch_api': model_config.get('batch_api') or True}
+            else:
+                logger.warning(f"No batch API for {model_config['name']} ({model_config.get('api_base', 'local')}), evaluating it with regular requests")
+            batch_models.append(model_config)
+        models_to_eval = batch_models
+    
+    # Un job par modèle × benchmark × run, tous exécutés simultanément
+    models = [ModelEvaluator(model_config, limiter, rate_limiters, circuit_breakers) for model_config in models_to_eval]
+    runs = config['evaluation'].get('runs_per_benchmark', 1)
+    jobs = expand_jobs(models, benchmarks_to_run, runs)
+    print(f"\nÉvaluation de {len(models)} modèle(s) sur {len(benchmarks_to_run)} benchmark(s), {len(jobs)} run(s) au total")
+    
+    def report_job(job, results):
+        """Affiche les statistiques d'un run dès qu'il se termine."""
+        run_label = f" - run {job.run_index + 1}/{job.total_runs}" if job.total_runs > 1 else ""
+        stats = calculate_summary_stats(results)
+        if not stats:
+            print(f"\n  {job.model.name} / {job.benchmark['name']}{run_label}: aucun résultat")
+            return
+        print(f"\n  {job.model.name} / {job.benchmark['name']}{run_label}")
+        print(f"    Accuracy: {stats['accuracy']:.2%}")
+        print(f"    Avg response time: {stats['avg_response_time']:.2f}s")
+        if stats['avg_queue_time'] > 0:
+            print(f"    Avg queue wait: {stats['avg_queue_time']:.2f}s")
+    
+    # Une session HTTP par hôte de fournisseur pour toute l'évaluation
+    async with HttpPool.from_config(config['evaluation'].get('http')) as http_pool:
+        results_by_model = await run_jobs(
+            jobs,
+            config['evaluation'].get('timeout', 60),
+            config['evaluation'].get('batch_size', 1),
+            question_draws=config['evaluation'].get('question_draws', 'identical'),
+            max_concurrent_jobs=config['evaluation'].get('max_concurrent_jobs'),
+            prefetch=config['evaluation'].get('prefetch', 1),
+            http_pool=http_pool,
+            on_complete=report_job
+        )
+        pool_stats = http_pool.stats()
+    
+    for host, stats in pool_stats.items():
+        print(f"\n  Connexions HTTP {host}: {stats['requests']} requêtes, "
+              f"{stats['connections_created']} connexions ouvertes (moy. {stats['avg_connect_time'] * 1000:.0f} ms), "
+              f"{stats['connections_reused']} réutilisées ({stats['connection_reuse_rate']:.0%}), {stats['errors']} erreurs")
+    
+    # Répartition entre clés / points d'accès des modèles qui en ont plusieurs
+    endpoint_stats = {model.name: model.endpoints.stats() for model in models if len(model.endpoints.endpoints) > 1}
+    for model_name, model_endpoints in endpoint_stats.items():
+        print(f"\n  Points d'accès de {model_name}:")
+        for endpoint in model_endpoints:
+            print(f"    {endpoint['endpoint']}: {endpoint['requests']} requêtes, {endpoint['failures']} échecs, "
+                  f"latence moy. {endpoint['avg_latency']:.2f}s")
+    
+    # Requêtes doublées (hedging), comptées à part des requêtes d'origine
+    hedging_stats = {model.name: model.hedger.stats() for model in models if model.hedger}
+    for model_name, model_hedging in hedging_stats.items():
+        print(f"\n  Hedging de {model_name}: {model_hedging['hedged_requests']} doublons pour {model_hedging['requests']} requêtes "
+              f"({model_hedging['hedge_rate']:.1%}), {model_hedging['hedge_wins']} arrivés en premier, "
+              f"budget atteint {model_hedging['budget_denied']} fois")
+    
+    # Modèles locaux : taille moyenne des lots formés par le batching dynamique
+    local_stats = {model.name: model.local.stats() for model in models if model.local}
+    for model_name, model_local in local_stats.items():
+        print(f"\n  Modèle local {model_name}: {model_local['requests']} requêtes en {model_local['batches']} lots "
+              f"(moy. {model_local['avg_batch_size']:.1f}), préfixe tokenisé réutilisé {model_local['prefix_hits']} fois")
+    
+    # Complétions multiples par appel partagées entre les runs
+    sampling_stats = {model.name: model.sampler.stats() for model in models if model.sampler}
+    for model_name, model_sampling in sampling_stats.items():
+        fallback = "" if model_sampling['n_supported'] else ", n non supporté : requêtes séparées"
+        print(f"\n  Échantillons de {model_name}: {model_sampling['multi_sample_requests']} requêtes à n={model_sampling['samples_per_request']}, "
+              f"{model_sampling['shared_completions']} complétions reprises par d'autres runs{fallback}")
+    
+    # Timeouts adaptatifs retenus par type de question (pour vérifier le réglage)
+    timeout_stats = {model.name: model.timeouts.stats() for model in models if model.timeouts}
+    for model_name, model_timeouts in timeout_stats.items():
+        print(f"\n  Timeouts adaptatifs de {model_name}:")
+        for kind, kind_stats in model_timeouts.items():
+            current = f"{kind_stats['timeout']:.1f}s" if kind_stats['timeout'] is not None else "timeout global"
+            print(f"    {kind}: {current} ({kind_stats['samples']} mesures{', par question' if kind == 'batch' else ''})")
     
     # Résultats globaux
     all_results = []
     summary_stats = {}
     
-    # Évaluer chaque modèle
     for model_config in models_to_eval:
-        print(f"\nÉvaluation du modèle: {model_config['name']}")
-        model = ModelEvaluator(model_config)
-        model_results = []
-        
-        # Exécuter chaque benchmark
-        for benchmark in benchmarks_to_run:
-            print(f"\n  Benchmark: {benchmark['name']}")
-            
-            # Exécuter plusieurs fois si configuré
-            runs = config['evaluation'].get('runs_per_benchmark', 1)
-            for run in range(runs):
-                if runs > 1:
-                    print(f"    Run {run + 1}/{runs}")
-                
-                results = await run_benchmark_evaluation(
-                    model, 
-                    benchmark,
-                    config['evaluation'].get('timeout', 60),
-                    config['evaluation'].get('batch_size', 1)
-                )
-                
-                model_results.extend(results)
-                
-                # Statistiques pour ce run
-                stats = calculate_summary_stats(results)
-                print(f"    Accuracy: {stats['accuracy']:.2%}")
-                print(f"    Avg response time: {stats['avg_response_time']:.2f}s")
-        
+        model_results = results_by_model.get(model_config['name'], [])
         all_results.extend(model_results)
+        if not model_results:
+            print(f"\n  Aucun résultat pour {model_config['name']}")
+            continue
         
         # Statistiques par modèle
         model_stats = calculate_summary_stats(model_results)
@@ -111,9 +193,17 @@ async def main():
         print(f"    Exact match rate: {model_stats['exact_match_rate']:.2%}")
         print(f"    Non-réponses: {model_stats['no_responses']} ({model_stats['no_response_rate']:.2%})")
         print(f"    Temps moyen: {model_stats['avg_response_time']:.2f}s")
+        if model_stats['avg_queue_time'] > 0:
+            print(f"    Attente moyenne en file: {model_stats['avg_queue_time']:.2f}s")
         print(f"    Tokens utilisés: {model_stats['total_tokens']}")
         if model_stats['total_reasoning_tokens'] > 0:
             print(f"    Reasoning tokens: {model_stats['total_reasoning_tokens']} (avg: {model_stats['avg_reasoning_tokens']:.0f})")
+        if model_stats['total_cached_tokens'] > 0:
+            print(f"    Tokens en cache: {model_stats['total_cached_tokens']}/{model_stats['total_prompt_tokens']} ({model_stats['cache_hit_rate']:.2%})")
+        if model_stats['avg_time_to_first_token'] > 0:
+            print(f"    Premier token: {model_stats['avg_time_to_first_token']:.2f}s, "
+                  f"premier token de réponse: {model_stats['avg_time_to_first_answer_token']:.2f}s, "
+                  f"{model_stats['avg_tokens_per_second']:.1f} tokens/s")
         
         # Statistiques des énigmes
         if 'enigma_stats' in model_stats and model_stats['enigma_stats']:
@@ -152,7 +242,13 @@ async def main():
             'config': args.config,
             'models_evaluated': [m['name'] for m in models_to_eval],
             'benchmarks_run': [b['name'] for b in benchmarks_to_run],
-            'summary_stats': summary_stats
+            'summary_stats': summary_stats,
+            'http_pool_stats': pool_stats,
+            'endpoint_stats': endpoint_stats,
+            'hedging_stats': hedging_stats,
+            'sampling_stats': sampling_stats,
+            'local_stats': local_stats,
+            'timeout_stats': timeout_stats
         }, f, ensure_ascii=False, indent=2)
     print(f"  Résumé: {summary_path}")
     
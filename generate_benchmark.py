@@ -6,11 +6,18 @@
 import argparse
 import json
 import datetime
+import random
+from pathlib import Path
 from typing import Dict, List, Any
 
+import yaml
+
 from tree_evaluator.tree_generator import generate_tree
-from tree_evaluator.text_converter import convert_tree_to_text
+from tree_evaluator.text_converter import convert_tree_to_text, generate_shuffled_descriptions
 from tree_evaluator.question_generator import generate_questions
+from tree_evaluator.benchmark_package import PACKAGE_SUFFIX, write_package
+from tree_evaluator.evaluation.preparation import prepare_benchmark
+from tree_evaluator.tree_store import load_tree, save_tree, random_state_from_json, random_state_to_json
 
 def generate_markdown_output(description: str, questions: List[Dict[str, Any]], language: str = "fr") -> str:
     """Génère le contenu du fichier Markdown pour le LLM."""
@@ -79,6 +86,26 @@ def generate_markdown_output(description: str, questions: List[Dict[str, Any]],
         
     return "\n\n".join(md_parts)
 
+def generate_packages_from_config(config_path: str, package_dir: str):
+    """Construit un paquet (shard) par benchmark d'un fichier de configuration d'évaluation."""
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+
+    output_dir = Path(package_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for benchmark_config in config["benchmarks"]:
+        print(f"Préparation du benchmark {benchmark_config['name']}...")
+        prepared = prepare_benchmark(benchmark_config)
+        metadata = {key: value for key, value in benchmark_config.items() if key not in ("name", "package")}
+        metadata.update({
+            "language": prepared.language,
+            "generation_timestamp": datetime.datetime.now().isoformat(),
+        })
+        package_path = output_dir / f"{benchmark_config['name']}{PACKAGE_SUFFIX}"
+        content_hash = write_package(package_path, prepared.name, prepared.tree_description, prepared.questions, metadata)
+        print(f"  {package_path} ({len(prepared.questions)} questions, sha256 {content_hash[:12]})")
+
 def main():
     """Point d'entrée principal."""
     parser = argparse.ArgumentParser(description="Génère un benchmark d'évaluation LLM basé sur un arbre généalogique.")
@@ -90,25 +117,69 @@ def main():
     parser.add_argument("--seed", type=int, help="Graine pour la reproductibilité.")
     parser.add_argument("--max-children", type=int, default=3, help="Nombre maximum d'enfants par personne.")
     parser.add_argument("--shuffle", action="store_true", help="Mélanger l'ordre des personnes dans la description.")
+    parser.add_argument("--shuffle-variants", type=int, default=0, help="Nombre de descriptions mélangées supplémentaires à générer (sensibilité à l'ordre).")
+    parser.add_argument("--variant-seed", type=int, default=0, help="Graine de la première variante mélangée (les suivantes utilisent graine+1, graine+2, ...).")
     parser.add_argument("--root-couples", type=int, default=1, help="Nombre de couples racines (plusieurs arbres).")
     parser.add_argument("--language", type=str, default="fr", choices=["fr", "en"], help="Langue du benchmark (fr ou en).")
+    parser.add_argument("--tree-input", type=str, help="Arbre sauvegardé à réutiliser au lieu d'en générer un nouveau.")
+    parser.add_argument("--tree-output", type=str, help="Fichier de sortie optionnel pour l'arbre (format binaire compact).")
+    parser.add_argument("--package-output", type=str, help="Fichier de sortie optionnel au format paquet (.fbpk) lu par evaluate.py.")
+    parser.add_argument("--from-config", type=str, help="Construit un paquet par benchmark de ce fichier de configuration d'évaluation.")
+    parser.add_argument("--package-dir", type=str, default="benchmark_packages", help="Dossier de sortie des paquets avec --from-config.")
     parser.add_argument("--enigma-percentage", type=int, default=10, help="Pourcentage de questions énigmes (défaut: 10%%)")
 
     args = parser.parse_args()
 
-    print(f"Génération de l'arbre avec {args.people} personnes, profondeur {args.depth}, {args.root_couples} couple(s) racine(s), langue: {args.language}...")
-    tree = generate_tree(
-        total_people=args.people,
-        max_depth=args.depth,
-        max_children_per_person=args.max_children,
-        seed=args.seed,
-        num_root_couples=args.root_couples,
-        language=args.language
-    )
+    if args.from_config:
+        generate_packages_from_config(args.from_config, args.package_dir)
+        print("Terminé !")
+        return
+
+    if args.tree_input:
+        print(f"Chargement de l'arbre depuis {args.tree_input}...")
+        tree, tree_metadata = load_tree(args.tree_input)
+        args.language = tree_metadata.get("language", args.language)
+        # Restaurer l'état aléatoire d'après génération pour retrouver les mêmes tirages
+        if args.seed is not None:
+            random.seed(args.seed)
+        elif "random_state" in tree_metadata:
+            random.setstate(random_state_from_json(tree_metadata["random_state"]))
+    else:
+        print(f"Génération de l'arbre avec {args.people} personnes, profondeur {args.depth}, {args.root_couples} couple(s) racine(s), langue: {args.language}...")
+        tree = generate_tree(
+            total_people=args.people,
+            max_depth=args.depth,
+            max_children_per_person=args.max_children,
+            seed=args.seed,
+            num_root_couples=args.root_couples,
+            language=args.language
+        )
+        tree_metadata = {
+            "total_people": args.people,
+            "tree_depth": args.depth,
+            "max_children_per_person": args.max_children,
+            "root_couples": args.root_couples,
+            "seed": args.seed,
+            "language": args.language,
+            "random_state": random_state_to_json(random.getstate()),
+        }
+
+    if args.tree_output:
+        print(f"Sauvegarde de l'arbre dans {args.tree_output}...")
+        save_tree(tree, args.tree_output, tree_metadata)
 
     print("Conversion de l'arbre en texte...")
     description = convert_tree_to_text(tree, shuffle=args.shuffle, language=args.language)
 
+    description_variants = []
+    if args.shuffle_variants > 0:
+        print(f"Génération de {args.shuffle_variants} variantes mélangées de la description...")
+        variants = generate_shuffled_descriptions(tree, args.shuffle_variants, language=args.language, base_seed=args.variant_seed)
+        description_variants = [
+            {"seed": args.variant_seed + i, "tree_description": variant}
+            for i, variant in enumerate(variants)
+        ]
+
     print(f"Génération de {args.questions} questions (dont {args.enigma_percentage}% d'énigmes)...")
     questions = generate_questions(tree, args.questions, language=args.language, enigma_percentage=args.enigma_percentage)
 
@@ -121,12 +192,10 @@ def main():
         "tree_description": description,
         "prompt_template": prompt_template,
         "questions": questions,
+        "description_variants": description_variants,
+        # Paramètres de l'arbre réellement utilisé (généré ou rechargé), sans l'état aléatoire
         "metadata": {
-            "total_people": args.people,
-            "tree_depth": args.depth,
-            "max_children_per_person": args.max_children,
-            "seed": args.seed,
-            "language": args.language,
+            **{key: value for key, value in tree_metadata.items() if key != "random_state"},
             "generation_timestamp": datetime.datetime.now().isoformat(),
         }
     }
@@ -135,6 +204,10 @@ def main():
     with open(args.output, "w", encoding="utf-8") as f:
         json.dump(benchmark, f, ensure_ascii=False, indent=4)
 
+    if args.package_output:
+        print(f"Sauvegarde du paquet dans {args.package_output}...")
+        write_package(args.package_output, Path(args.package_output).stem, description, questions, benchmark["metadata"])
+
     if args.md_output:
         print(f"Génération du fichier Markdown dans {args.md_output}...")
         markdown_content = generate_markdown_output(description, questions, language=args.language)
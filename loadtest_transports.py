@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compare les transports HTTP (aiohttp, httpx/HTTP2) sous forte concurrence.
+
+Sans `--url`, un serveur local imitant `/v1/chat/completions` est démarré :
+avec hypercorn installé il accepte HTTP/1.1 et HTTP/2 en clair (h2c), sinon
+seul HTTP/1.1 est disponible (serveur aiohttp).
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import statistics
+import time
+from typing import Dict, List
+
+from tree_evaluator.evaluation.http_pool import HttpPool
+from tree_evaluator.evaluation.transport import TRANSPORTS, AiohttpTransport, HttpxTransport, Transport, TransportError
+
+RESPONSE = json.dumps({
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "Alice"}}],
+    "usage": {"prompt_tokens": 5000, "completion_tokens": 2}
+}).encode("utf-8")
+
+
+async def _asgi_app(scope, receive, send, delay: float):
+    """Application ASGI minimale répondant comme une API de chat."""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    more_body = True
+    while more_body:
+        message = await receive()
+        more_body = message.get("more_body", False)
+    await asyncio.sleep(delay)
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": RESPONSE})
+
+
+async def _serve(port: int, delay: float):
+    """Sert l'API locale jusqu'à l'arrêt du processus."""
+    try:
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+    except ImportError:
+        from aiohttp import web
+
+        async def chat(request):
+            await request.read()
+            await asyncio.sleep(delay)
+            return web.Response(body=RESPONSE, content_type="application/json")
+
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", chat)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        await asyncio.Event().wait()
+        return
+
+    async def app(scope, receive, send):
+        await _asgi_app(scope, receive, send, delay)
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.accesslog = None
+    config.errorlog = None
+    config.h2_max_concurrent_streams = 1000
+    config.keep_alive_max_requests = 10 ** 9
+    await serve(app, config)
+
+
+def _run_server(port: int, delay: float):
+    asyncio.run(_serve(port, delay))
+
+
+async def start_local_server(port: int, delay: float):
+    """Démarre le serveur local dans un processus séparé (pour ne pas fausser les mesures).
+
+    Returns:
+        Le processus du serveur et un booléen indiquant le support de h2c.
+    """
+    try:
+        import hypercorn  # noqa: F401
+        h2c = True
+    except ImportError:
+        h2c = False
+
+    process = multiprocessing.Process(target=_run_server, args=(port, delay), daemon=True)
+    process.start()
+    for _ in range(100):
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return process, h2c
+        except OSError:
+            await asyncio.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Le serveur local n'a pas démarré sur le port {port}")
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_load(transport: Transport, url: str, body: bytes, requests: int, concurrency: int, timeout: float) -> Dict[str, float]:
+    """Envoie `requests` requêtes avec au plus `concurrency` en vol ; mesure les latences."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    versions = set()
+    headers = {"Content-Type": "application/json"}
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await transport.post(url, body, headers, timeout)
+            except (asyncio.TimeoutError, TransportError):
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            versions.add(response.http_version)
+            if response.status != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": _percentile(latencies, 0.50) if latencies else 0.0,
+        "p99": _percentile(latencies, 0.99) if latencies else 0.0,
+        "mean": statistics.mean(latencies) if latencies else 0.0,
+        "errors": errors,
+        "versions": ",".join(sorted(versions)),
+    }
+
+
+def _connections(stats: Dict[str, Dict[str, float]]) -> int:
+    return int(sum(host_stats.get("connections_created", 0) for host_stats in stats.values()))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare le débit et la latence p99 des transports HTTP")
+    parser.add_argument("--url", type=str, help="URL chat/completions à tester (par défaut : serveur local)")
+    parser.add_argument("--port", type=int, default=8799, help="Port du serveur local")
+    parser.add_argument("--delay", type=float, default=0.05, help="Latence simulée du serveur local (secondes)")
+    parser.add_argument("--requests", type=int, default=2000, help="Nombre de requêtes par transport")
+    parser.add_argument("--concurrency", type=int, default=200, help="Requêtes simultanées")
+    parser.add_argument("--max-connections", type=int, default=100, help="Connexions maximales par hôte")
+    parser.add_argument("--body-size", type=int, default=20000, help="Taille du prompt envoyé (octets)")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout par requête (secondes)")
+    parser.add_argument("--transports", type=str, nargs="+", default=list(TRANSPORTS), choices=TRANSPORTS)
+
+    args = parser.parse_args()
+
+    server = None
+    h2c = False
+    url = args.url
+    if not url:
+        server, h2c = await start_local_server(args.port, args.delay)
+        url = f"http://127.0.0.1:{args.port}/v1/chat/completions"
+        print(f"Serveur local : {url} ({'HTTP/1.1 + h2c' if h2c else 'HTTP/1.1 seulement'}, délai {args.delay}s)")
+
+    body = json.dumps({
+        "model": "load-test",
+        "messages": [{"role": "user", "content": "x" * args.body_size}],
+        "max_tokens": 10
+    }).encode("utf-8")
+
+    print(f"{args.requests} requêtes, concurrence {args.concurrency}, {args.max_connections} connexions max par hôte\n")
+    print(f"{'Transport':<10} {'Version':<10} {'Req/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Connexions':>11} {'Erreurs':>8}")
+
+    try:
+        for name in args.transports:
+            pool = HttpPool(max_connections_per_host=args.max_connections)
+            if name == "httpx":
+                # En clair, HTTP/2 n'est utilisé qu'avec prior knowledge (h2c)
+                transport = HttpxTransport(max_connections=args.max_connections, http2_prior_knowledge=h2c)
+            else:
+                transport = AiohttpTransport(pool)
+
+            # Échauffement : connexions ouvertes avant la mesure
+            await run_load(transport, url, body, min(args.concurrency, args.requests), args.concurrency, args.timeout)
+            result = await run_load(transport, url, body, args.requests, args.concurrency, args.timeout)
+            stats = transport.stats() if name == "httpx" else pool.stats()
+
+            print(f"{name:<10} {result['versions']:<10} {result['throughput']:>8.0f} "
+                  f"{result['p50'] * 1000:>9.1f} {result['p99'] * 1000:>9.1f} "
+                  f"{_connections(stats):>11} {result['errors']:>8}")
+
+            await transport.close()
+            await pool.close()
+    finally:
+        if server:
+            server.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
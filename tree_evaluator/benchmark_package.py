@@ -0,0 +1,183 @@
+"""Format de paquet de benchmark pré-construit, lisible via `mmap`.
+
+Un paquet contient un seul benchmark (un « shard ») :
+
+    en-tête      : struct fixe de 64 octets (magic `FBPK`, version, offsets)
+    métadonnées  : JSON UTF-8 (nom, langue, empreinte du contenu, paramètres...)
+    description  : description de l'arbre, blob UTF-8 contigu
+    index        : (n + 1) offsets uint64 des questions dans le blob suivant
+    questions    : enregistrements JSON compacts, un par question
+
+Le fichier est ouvert en lecture seule via `mmap` : plusieurs processus
+d'évaluation partagent les mêmes pages, et seules les parties lues
+(description, questions demandées) sont décodées.
+"""
+
+import hashlib
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+MAGIC = b"FBPK"
+FORMAT_VERSION = 1
+PACKAGE_SUFFIX = ".fbpk"
+
+# magic, version, réservé, puis offset/taille des métadonnées, offset/taille de la
+# description, offset de l'index, nombre de questions, offset des questions
+_HEADER = struct.Struct("<4sHHQQQQQQQ")
+_OFFSET = struct.Struct("<Q")
+
+
+def _content_hash(description_bytes: bytes, question_blob: bytes) -> str:
+    digest = hashlib.sha256()
+    digest.update(description_bytes)
+    digest.update(question_blob)
+    return digest.hexdigest()
+
+
+def write_package(path: Union[str, Path],
+                  name: str,
+                  tree_description: str,
+                  questions: List[Dict[str, Any]],
+                  metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Écrit un paquet de benchmark et retourne l'empreinte SHA-256 de son contenu."""
+    description_bytes = tree_description.encode("utf-8")
+
+    records = [json.dumps(q, ensure_ascii=False, separators=(",", ":")).encode("utf-8") for q in questions]
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+    question_blob = b"".join(records)
+    index_bytes = b"".join(_OFFSET.pack(offset) for offset in offsets)
+
+    content_hash = _content_hash(description_bytes, question_blob)
+    package_metadata = dict(metadata or {})
+    package_metadata.update({
+        "name": name,
+        "question_count": len(questions),
+        "content_hash": content_hash,
+    })
+    metadata_bytes = json.dumps(package_metadata, ensure_ascii=False).encode("utf-8")
+
+    metadata_offset = _HEADER.size
+    description_offset = metadata_offset + len(metadata_bytes)
+    index_offset = description_offset + len(description_bytes)
+    questions_offset = index_offset + len(index_bytes)
+
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0,
+        metadata_offset, len(metadata_bytes),
+        description_offset, len(description_bytes),
+        index_offset, len(questions), questions_offset
+    )
+
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(metadata_bytes)
+        f.write(description_bytes)
+        f.write(index_bytes)
+        f.write(question_blob)
+
+    return content_hash
+
+
+class BenchmarkPackage:
+    """Paquet de benchmark ouvert en lecture seule via `mmap`."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._description: Optional[str] = None
+
+        (magic, version, _reserved,
+         metadata_offset, metadata_length,
+         self._description_offset, self._description_length,
+         self._index_offset, self._question_count, self._questions_offset) = _HEADER.unpack_from(self._map, 0)
+
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} n'est pas un paquet de benchmark (signature inconnue).")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Version de paquet non supportée : {version} (attendue : {FORMAT_VERSION}).")
+
+        self.metadata: Dict[str, Any] = json.loads(
+            self._map[metadata_offset:metadata_offset + metadata_length].decode("utf-8")
+        )
+
+    @property
+    def name(self) -> str:
+        return self.metadata["name"]
+
+    @property
+    def language(self) -> str:
+        return self.metadata.get("language", "fr")
+
+    @property
+    def content_hash(self) -> str:
+        return self.metadata["content_hash"]
+
+    @property
+    def tree_description(self) -> str:
+        """Description de l'arbre, décodée au premier accès."""
+        if self._description is None:
+            start = self._description_offset
+            self._description = self._map[start:start + self._description_length].decode("utf-8")
+        return self._description
+
+    def __len__(self) -> int:
+        return self._question_count
+
+    def _question_bounds(self, index: int):
+        position = self._index_offset + index * _OFFSET.size
+        (start,) = _OFFSET.unpack_from(self._map, position)
+        (end,) = _OFFSET.unpack_from(self._map, position + _OFFSET.size)
+        return self._questions_offset + start, self._questions_offset + end
+
+    def question(self, index: int) -> Dict[str, Any]:
+        """Décode uniquement la question d'indice `index`."""
+        if not 0 <= index < self._question_count:
+            raise IndexError(f"Question {index} hors limites ({self._question_count} questions).")
+        start, end = self._question_bounds(index)
+        return json.loads(self._map[start:end].decode("utf-8"))
+
+    def iter_questions(self) -> Iterator[Dict[str, Any]]:
+        for index in range(self._question_count):
+            yield self.question(index)
+
+    @property
+    def questions(self) -> List[Dict[str, Any]]:
+        return list(self.iter_questions())
+
+    def verify(self) -> bool:
+        """Recalcule l'empreinte du contenu et la compare aux métadonnées."""
+        questions_end = self._question_bounds(self._question_count - 1)[1] if self._question_count else self._questions_offset
+        question_blob = self._map[self._questions_offset:questions_end]
+        description_end = self._description_offset + self._description_length
+        description_bytes = self._map[self._description_offset:description_end]
+        return _content_hash(description_bytes, question_blob) == self.content_hash
+
+    def close(self):
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "BenchmarkPackage":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def find_packages(paths: List[Union[str, Path]]) -> List[Path]:
+    """Liste les shards désignés par des fichiers ou des dossiers de paquets."""
+    found = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            found.extend(sorted(path.glob(f"*{PACKAGE_SUFFIX}")))
+        else:
+            found.append(path)
+    return found
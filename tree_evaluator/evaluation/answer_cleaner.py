@@ -1,10 +1,14 @@
 """Module pour nettoyer et normaliser les réponses des modèles."""
 
+import json
 import re
 import logging
+from typing import Any, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+_WHITESPACE = re.compile(r'\s*')
+
 
 class AnswerCleaner:
     """Nettoie et normalise les réponses des modèles."""
@@ -222,4 +226,82 @@ class AnswerCleaner:
             return len(intersection) / len(union)
         
         # Pour les réponses simples
-        return 1.0 if model_answer.lower() == expected_answer.lower() else 0.0
\ No newline at end of file
+        return 1.0 if model_answer.lower() == expected_answer.lower() else 0.0
+    
+    @staticmethod
+    def parse_batch_answers(response: str, count: int) -> List[Optional[str]]:
+        """Extrait les réponses d'un batch, alignées sur les questions.
+        
+        Accepte un tableau JSON, éventuellement entouré de texte, ou l'objet
+        `{"answers": [...]}` produit en sortie structurée. Une réponse absente
+        ou illisible vaut None. Un tableau tronqué conserve ses premiers
+        éléments complets ; un tableau complet de mauvaise longueur est écarté,
+        rien ne permettant d'aligner ses éléments sur les questions.
+        """
+        answers, complete = None, False
+        try:
+            parsed = json.loads(response)
+            if isinstance(parsed, dict):
+                parsed = parsed.get('answers')
+            if isinstance(parsed, list):
+                answers, complete = parsed, True
+        except (TypeError, ValueError):
+            pass
+        
+        if answers is None:
+            answers, complete = AnswerCleaner._find_json_array(response or "", count)
+        
+        if complete and len(answers) != count:
+            logger.debug(f"Batch response has {len(answers)} answers for {count} questions, discarding")
+            answers = []
+        
+        aligned: List[Optional[str]] = []
+        for answer in answers[:count]:
+            if isinstance(answer, list) and all(isinstance(a, str) for a in answer):
+                # Liste de noms rendue en tableau plutôt qu'en chaîne
+                aligned.append(','.join(answer))
+            elif isinstance(answer, (str, int, float)) and not isinstance(answer, bool):
+                aligned.append(str(answer))
+            else:
+                aligned.append(None)
+        return aligned + [None] * (count - len(aligned))
+    
+    @staticmethod
+    def _find_json_array(text: str, count: int) -> Tuple[List[Any], bool]:
+        """Cherche dans le texte le tableau JSON des réponses.
+        
+        Returns:
+            Les éléments du premier tableau complet de `count` éléments, sinon
+            le plus long début de tableau lisible (réponse tronquée ou mal
+            formée), et un booléen indiquant si le tableau est complet.
+        """
+        best: List[Any] = []
+        for match in re.finditer(r'\[', text):
+            items, complete = AnswerCleaner._read_json_array(text, match.start())
+            if complete and len(items) == count:
+                return items, True
+            if not complete and len(items) > len(best):
+                best = items
+        return best, False
+    
+    @staticmethod
+    def _read_json_array(text: str, start: int) -> Tuple[List[Any], bool]:
+        """Lit élément par élément le tableau JSON commençant à `start`."""
+        decoder = json.JSONDecoder()
+        items: List[Any] = []
+        position = start + 1
+        while True:
+            position = _WHITESPACE.match(text, position).end()
+            if position >= len(text):
+                return items, False
+            if text[position] == ']':
+                return items, True
+            if items:
+                if text[position] != ',':
+                    return items, False
+                position = _WHITESPACE.match(text, position + 1).end()
+            try:
+                value, position = decoder.raw_decode(text, position)
+            except ValueError:
+                return items, False
+            items.append(value)
@@ -0,0 +1,231 @@
+"""Soumission hors ligne via les API batch des fournisseurs.
+
+Toutes les requêtes d'un run sont écrites dans un fichier JSONL (un corps de
+requête par ligne, identifié par `custom_id`), soumises en une fois puis
+suivies jusqu'à la fin du traitement :
+
+    OpenAI    : POST /files, POST /batches, GET /batches/{id}, GET /files/{id}/content
+    Anthropic : POST /messages/batches, GET /messages/batches/{id}, GET results_url
+
+Les URL sont construites à partir de `api_base` : un serveur local qui imite
+ces routes suffit pour tester le mode sans fournisseur réel. L'identifiant du
+batch soumis est enregistré à côté du fichier : relancer le même run reprend
+le suivi au lieu de soumettre à nouveau.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Par custom_id : corps de la réponse (format chat/messages habituel) ou message d'erreur
+BatchResults = Dict[str, Tuple[Optional[Dict[str, Any]], Optional[str]]]
+
+
+def has_batch_api(api_base: str) -> bool:
+    """Indique si le fournisseur de `api_base` propose une API batch (OpenAI, Anthropic)."""
+    return "api.openai.com" in api_base or "anthropic" in api_base
+
+
+class ProviderBatchClient(ABC):
+    """Cycle de vie d'un batch fournisseur : soumission, suivi, lecture des résultats."""
+
+    def __init__(self,
+                 api_base: str,
+                 headers: Dict[str, str],
+                 poll_interval: float = 30.0,
+                 completion_window: str = "24h",
+                 max_wait: Optional[float] = None):
+        self.api_base = api_base.rstrip('/')
+        # Le Content-Type est fixé requête par requête (JSON ou multipart)
+        self.headers = {key: value for key, value in headers.items() if key.lower() != 'content-type'}
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self.max_wait = max_wait
+
+    @abstractmethod
+    def request_line(self, custom_id: str, body: bytes) -> bytes:
+        """Encode une ligne du fichier de batch autour d'un corps déjà encodé."""
+
+    @abstractmethod
+    async def submit(self, session: aiohttp.ClientSession, lines: List[bytes]) -> str:
+        """Soumet les requêtes et retourne l'identifiant du batch."""
+
+    @abstractmethod
+    def is_finished(self, status: Dict[str, Any]) -> bool:
+        """Indique si le statut du batch est terminal."""
+
+    @abstractmethod
+    async def fetch_results(self, session: aiohttp.ClientSession, status: Dict[str, Any]) -> BatchResults:
+        """Lit les résultats d'un batch terminé, par `custom_id`."""
+
+    @abstractmethod
+    def status_url(self, batch_id: str) -> str:
+        """URL de suivi du batch."""
+
+    async def _request(self, session: aiohttp.ClientSession, method: str, url: str, **kwargs) -> str:
+        async with session.request(method, url, headers={**self.headers, **kwargs.pop('headers', {})}, **kwargs) as response:
+            text = await response.text()
+            if response.status >= 300:
+                raise RuntimeError(f"Batch API error {response.status} on {method} {url}: {text}")
+            return text
+
+    async def _request_json(self, session: aiohttp.ClientSession, method: str, url: str, body: Optional[bytes] = None) -> Dict[str, Any]:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        return json.loads(await self._request(session, method, url, data=body, headers=headers))
+
+    async def wait(self, session: aiohttp.ClientSession, batch_id: str) -> Dict[str, Any]:
+        """Interroge le fournisseur jusqu'à la fin du traitement du batch."""
+        start = time.time()
+        last_counts = None
+        while True:
+            status = await self._request_json(session, "GET", self.status_url(batch_id))
+            counts = status.get('request_counts')
+            if counts != last_counts:
+                logger.info(f"Batch {batch_id}: {status.get('status') or status.get('processing_status')} {counts or ''}")
+                last_counts = counts
+            if self.is_finished(status):
+                return status
+            if self.max_wait is not None and time.time() - start > self.max_wait:
+                raise TimeoutError(f"Batch {batch_id} not finished after {self.max_wait:.0f}s")
+            await asyncio.sleep(self.poll_interval)
+
+    async def run(self, session: aiohttp.ClientSession, lines: List[bytes], path: Path) -> BatchResults:
+        """Écrit le fichier de batch, le soumet (ou reprend son suivi) et retourne les résultats."""
+        payload = b"\n".join(lines) + b"\n"
+        digest = hashlib.sha256(payload).hexdigest()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(payload)
+
+        state_path = path.with_suffix('.state.json')
+        batch_id = None
+        if state_path.exists():
+            state = json.loads(state_path.read_text(encoding='utf-8'))
+            if state.get('input_sha256') == digest:
+                batch_id = state['batch_id']
+                logger.info(f"Resuming batch {batch_id} from {state_path}")
+
+        if batch_id is None:
+            batch_id = await self.submit(session, lines)
+            state_path.write_text(json.dumps({'batch_id': batch_id, 'input_sha256': digest}), encoding='utf-8')
+            logger.info(f"Submitted batch {batch_id} ({len(lines)} requests, {path})")
+
+        status = await self.wait(session, batch_id)
+        return await self.fetch_results(session, status)
+
+
+class OpenAIBatchClient(ProviderBatchClient):
+    """OpenAI Batch API (fichier JSONL téléversé, endpoint /chat/completions)."""
+
+    TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+    @property
+    def endpoint(self) -> str:
+        return urlsplit(self.api_base).path + "/chat/completions"
+
+    def request_line(self, custom_id: str, body: bytes) -> bytes:
+        head = json.dumps({"custom_id": custom_id, "method": "POST", "url": self.endpoint}, separators=(',', ':'))
+        return head[:-1].encode('utf-8') + b',"body":' + body + b'}'
+
+    def status_url(self, batch_id: str) -> str:
+        return f"{self.api_base}/batches/{batch_id}"
+
+    async def submit(self, session: aiohttp.ClientSession, lines: List[bytes]) -> str:
+        form = aiohttp.FormData()
+        form.add_field('purpose', 'batch')
+        form.add_field('file', b"\n".join(lines) + b"\n", filename='batch.jsonl', content_type='application/jsonl')
+        uploaded = json.loads(await self._request(session, "POST", f"{self.api_base}/files", data=form))
+
+        body = json.dumps({
+            "input_file_id": uploaded['id'],
+            "endpoint": self.endpoint,
+            "completion_window": self.completion_window
+        }).encode('utf-8')
+        batch = await self._request_json(session, "POST", f"{self.api_base}/batches", body)
+        return batch['id']
+
+    def is_finished(self, status: Dict[str, Any]) -> bool:
+        return status.get('status') in self.TERMINAL_STATUSES
+
+    async def fetch_results(self, session: aiohttp.ClientSession, status: Dict[str, Any]) -> BatchResults:
+        file_ids = [status.get('output_file_id'), status.get('error_file_id')]
+        if not any(file_ids):
+            raise RuntimeError(f"Batch {status.get('id')} ended with status {status.get('status')} and no results: {status.get('errors')}")
+
+        results: BatchResults = {}
+        for file_id in filter(None, file_ids):
+            content = await self._request(session, "GET", f"{self.api_base}/files/{file_id}/content")
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get('response') or {}
+                if response.get('status_code') == 200 and not record.get('error'):
+                    results[record['custom_id']] = (response.get('body'), None)
+                else:
+                    error = record.get('error') or (response.get('body') or {}).get('error')
+                    results[record['custom_id']] = (None, f"Batch API Error {response.get('status_code')}: {error}")
+        return results
+
+
+class AnthropicBatchClient(ProviderBatchClient):
+    """Anthropic Message Batches (requêtes envoyées dans le corps, résultats en JSONL)."""
+
+    def __init__(self, api_base: str, headers: Dict[str, str], *args, api_key: Optional[str] = None, **kwargs):
+        super().__init__(api_base, headers, *args, **kwargs)
+        self.headers.setdefault('anthropic-version', '2023-06-01')
+        if api_key and api_key != "none":
+            self.headers.setdefault('x-api-key', api_key)
+
+    def request_line(self, custom_id: str, body: bytes) -> bytes:
+        head = json.dumps({"custom_id": custom_id}, separators=(',', ':'))
+        return head[:-1].encode('utf-8') + b',"params":' + body + b'}'
+
+    def status_url(self, batch_id: str) -> str:
+        return f"{self.api_base}/messages/batches/{batch_id}"
+
+    async def submit(self, session: aiohttp.ClientSession, lines: List[bytes]) -> str:
+        body = b'{"requests":[' + b','.join(lines) + b']}'
+        batch = await self._request_json(session, "POST", f"{self.api_base}/messages/batches", body)
+        return batch['id']
+
+    def is_finished(self, status: Dict[str, Any]) -> bool:
+        return status.get('processing_status') == 'ended'
+
+    async def fetch_results(self, session: aiohttp.ClientSession, status: Dict[str, Any]) -> BatchResults:
+        results_url = status.get('results_url') or f"{self.status_url(status['id'])}/results"
+        content = await self._request(session, "GET", results_url)
+
+        results: BatchResults = {}
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            result = record.get('result') or {}
+            if result.get('type') == 'succeeded':
+                results[record['custom_id']] = (result.get('message'), None)
+            else:
+                results[record['custom_id']] = (None, f"Batch API Error ({result.get('type')}): {result.get('error')}")
+        return results
+
+
+def create_batch_client(api_base: str, headers: Dict[str, str], api_key: str, config: Optional[Dict[str, Any]] = None) -> ProviderBatchClient:
+    """Choisit le client batch selon le fournisseur (clé `batch_api` d'un modèle)."""
+    config = config if isinstance(config, dict) else {}
+    options = dict(
+        poll_interval=config.get('poll_interval', 30.0),
+        completion_window=config.get('completion_window', '24h'),
+        max_wait=config.get('max_wait')
+    )
+    if "anthropic" in api_base:
+        return AnthropicBatchClient(api_base, headers, api_key=api_key, **options)
+    return OpenAIBatchClient(api_base, headers, **options)
@@ -0,0 +1,160 @@
+"""Taille de batch adaptative, bornée par les budgets de tokens du modèle."""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from .prompt_builder import PromptBuilder
+from .rate_limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Longueur de réponse attendue (tokens) par type de question, avant observation
+EXPECTED_ANSWER_TOKENS = {
+    'comptage': 4,
+    'comptage_complexe': 4,
+    'relational_path': 4,
+    'enigme': 8,
+    'relation_directe': 12,
+    'relation_inverse': 12,
+    'relation_complexe': 16,
+    'relation_attribut_composee': 16,
+    'verticale_racine': 16,
+    'verticale_racine_critere': 16,
+    'conditional': 16,
+    'recherche_attributs': 24,
+    'recherche_multi_criteres': 24,
+    'recherche_inversee_complexe': 24,
+    'multihop': 24,
+    'verticale_ancetre': 32,
+    'verticale_descendant_critere': 32,
+    'comparative': 32,
+    'verticale_descendant': 48,
+    'verticale_feuille': 48,
+    'transversale_generation': 48,
+    'negation': 48,
+}
+DEFAULT_ANSWER_TOKENS = 16
+
+# Consignes du prompt batch et prompt système, hors description et questions
+PROMPT_OVERHEAD_TOKENS = 150
+# Guillemets et séparateurs du tableau JSON, par réponse
+ANSWER_OVERHEAD_TOKENS = 3
+# Nombre de réponses observées avant de remplacer la valeur par défaut d'un type
+MIN_OBSERVED_ANSWERS = 5
+
+
+class AdaptiveBatcher:
+    """Découpe les questions en batches adaptés à un modèle.
+
+    Chaque batch respecte la fenêtre de contexte (description + questions +
+    sortie réservée) et la limite de sortie (réponses attendues, avec marge).
+    La taille cible suit une règle AIMD : divisée à chaque batch dont des
+    réponses manquent, qui expire ou dépasse la latence visée, puis augmentée
+    d'une question à chaque batch complet réussi.
+    """
+
+    def __init__(self,
+                 context_window: int = 32768,
+                 max_output_tokens: int = 2000,
+                 reasoning_tokens: int = 0,
+                 initial_size: int = 10,
+                 min_size: int = 1,
+                 max_size: int = 50,
+                 output_margin: float = 1.5,
+                 failure_threshold: float = 0.1,
+                 decrease_factor: float = 0.5,
+                 target_latency: Optional[float] = None):
+        self.context_window = context_window
+        self.max_output_tokens = max_output_tokens
+        self.reasoning_tokens = reasoning_tokens
+        self.min_size = min_size
+        self.max_size = max_size
+        self.output_margin = output_margin
+        self.failure_threshold = failure_threshold
+        self.decrease_factor = decrease_factor
+        self.target_latency = target_latency
+        self.size = float(max(min_size, min(initial_size, max_size)))
+        # Longueur observée des réponses : type -> [total de tokens, nombre de réponses]
+        self._answer_tokens: Dict[str, List[int]] = {}
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], context_window: Optional[int] = None, max_output_tokens: int = 2000) -> "AdaptiveBatcher":
+        """Construit le batcher depuis la clé `batching` d'un modèle."""
+        config = config or {}
+        return cls(
+            context_window=context_window or 32768,
+            max_output_tokens=max_output_tokens,
+            reasoning_tokens=config.get('reasoning_tokens', 0),
+            initial_size=config.get('initial_size', 10),
+            min_size=config.get('min_size', 1),
+            max_size=config.get('max_size', 50),
+            output_margin=config.get('output_margin', 1.5),
+            failure_threshold=config.get('failure_threshold', 0.1),
+            decrease_factor=config.get('decrease_factor', 0.5),
+            target_latency=config.get('target_latency')
+        )
+
+    @property
+    def target_size(self) -> int:
+        return int(self.size)
+
+    def expected_answer_tokens(self, question: Dict[str, Any]) -> int:
+        """Longueur de réponse attendue : moyenne observée du type, sinon valeur par défaut."""
+        question_type = question.get('type')
+        total, count = self._answer_tokens.get(question_type, (0, 0))
+        if count >= MIN_OBSERVED_ANSWERS:
+            return max(1, total // count)
+        return EXPECTED_ANSWER_TOKENS.get(question_type, DEFAULT_ANSWER_TOKENS)
+
+    def plan(self, questions: List[Dict[str, Any]], tree_description: str, language: str = 'fr') -> List[List[Dict[str, Any]]]:
+        """Regroupe les questions, dans l'ordre, en batches tenant dans les budgets du modèle."""
+        prefix = PromptBuilder.build_shared_prefix(tree_description, language)
+        prefix_tokens = estimate_tokens(len(prefix.encode('utf-8'))) + PROMPT_OVERHEAD_TOKENS
+        input_budget = self.context_window - self.max_output_tokens - prefix_tokens
+        output_budget = self.max_output_tokens - self.reasoning_tokens
+
+        if input_budget <= 0 or output_budget <= 0:
+            logger.warning(f"Description (~{prefix_tokens} tokens) leaves no room for batching in a {self.context_window}-token context, sending questions one by one")
+            return [[question] for question in questions]
+
+        batches: List[List[Dict[str, Any]]] = []
+        current: List[Dict[str, Any]] = []
+        input_tokens = output_tokens = 0
+        for question in questions:
+            question_input = estimate_tokens(len(question['question'].encode('utf-8'))) + ANSWER_OVERHEAD_TOKENS
+            question_output = (self.expected_answer_tokens(question) + ANSWER_OVERHEAD_TOKENS) * self.output_margin
+            if current and (len(current) >= self.target_size
+                            or input_tokens + question_input > input_budget
+                            or output_tokens + question_output > output_budget):
+                batches.append(current)
+                current, input_tokens, output_tokens = [], 0, 0
+            current.append(question)
+            input_tokens += question_input
+            output_tokens += question_output
+        if current:
+            batches.append(current)
+        return batches
+
+    def observe_answer(self, question_type: Optional[str], answer: str):
+        """Enregistre la longueur d'une réponse reçue pour affiner les estimations."""
+        totals = self._answer_tokens.setdefault(question_type, [0, 0])
+        totals[0] += estimate_tokens(len(answer.encode('utf-8')))
+        totals[1] += 1
+
+    def record(self, batch_size: int, unanswered: int, latency: float, timed_out: bool = False):
+        """Ajuste la taille cible après une requête batch.
+
+        Args:
+            batch_size: Nombre de questions envoyées
+            unanswered: Réponses manquantes ou illisibles dans la réponse
+            latency: Durée de la requête, hors attente en file
+            timed_out: La requête a expiré
+        """
+        too_slow = self.target_latency is not None and latency > self.target_latency
+        if timed_out or too_slow or unanswered > self.failure_threshold * batch_size:
+            previous = self.target_size
+            self.size = max(float(self.min_size), min(self.size, float(batch_size)) * self.decrease_factor)
+            if self.target_size != previous:
+                logger.info(f"Batch size reduced to {self.target_size} ({unanswered}/{batch_size} unanswered, {latency:.1f}s)")
+        elif batch_size >= self.target_size:
+            self.size = min(float(self.max_size), self.size + 1)
@@ -0,0 +1,83 @@
+"""Limites de concurrence des requêtes API (globale, par hôte, par modèle)."""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+
+class ConcurrencySlot:
+    """Emplacement obtenu auprès du limiteur, avec le temps passé en file d'attente."""
+
+    def __init__(self):
+        self.wait_time = 0.0
+
+
+class ConcurrencyLimiter:
+    """Borne le nombre de requêtes simultanées.
+
+    Trois niveaux de limites, tous optionnels (None = illimité) :
+    globale, par hôte de fournisseur et par modèle. Une requête attend
+    d'avoir obtenu une place à chaque niveau avant d'être envoyée.
+    """
+
+    def __init__(self,
+                 global_limit: Optional[int] = None,
+                 per_host: Optional[int] = None,
+                 per_model: Optional[int] = None):
+        self.global_limit = global_limit
+        self.per_host = per_host
+        self.per_model = per_model
+        self._global_semaphore = asyncio.Semaphore(global_limit) if global_limit else None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._model_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "ConcurrencyLimiter":
+        """Construit le limiteur depuis la section `evaluation.concurrency` du YAML."""
+        config = config or {}
+        return cls(
+            global_limit=config.get('global'),
+            per_host=config.get('per_host'),
+            per_model=config.get('per_model')
+        )
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlsplit(url).netloc
+
+    def _semaphore(self, semaphores: Dict[str, asyncio.Semaphore], key: str, limit: Optional[int]) -> Optional[asyncio.Semaphore]:
+        if not limit:
+            return None
+        if key not in semaphores:
+            semaphores[key] = asyncio.Semaphore(limit)
+        return semaphores[key]
+
+    @asynccontextmanager
+    async def slot(self, model_name: str, url: str, model_limit: Optional[int] = None) -> AsyncIterator[ConcurrencySlot]:
+        """Attend une place libre pour le modèle et l'hôte de `url`.
+
+        Args:
+            model_limit: Limite propre au modèle (`max_concurrency`), prioritaire sur `per_model`
+        """
+        # Toujours acquérir dans le même ordre (modèle, hôte, global) pour éviter les interblocages
+        semaphores = [
+            self._semaphore(self._model_semaphores, model_name, model_limit or self.per_model),
+            self._semaphore(self._host_semaphores, self.host_of(url), self.per_host),
+            self._global_semaphore
+        ]
+        semaphores = [semaphore for semaphore in semaphores if semaphore is not None]
+
+        slot = ConcurrencySlot()
+        start = time.time()
+        acquired = []
+        try:
+            for semaphore in semaphores:
+                await semaphore.acquire()
+                acquired.append(semaphore)
+            slot.wait_time = time.time() - start
+            yield slot
+        finally:
+            for semaphore in reversed(acquired):
+                semaphore.release()
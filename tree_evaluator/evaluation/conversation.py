@@ -0,0 +1,90 @@
+"""Mode conversation : l'arbre est envoyé une fois, les questions suivent en tours successifs."""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+RESET_MODES = ('clear', 'slide')
+
+
+def encode_message(role: str, content: str) -> bytes:
+    """Message de chat encodé comme dans `RequestTemplate` (JSON compact, UTF-8)."""
+    return json.dumps({"role": role, "content": content}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class ConversationHistory:
+    """Tours question/réponse conservés après le tour d'ouverture d'une conversation.
+
+    Au-delà de `window` tours, `clear` vide l'historique (chaque requête
+    prolonge exactement la précédente jusqu'à la remise à zéro, ce que les
+    caches de préfixe réutilisent entièrement) et `slide` retire le tour le
+    plus ancien (contexte constant, mais seul le tour d'ouverture reste
+    commun d'une requête à l'autre).
+
+    Chaque tour est encodé en JSON une seule fois, à son ajout : une requête
+    n'encode que la question courante.
+    """
+
+    def __init__(self, window: int = 8, reset: str = 'clear'):
+        self.window = window
+        self.reset = reset
+        self.turns: List[Tuple[str, str]] = []
+        self._encoded: List[bytes] = []
+
+    def add(self, prompt: str, answer: str):
+        """Ajoute un tour (question posée, réponse de l'assistant)."""
+        self.turns.append((prompt, answer))
+        self._encoded.append(encode_message("user", prompt) + b',' + encode_message("assistant", answer) + b',')
+        if len(self.turns) > self.window:
+            if self.reset == 'slide':
+                del self.turns[0]
+                del self._encoded[0]
+            else:
+                self.turns.clear()
+                self._encoded.clear()
+
+    def encode(self, prompt: str) -> bytes:
+        """Messages de l'historique suivis de la question `prompt`, déjà encodés."""
+        return b''.join(self._encoded) + encode_message("user", prompt)
+
+
+class ConversationMode:
+    """Configuration du mode conversation d'un modèle.
+
+    Les questions d'un run sont réparties en `parallel` conversations
+    consécutives, qui partagent le même tour d'ouverture ; dans chacune, les
+    questions sont posées l'une après l'autre.
+    """
+
+    def __init__(self, history: int = 8, reset: str = 'clear', parallel: int = 1):
+        if reset not in RESET_MODES:
+            raise ValueError(f"reset inconnu : {reset} (attendus : {', '.join(RESET_MODES)})")
+        self.history = max(0, history)
+        self.reset = reset
+        self.parallel = max(1, parallel)
+
+    @classmethod
+    def from_config(cls, config: Any) -> Optional["ConversationMode"]:
+        """Construit le mode depuis la clé `conversation` d'un modèle (None si absente)."""
+        if not config:
+            return None
+        config = config if isinstance(config, dict) else {}
+        return cls(
+            history=config.get('history', 8),
+            reset=config.get('reset', 'clear'),
+            parallel=config.get('parallel', 1)
+        )
+
+    def new_history(self) -> ConversationHistory:
+        return ConversationHistory(self.history, self.reset)
+
+    def split(self, questions: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Répartit les questions en conversations consécutives de tailles proches."""
+        count = min(self.parallel, len(questions)) or 1
+        size, extra = divmod(len(questions), count)
+        conversations = []
+        start = 0
+        for index in range(count):
+            end = start + size + (1 if index < extra else 0)
+            conversations.append(questions[start:end])
+            start = end
+        return conversations
@@ -0,0 +1,180 @@
+"""Répartition des requêtes d'un modèle entre plusieurs clés API et points d'accès."""
+
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .concurrency import ConcurrencyLimiter
+from .rate_limiter import RateLimiter, RateLimiterRegistry
+
+logger = logging.getLogger(__name__)
+
+ROUTING_STRATEGIES = ('least_outstanding', 'least_latency')
+
+
+def resolve_api_key(key: str) -> str:
+    """Résout les variables d'environnement (`${NOM}`) dans une clé API."""
+    if key.startswith('${') and key.endswith('}'):
+        return os.environ.get(key[2:-1], 'none')
+    return key
+
+
+class Endpoint:
+    """Un point d'accès (URL de base + clé API) avec son limiteur de débit."""
+
+    def __init__(self, api_base: str, api_key: str, rate_limiter: RateLimiter):
+        self.api_base = api_base.rstrip('/')
+        self.api_key = api_key
+        self.rate_limiter = rate_limiter
+        self.outstanding = 0
+        self.latency: Optional[float] = None  # Moyenne mobile exponentielle
+        self.ejected_until = 0.0
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def label(self) -> str:
+        """Identifiant lisible dans les logs, sans exposer la clé."""
+        suffix = f"…{self.api_key[-4:]}" if self.api_key != "none" else "no key"
+        return f"{ConcurrencyLimiter.host_of(self.api_base)} ({suffix})"
+
+    def available_at(self) -> float:
+        """Instant à partir duquel le point d'accès peut de nouveau être choisi."""
+        return max(self.ejected_until, self.rate_limiter.paused_until)
+
+
+class EndpointPool:
+    """Choisit le point d'accès de chaque requête et écarte temporairement les défaillants.
+
+    Stratégies : `least_outstanding` (le moins de requêtes en cours, puis la
+    latence la plus faible) ou `least_latency` (latence moyenne la plus
+    faible ; un point d'accès encore jamais mesuré est essayé en premier).
+    Un point d'accès est écarté après un 429 (pour la durée demandée par le
+    serveur), après `failure_threshold` échecs consécutifs (erreurs réseau,
+    5xx) ou après un refus de la clé (401/403).
+    """
+
+    def __init__(self,
+                 endpoints: List[Endpoint],
+                 strategy: str = 'least_outstanding',
+                 ejection_time: float = 30.0,
+                 failure_threshold: int = 3,
+                 latency_smoothing: float = 0.3):
+        if not endpoints:
+            raise ValueError("Au moins un point d'accès est requis")
+        if strategy not in ROUTING_STRATEGIES:
+            raise ValueError(f"Stratégie de routage inconnue : {strategy} (attendues : {', '.join(ROUTING_STRATEGIES)})")
+        self.endpoints = endpoints
+        self.strategy = strategy
+        self.ejection_time = ejection_time
+        self.failure_threshold = failure_threshold
+        self.latency_smoothing = latency_smoothing
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], rate_limiters: RateLimiterRegistry) -> "EndpointPool":
+        """Construit le pool d'un modèle.
+
+        Les points d'accès viennent de `endpoints` (liste de `api_base`/`api_key`,
+        valeurs du modèle par défaut), sinon de `api_keys` (plusieurs clés pour
+        le même `api_base`), sinon du couple `api_base`/`api_key` du modèle.
+        """
+        api_base = config['api_base']
+        api_key = config.get('api_key', 'none')
+        if config.get('endpoints'):
+            pairs = [(entry.get('api_base', api_base), entry.get('api_key', api_key)) for entry in config['endpoints']]
+        elif config.get('api_keys'):
+            pairs = [(api_base, key) for key in config['api_keys']]
+        else:
+            pairs = [(api_base, api_key)]
+
+        endpoints = []
+        for base, key in pairs:
+            key = resolve_api_key(key)
+            limiter = rate_limiters.get(ConcurrencyLimiter.host_of(base), key, config.get('rate_limit'))
+            endpoints.append(Endpoint(base, key, limiter))
+
+        routing = config.get('routing') or {}
+        return cls(
+            endpoints,
+            strategy=routing.get('strategy', 'least_outstanding'),
+            ejection_time=routing.get('ejection_time', 30.0),
+            failure_threshold=routing.get('failure_threshold', 3)
+        )
+
+    @property
+    def primary(self) -> Endpoint:
+        return self.endpoints[0]
+
+    def _score(self, endpoint: Endpoint):
+        latency = endpoint.latency if endpoint.latency is not None else 0.0
+        if self.strategy == 'least_latency':
+            return (latency, endpoint.outstanding)
+        return (endpoint.outstanding, latency)
+
+    def acquire(self) -> Endpoint:
+        """Choisit un point d'accès et lui attribue la requête."""
+        now = time.time()
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.available_at() <= now]
+        if candidates:
+            endpoint = min(candidates, key=self._score)
+        else:
+            # Tous écartés : celui qui redevient disponible le plus tôt
+            endpoint = min(self.endpoints, key=Endpoint.available_at)
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        return endpoint
+
+    @staticmethod
+    def is_endpoint_failure(status: int) -> bool:
+        """Échec imputable au point d'accès (réseau, 5xx, clé refusée) plutôt qu'à la requête."""
+        return status == 0 or status >= 500 or status in (401, 403)
+
+    def has_alternative(self, endpoint: Endpoint) -> bool:
+        """Indique si un autre point d'accès est disponible maintenant."""
+        now = time.time()
+        return any(other is not endpoint and other.available_at() <= now for other in self.endpoints)
+
+    def release(self, endpoint: Endpoint, status: Optional[int], latency: float, retry_after: Optional[float] = None):
+        """Enregistre l'issue d'une requête (statut HTTP, 0 sans réponse, None si abandonnée)."""
+        endpoint.outstanding -= 1
+        if status is None:
+            return
+
+        if status == 429:
+            self._eject(endpoint, retry_after if retry_after is not None else self.ejection_time, "throttled")
+            return
+        if status in (401, 403):
+            endpoint.failures += 1
+            self._eject(endpoint, self.ejection_time, f"rejected key ({status})")
+            return
+        if status == 0 or status >= 500:
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.failure_threshold:
+                self._eject(endpoint, self.ejection_time, f"{endpoint.consecutive_failures} consecutive failures")
+                endpoint.consecutive_failures = 0
+            return
+
+        endpoint.consecutive_failures = 0
+        if status == 200:
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += self.latency_smoothing * (latency - endpoint.latency)
+
+    def _eject(self, endpoint: Endpoint, duration: float, reason: str):
+        if len(self.endpoints) == 1:
+            return
+        endpoint.ejected_until = max(endpoint.ejected_until, time.time() + duration)
+        logger.warning(f"Endpoint {endpoint.label} ejected for {duration:.0f}s: {reason}")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Requêtes, échecs et latence moyenne par point d'accès."""
+        return [{
+            'endpoint': endpoint.label,
+            'requests': endpoint.requests,
+            'failures': endpoint.failures,
+            'avg_latency': endpoint.latency or 0.0
+        } for endpoint in self.endpoints]
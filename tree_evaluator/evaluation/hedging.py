@@ -0,0 +1,82 @@
+"""Requêtes doublées (hedging) contre la latence de queue des fournisseurs."""
+
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Optional
+
+
+class Hedger:
+    """Décide quand doubler une requête lente et tient le budget de doublons.
+
+    Le délai de doublement est le `percentile` des dernières latences
+    observées du modèle, séparément pour chaque type de requête (question
+    seule, batch de n questions), et au moins `min_delay`. Aucun doublon
+    n'est envoyé avant `min_samples` mesures, ni au-delà de
+    `max_extra_ratio` doublons par requête d'origine.
+    """
+
+    def __init__(self,
+                 percentile: float = 0.95,
+                 min_samples: int = 20,
+                 window: int = 200,
+                 max_extra_ratio: float = 0.1,
+                 min_delay: float = 0.0):
+        if not 0 < percentile < 1:
+            raise ValueError(f"percentile doit être entre 0 et 1 (reçu : {percentile})")
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.max_extra_ratio = max_extra_ratio
+        self.min_delay = min_delay
+        self._latencies: Dict[Hashable, Deque[float]] = {}
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+    @classmethod
+    def from_config(cls, config: Any) -> Optional["Hedger"]:
+        """Construit le hedger depuis la clé `hedging` d'un modèle (None si absente)."""
+        if not config:
+            return None
+        config = config if isinstance(config, dict) else {}
+        return cls(
+            percentile=config.get('percentile', 0.95),
+            min_samples=config.get('min_samples', 20),
+            window=config.get('window', 200),
+            max_extra_ratio=config.get('max_extra_ratio', 0.1),
+            min_delay=config.get('min_delay', 0.0)
+        )
+
+    def delay(self, kind: Hashable) -> Optional[float]:
+        """Délai après l'envoi au-delà duquel la requête est doublée (None sans assez de mesures)."""
+        latencies = self._latencies.get(kind)
+        if not latencies or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return max(self.min_delay, ordered[index])
+
+    def observe(self, kind: Hashable, latency: float):
+        """Enregistre la latence d'une requête réussie."""
+        latencies = self._latencies.get(kind)
+        if latencies is None:
+            latencies = self._latencies[kind] = deque(maxlen=self.window)
+        latencies.append(latency)
+
+    def try_hedge(self) -> bool:
+        """Réserve un doublon si le budget le permet."""
+        if self.hedged + 1 > self.max_extra_ratio * self.requests:
+            self.budget_denied += 1
+            return False
+        self.hedged += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Requêtes d'origine, doublons envoyés, doublons arrivés en premier."""
+        return {
+            'requests': self.requests,
+            'hedged_requests': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            'hedge_rate': self.hedged / self.requests if self.requests else 0.0,
+            'budget_denied': self.budget_denied
+        }
@@ -0,0 +1,170 @@
+"""Sessions HTTP partagées par hôte de fournisseur pour toute l'évaluation."""
+
+import logging
+import time
+from typing import Any, Dict, Optional, Union
+
+import aiohttp
+
+from .concurrency import ConcurrencyLimiter
+from .transport import TRANSPORTS, AiohttpTransport, HttpxTransport, Transport
+
+logger = logging.getLogger(__name__)
+
+
+class HttpPool:
+    """Une session aiohttp longue durée par hôte, avec connecteur réglé.
+
+    Les connexions TLS et les résolutions DNS sont réutilisées d'un benchmark
+    et d'un run à l'autre. Le pool s'utilise comme une `aiohttp.ClientSession`
+    (`post`, `request`) : la session de l'hôte de l'URL est choisie, créée au
+    premier appel. Un timeout numérique devient un `aiohttp.ClientTimeout`
+    combinant la durée totale et les timeouts par phase de la configuration.
+
+    Le pool fournit aussi les transports des modèles (`transport(nom)`), créés
+    une seule fois avec les mêmes réglages et fermés avec lui.
+    """
+
+    def __init__(self,
+                 max_connections_per_host: int = 100,
+                 keepalive_timeout: float = 60.0,
+                 dns_cache_ttl: Optional[int] = 300,
+                 connect_timeout: Optional[float] = None,
+                 first_byte_timeout: Optional[float] = None,
+                 total_timeout: Optional[float] = None,
+                 http2: bool = True):
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.connect_timeout = connect_timeout
+        self.first_byte_timeout = first_byte_timeout
+        self.total_timeout = total_timeout
+        self.http2 = http2
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._transports: Dict[str, Transport] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "HttpPool":
+        """Construit le pool depuis la section `evaluation.http` du YAML."""
+        config = config or {}
+        timeouts = config.get('timeouts') or {}
+        return cls(
+            max_connections_per_host=config.get('max_connections_per_host', 100),
+            keepalive_timeout=config.get('keepalive_timeout', 60.0),
+            dns_cache_ttl=config.get('dns_cache_ttl', 300),
+            connect_timeout=timeouts.get('connect'),
+            first_byte_timeout=timeouts.get('first_byte'),
+            total_timeout=timeouts.get('total'),
+            http2=config.get('http2', True)
+        )
+
+    def _trace_config(self, host: str) -> aiohttp.TraceConfig:
+        stats = self._stats.setdefault(host, {
+            'requests': 0, 'errors': 0,
+            'connections_created': 0, 'connections_reused': 0, 'connect_time': 0.0,
+            'dns_cache_hits': 0, 'dns_cache_misses': 0
+        })
+
+        def counter(key: str):
+            async def increment(session, context, params):
+                stats[key] += 1
+            return increment
+
+        async def connection_start(session, context, params):
+            context.connect_start = time.monotonic()
+
+        async def connection_end(session, context, params):
+            stats['connections_created'] += 1
+            stats['connect_time'] += time.monotonic() - getattr(context, 'connect_start', time.monotonic())
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(counter('requests'))
+        trace.on_request_exception.append(counter('errors'))
+        trace.on_connection_reuseconn.append(counter('connections_reused'))
+        trace.on_connection_create_start.append(connection_start)
+        trace.on_connection_create_end.append(connection_end)
+        trace.on_dns_cache_hit.append(counter('dns_cache_hits'))
+        trace.on_dns_cache_miss.append(counter('dns_cache_misses'))
+        return trace
+
+    def session_for(self, url: str) -> aiohttp.ClientSession:
+        """Retourne la session de l'hôte de `url`, créée au premier appel."""
+        host = ConcurrencyLimiter.host_of(url)
+        session = self._sessions.get(host)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections_per_host,
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=self.dns_cache_ttl is not None
+            )
+            session = aiohttp.ClientSession(connector=connector, trace_configs=[self._trace_config(host)])
+            self._sessions[host] = session
+        return session
+
+    def timeout(self, total: Optional[float] = None) -> aiohttp.ClientTimeout:
+        """Combine la durée totale d'une requête et les timeouts par phase."""
+        return aiohttp.ClientTimeout(
+            total=total if total is not None else self.total_timeout,
+            sock_connect=self.connect_timeout,
+            sock_read=self.first_byte_timeout
+        )
+
+    def request(self, method: str, url: str, timeout: Union[None, float, aiohttp.ClientTimeout] = None, **kwargs):
+        if not isinstance(timeout, aiohttp.ClientTimeout):
+            timeout = self.timeout(timeout)
+        return self.session_for(url).request(method, url, timeout=timeout, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def transport(self, name: str = 'aiohttp') -> Transport:
+        """Retourne le transport `name` partagé ('aiohttp' ou 'httpx')."""
+        if name not in self._transports:
+            if name == 'aiohttp':
+                self._transports[name] = AiohttpTransport(self)
+            elif name == 'httpx':
+                self._transports[name] = HttpxTransport(
+                    http2=self.http2,
+                    max_connections=self.max_connections_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                    connect_timeout=self.connect_timeout,
+                    first_byte_timeout=self.first_byte_timeout
+                )
+            else:
+                raise ValueError(f"Transport inconnu : {name} (attendus : {', '.join(TRANSPORTS)})")
+        return self._transports[name]
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Statistiques cumulées par hôte (requêtes, connexions ouvertes ou réutilisées, DNS)."""
+        all_stats = dict(self._stats)
+        for name, transport in self._transports.items():
+            for host, stats in transport.stats().items():
+                all_stats[f"{host} ({name})"] = stats
+
+        summary = {}
+        for host, stats in all_stats.items():
+            host_stats = dict(stats)
+            created = stats['connections_created']
+            host_stats['avg_connect_time'] = stats['connect_time'] / created if created else 0.0
+            total = created + stats['connections_reused']
+            host_stats['connection_reuse_rate'] = stats['connections_reused'] / total if total else 0.0
+            summary[host] = host_stats
+        return summary
+
+    async def close(self):
+        for transport in self._transports.values():
+            await transport.close()
+        self._transports.clear()
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        self._sessions.clear()
+
+    async def __aenter__(self) -> "HttpPool":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
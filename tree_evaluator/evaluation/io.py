@@ -15,8 +15,11 @@ def save_results_csv(results: List[EvaluationResult], output_path: Path):
         fieldnames = [
             'model_name', 'benchmark_name', 'question_id', 'question',
             'expected_answer', 'model_answer', 'is_correct', 'is_exact_match',
-            'partial_match_score', 'response_time', 'tokens_used', 'error', 
-            'no_response', 'reasoning_tokens', 'question_type', 'is_enigma', 'enigma_complexity'
+            'partial_match_score', 'response_time', 'queue_time', 'timeout',
+            'time_to_first_token', 'time_to_first_answer_token', 'tokens_per_second',
+            'tokens_used', 'error', 
+            'no_response', 'reasoning_tokens', 'prompt_tokens', 'cached_tokens',
+            'question_type', 'is_enigma', 'enigma_complexity'
         ]
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
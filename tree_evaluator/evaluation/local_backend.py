@@ -0,0 +1,358 @@
+"""Modèles exécutés dans le processus (llama-cpp-python, transformers), sans HTTP."""
+
+import asyncio
+import importlib.util
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Moteur -> (module à importer, paquet à installer)
+RUNTIMES = {
+    'llama_cpp': ('llama_cpp', 'llama-cpp-python'),
+    'transformers': ('transformers', 'torch transformers'),
+}
+
+
+@dataclass
+class LocalRequest:
+    """Requête en attente d'un lot du moteur local."""
+    messages: List[Dict[str, Any]]
+    max_tokens: int
+    temperature: float
+    stop: List[str]
+    future: asyncio.Future
+    tokens: List[int] = field(default_factory=list)
+
+
+def _message_text(content: Any) -> str:
+    """Texte d'un message, y compris sous forme de blocs (`cache_control`)."""
+    if isinstance(content, list):
+        return "".join(block.get('text', '') for block in content)
+    return content
+
+
+def _cut_at_stop(text: str, stop: List[str]) -> str:
+    """Coupe le texte généré à la première séquence d'arrêt."""
+    positions = [text.find(sequence) for sequence in stop if sequence and sequence in text]
+    return text[:min(positions)] if positions else text
+
+
+class LlamaCppRuntime:
+    """Moteur llama-cpp-python (modèles GGUF).
+
+    Les requêtes d'un lot sont générées l'une après l'autre, triées par
+    tokens : llama.cpp réutilise le cache KV du plus long préfixe commun avec
+    la requête précédente, la description de l'arbre n'est donc évaluée
+    qu'une fois tant que les prompts la partagent.
+    """
+
+    def __init__(self,
+                 model_path: str,
+                 n_ctx: int = 8192,
+                 threads: Optional[int] = None,
+                 gpu_layers: int = 0,
+                 chat_template: Optional[str] = None):
+        from llama_cpp import Llama
+        from llama_cpp.llama_chat_format import Jinja2ChatFormatter
+        self.llm = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=threads, n_gpu_layers=gpu_layers, verbose=False)
+        template = chat_template or self.llm.metadata.get('tokenizer.chat_template')
+        if not template:
+            raise ValueError(f"Aucun modèle de chat dans {model_path} : renseigner `local.chat_template`")
+        self._formatter = Jinja2ChatFormatter(
+            template=template,
+            eos_token=self._token_text(self.llm.token_eos()),
+            bos_token=self._token_text(self.llm.token_bos()),
+            add_generation_prompt=True
+        )
+
+    def _token_text(self, token: int) -> str:
+        return self.llm.detokenize([token], special=True).decode('utf-8', errors='ignore')
+
+    def format_chat(self, messages: List[Dict[str, Any]]) -> str:
+        return self._formatter(messages=messages).prompt
+
+    def tokenize(self, text: str) -> List[int]:
+        return self.llm.tokenize(text.encode('utf-8'), add_bos=False, special=True)
+
+    def generate(self, requests: List[LocalRequest]) -> List[Tuple[str, int, int]]:
+        outputs: List[Optional[Tuple[str, int, int]]] = [None] * len(requests)
+        for index in sorted(range(len(requests)), key=lambda i: requests[i].tokens):
+            request = requests[index]
+            evaluated = list(self.llm.input_ids[:self.llm.n_tokens])
+            cached = len(os.path.commonprefix([evaluated, request.tokens]))
+            completion = self.llm.create_completion(
+                prompt=request.tokens,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                stop=request.stop or None
+            )
+            outputs[index] = (completion['choices'][0]['text'], completion['usage']['completion_tokens'], cached)
+        return outputs
+
+
+class TransformersRuntime:
+    """Moteur transformers (petits modèles, CPU par défaut).
+
+    Les requêtes d'un lot sont complétées à gauche et générées ensemble en
+    un seul appel à `generate`.
+    """
+
+    def __init__(self, model_name: str, device: str = 'cpu', dtype: Optional[str] = None):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+        self._torch = torch
+        self.device = device
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.tokenizer.padding_side = 'left'
+        if self.tokenizer.pad_token_id is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=getattr(torch, dtype) if dtype else 'auto').to(device)
+        self.model.eval()
+
+    def format_chat(self, messages: List[Dict[str, Any]]) -> str:
+        return self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+
+    def tokenize(self, text: str) -> List[int]:
+        return self.tokenizer(text, add_special_tokens=False)['input_ids']
+
+    def generate(self, requests: List[LocalRequest]) -> List[Tuple[str, int, int]]:
+        torch = self._torch
+        pad = self.tokenizer.pad_token_id
+        width = max(len(request.tokens) for request in requests)
+        input_ids = torch.tensor([[pad] * (width - len(r.tokens)) + r.tokens for r in requests], device=self.device)
+        attention_mask = torch.tensor([[0] * (width - len(r.tokens)) + [1] * len(r.tokens) for r in requests], device=self.device)
+        temperature = requests[0].temperature
+        sampling = {'do_sample': True, 'temperature': temperature} if temperature > 0 else {'do_sample': False}
+        with torch.no_grad():
+            output = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                max_new_tokens=max(request.max_tokens for request in requests),
+                pad_token_id=pad,
+                **sampling
+            )
+
+        end_tokens = {self.tokenizer.eos_token_id, pad}
+        outputs = []
+        for row, request in zip(output[:, width:].tolist(), requests):
+            tokens = row[:request.max_tokens]
+            for position, token in enumerate(tokens):
+                if token in end_tokens:
+                    tokens = tokens[:position]
+                    break
+            outputs.append((self.tokenizer.decode(tokens, skip_special_tokens=True), len(tokens), 0))
+        return outputs
+
+
+class LocalBackend:
+    """Modèle local partagé par toutes les requêtes d'un `ModelEvaluator`.
+
+    Reçoit les corps de requête au format chat OpenAI et retourne des
+    réponses au même format : nettoyage, notation et statistiques restent
+    ceux des modèles HTTP. Les requêtes simultanées (questions d'un run, runs
+    en parallèle) sont regroupées en lots d'au plus `max_batch_size`, en
+    attendant au plus `batch_wait` secondes que le lot se remplisse. Le
+    moteur est chargé à la première requête et tourne dans un thread dédié.
+
+    Le préfixe commun à deux prompts successifs (description de l'arbre) est
+    tokenisé une seule fois puis réutilisé pour les prompts suivants, s'il
+    coïncide avec le début de la tokenisation du prompt entier : les prompts
+    restent tokenisés comme sans cache.
+    """
+
+    API_BASE = "local://"
+
+    def __init__(self,
+                 runtime_factory: Callable[[], Any],
+                 model: str = "",
+                 max_batch_size: int = 8,
+                 batch_wait: float = 0.01,
+                 prefix_cache_size: int = 8,
+                 min_prefix_chars: int = 256):
+        self._runtime_factory = runtime_factory
+        self._runtime = None
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_wait = batch_wait
+        self.prefix_cache_size = prefix_cache_size
+        self.min_prefix_chars = min_prefix_chars
+        self._prefixes: OrderedDict = OrderedDict()
+        self._last_prompt = ""
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-model")
+        self._loop = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.requests = 0
+        self.batches = 0
+        self.prefix_hits = 0
+
+    @classmethod
+    def from_config(cls, config: Any, model: str) -> Optional["LocalBackend"]:
+        """Construit le moteur depuis la clé `local` d'un modèle (None si absente).
+
+        `model` est le chemin du fichier GGUF (llama_cpp) ou le nom du modèle
+        (transformers).
+        """
+        if not config:
+            return None
+        config = config if isinstance(config, dict) else {}
+        runtime = config.get('runtime', 'llama_cpp')
+        if runtime not in RUNTIMES:
+            raise ValueError(f"Moteur local inconnu : {runtime} (attendus : {', '.join(RUNTIMES)})")
+        module, package = RUNTIMES[runtime]
+        if importlib.util.find_spec(module) is None:
+            raise ImportError(f"Le moteur local '{runtime}' nécessite le paquet {package} (pip install {package})")
+
+        if runtime == 'llama_cpp':
+            def factory():
+                return LlamaCppRuntime(
+                    model,
+                    n_ctx=config.get('n_ctx', 8192),
+                    threads=config.get('threads'),
+                    gpu_layers=config.get('gpu_layers', 0),
+                    chat_template=config.get('chat_template')
+                )
+        else:
+            def factory():
+                return TransformersRuntime(model, device=config.get('device', 'cpu'), dtype=config.get('dtype'))
+
+        return cls(
+            factory,
+            model=model,
+            max_batch_size=config.get('max_batch_size', 8),
+            batch_wait=config.get('batch_wait', 0.01),
+            prefix_cache_size=config.get('prefix_cache_size', 8),
+            min_prefix_chars=config.get('min_prefix_chars', 256)
+        )
+
+    async def complete(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Génère la réponse à un corps de requête chat au format OpenAI."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Nouvelle boucle (nouvel asyncio.run) : la file précédente n'est plus utilisable
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+        messages = [{"role": message["role"], "content": _message_text(message["content"])} for message in data["messages"]]
+        request = LocalRequest(
+            messages=messages,
+            max_tokens=data.get('max_tokens') or data.get('max_completion_tokens') or 512,
+            temperature=data.get('temperature', 0.0),
+            stop=data.get('stop') or data.get('stop_sequences') or [],
+            future=loop.create_future()
+        )
+        self.requests += 1
+        await self._queue.put(request)
+        return await request.future
+
+    async def _run(self):
+        """Forme les lots à partir des requêtes en attente et les exécute dans le thread du moteur."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Les requêtes expirées ou annulées pendant l'attente ne sont pas générées
+            batch = [request for request in batch if not request.future.done()]
+            if not batch:
+                continue
+            self.batches += 1
+            try:
+                responses = await loop.run_in_executor(self._executor, self._run_batch, batch)
+            except Exception as e:
+                logger.error(f"Local model batch failed for {self.model}: {str(e)}", exc_info=True)
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+            for request, response in zip(batch, responses):
+                if not request.future.done():
+                    request.future.set_result(response)
+
+    def _run_batch(self, batch: List[LocalRequest]) -> List[Dict[str, Any]]:
+        """Tokenise et génère un lot (thread du moteur) ; retourne des réponses chat OpenAI."""
+        if self._runtime is None:
+            logger.info(f"Loading local model {self.model}")
+            self._runtime = self._runtime_factory()
+        for request in batch:
+            request.tokens = self._tokenize(self._runtime.format_chat(request.messages))
+
+        responses = []
+        for request, (text, completion_tokens, cached_tokens) in zip(batch, self._runtime.generate(batch)):
+            responses.append({
+                "object": "chat.completion",
+                "model": self.model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": _cut_at_stop(text, request.stop)},
+                    "finish_reason": "length" if completion_tokens >= request.max_tokens else "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": len(request.tokens),
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": len(request.tokens) + completion_tokens,
+                    "prompt_tokens_details": {"cached_tokens": cached_tokens}
+                }
+            })
+        return responses
+
+    def _tokenize(self, prompt: str) -> List[int]:
+        """Tokens du prompt, en réutilisant le plus long préfixe déjà tokenisé.
+
+        Un préfixe n'est réutilisé que s'il est suivi d'un caractère non blanc
+        (une fin de ligne fusionne souvent avec les blancs qui la suivent).
+        Avant d'être retenu, il est comparé une fois à la tokenisation du
+        prompt entier ; s'il n'y tombe pas sur une frontière de tokens, il est
+        marqué comme inutilisable (None).
+        """
+        base, tokens = "", []
+        for prefix, prefix_tokens in self._prefixes.items():
+            if (prefix_tokens is not None and len(prefix) > len(base) and prompt.startswith(prefix)
+                    and not prompt[len(prefix):len(prefix) + 1].isspace()):
+                base, tokens = prefix, prefix_tokens
+        if base:
+            self.prefix_hits += 1
+            self._prefixes.move_to_end(base)
+
+        # Nouveau préfixe : partie commune avec le prompt précédent, coupée après une fin de ligne
+        cut = os.path.commonprefix([prompt, self._last_prompt]).rfind('\n') + 1
+        self._last_prompt = prompt
+        if (cut > len(base) and cut >= self.min_prefix_chars and prompt[:cut] not in self._prefixes
+                and not prompt[cut:cut + 1].isspace()):
+            prefix_tokens = tokens + self._runtime.tokenize(prompt[len(base):cut])
+            full_tokens = self._runtime.tokenize(prompt)
+            if full_tokens[:len(prefix_tokens)] != prefix_tokens:
+                logger.debug(f"Prefix of {cut} chars is not a token boundary for {self.model}, not cached")
+                prefix_tokens = None
+            self._prefixes[prompt[:cut]] = prefix_tokens
+            while len(self._prefixes) > self.prefix_cache_size:
+                self._prefixes.popitem(last=False)
+            return full_tokens
+
+        return tokens + self._runtime.tokenize(prompt[len(base):])
+
+    def stats(self) -> Dict[str, Any]:
+        """Requêtes, lots exécutés et réutilisations de préfixes tokenisés."""
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'avg_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'prefix_hits': self.prefix_hits
+        }
@@ -1,20 +1,38 @@
 """Évaluateur principal pour les modèles via API."""
 
 import asyncio
+import hashlib
 import json
-import os
 import re
 import time
 import logging
-from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
 
 import aiohttp
 
 from tree_evaluator.models import Person
 from tree_evaluator.translations import get_translation
-from .result import EvaluationResult
+from .result import ApiResponse, EvaluationResult
+from .concurrency import ConcurrencyLimiter
+from .conversation import ConversationHistory, ConversationMode
+from .endpoint_pool import Endpoint, EndpointPool
+from .hedging import Hedger
+from .http_pool import HttpPool
+from .local_backend import LocalBackend
+from .output_budget import OutputBudget
+from .rate_limiter import RateLimiterRegistry, estimate_tokens, exhausted_reset, parse_retry_after
+from .sampling import SampleSharer
 from .answer_cleaner import AnswerCleaner
+from .batch_api import create_batch_client
+from .batching import AdaptiveBatcher
 from .prompt_builder import PromptBuilder
+from .request_template import RequestTemplate
+from .retry_policy import CircuitBreakerRegistry, RetryPolicy, classify_error
+from .streaming import StreamAccumulator, iter_sse_data
+from .timeouts import AdaptiveTimeout
+from .transport import AiohttpTransport, Transport, TransportError
 
 logger = logging.getLogger(__name__)
 
@@ -22,65 +40,131 @@ logger = logging.getLogger(__name__)
 class ModelEvaluator:
     """Évaluateur pour un modèle via API OpenAI-compatible."""
     
-    def __init__(self, config: Dict[str, Any]):
+    # Nombre de benchmarks dont le corps de requête pré-encodé est conservé
+    MAX_REQUEST_TEMPLATES = 8
+    # Erreur des questions d'un batch sans réponse lisible (renvoyées seules ensuite)
+    MISSING_ANSWER_ERROR = "Missing or unparseable answer in batch response"
+    
+    def __init__(self,
+                 config: Dict[str, Any],
+                 limiter: Optional[ConcurrencyLimiter] = None,
+                 rate_limiters: Optional[RateLimiterRegistry] = None,
+                 circuit_breakers: Optional[CircuitBreakerRegistry] = None):
         self.name = config['name']
-        self.api_base = config['api_base'].rstrip('/')
-        self.api_key = self._resolve_api_key(config['api_key'])
         self.model = config['model']
         self.temperature = config.get('temperature', 0.0)
         self.max_tokens = config.get('max_tokens', 2000)
         self.language = 'fr'  # Will be set per benchmark
         self.reasoning_config = config.get('reasoning', None)
+        # max_tokens et séquences d'arrêt par requête d'après les réponses attendues
+        self.output_budget = OutputBudget.from_config(config.get('output_budget'), self.max_tokens, self.reasoning_config)
+        # Indices de cache de préfixe (cache_control Anthropic/OpenRouter, prompt_cache_key OpenAI)
+        self.prompt_cache = config.get('prompt_cache', True)
+        # Limites de requêtes simultanées (partagées entre modèles si fournies)
+        self.max_concurrency = config.get('max_concurrency')
+        self.limiter = limiter or ConcurrencyLimiter()
+        # Modèle exécuté dans le processus (llama-cpp-python, transformers) au lieu d'une API
+        self.local = LocalBackend.from_config(config.get('local'), self.model)
+        if self.local:
+            config = dict(config, api_base=config.get('api_base', LocalBackend.API_BASE))
+        # Clés API / points d'accès (limites de débit partagées par hôte et clé API)
+        self.endpoints = EndpointPool.from_config(config, rate_limiters or RateLimiterRegistry())
+        # Le premier point d'accès détermine le format de l'API et sert aux API batch
+        self.api_base = self.endpoints.primary.api_base
+        self.api_key = self.endpoints.primary.api_key
+        self.rate_limiter = self.endpoints.primary.rate_limiter
+        self.max_throttle_retries = config.get('max_throttle_retries', 5)
+        # Tentatives par classe d'erreur et disjoncteur par hôte (partagé entre modèles si fourni)
+        retry_config = config.get('retry') or {}
+        self.retry_policy = RetryPolicy.from_config(retry_config)
+        self.circuit_breakers = circuit_breakers or CircuitBreakerRegistry()
+        self.circuit_breaker_config = retry_config.get('circuit_breaker')
+        # Timeouts par type de question déduits des latences observées (sinon timeout global)
+        self.timeouts = AdaptiveTimeout.from_config(config.get('adaptive_timeout'))
+        # Sortie structurée (schéma JSON) en mode batch : None = selon le fournisseur
+        self.structured_output = config.get('structured_output')
+        # Taille de batch propre au modèle (entier ou 'auto'), prioritaire sur la valeur globale
+        self.batch_size = config.get('batch_size')
+        self.batcher = AdaptiveBatcher.from_config(config.get('batching'), config.get('context_window'), self.max_tokens)
+        # Soumission hors ligne via l'API batch du fournisseur (True ou options)
+        self.batch_api = config.get('batch_api')
+        # Mode conversation : l'arbre en tour d'ouverture, puis une question par tour
+        self.conversation = ConversationMode.from_config(config.get('conversation'))
+        # Transport HTTP : 'aiohttp' (HTTP/1.1) ou 'httpx' (HTTP/2 multiplexé)
+        self.transport = config.get('transport', 'aiohttp')
+        # Réponses en streaming (SSE) : latence du premier token
+        self.stream = config.get('stream', False) and not self.local
+        # Arrêt de la lecture dès la réponse complète : True (marques de fin explicites) ou 'line' (aussi en fin de ligne)
+        self.stream_cutoff = config.get('stream_cutoff', False)
+        # Doublement des requêtes plus lentes qu'un percentile des latences observées
+        self.hedger = Hedger.from_config(config.get('hedging'))
+        # Plusieurs complétions par appel (`n`) partagées entre les runs, activé par enable_multi_sample
+        self.multi_sample = config.get('multi_sample', False)
+        self.sampler: Optional[SampleSharer] = None
         self.cleaner = AnswerCleaner()
         self.prompt_builder = PromptBuilder()
+        # Corps de requêtes pré-encodés par (description, langue, mode)
+        self._request_templates: OrderedDict = OrderedDict()
         
-    def _resolve_api_key(self, key: str) -> str:
-        """Résout les variables d'environnement dans la clé API."""
-        if key.startswith('${') and key.endswith('}'):
-            env_var = key[2:-1]
-            return os.environ.get(env_var, 'none')
-        return key
-    
     async def evaluate_question(self, 
                               tree_description: str,
                               question: Dict[str, Any],
                               session: aiohttp.ClientSession,
                               timeout: int = 60,
                               language: str = 'fr',
-                              max_retries: int = 3) -> EvaluationResult:
-        """Évalue une question unique avec retry automatique."""
+                              max_retries: Optional[int] = None,
+                              history: Optional[ConversationHistory] = None) -> EvaluationResult:
+        """Évalue une question unique avec retry automatique.
+        
+        Les erreurs sont réessayées selon la politique `retry` du modèle
+        (`max_retries` remplace son nombre de tentatives). Avec
+        `adaptive_timeout`, `timeout` ne sert qu'en l'absence de mesures.
+        Avec `history`, la question est posée comme nouveau tour de cette
+        conversation.
+        """
         
         # Mesurer le temps de réponse total
         total_start_time = time.time()
+        total_queue_time = 0.0
         last_error = None
+        max_retries = max_retries or self.retry_policy.max_attempts
+        wait_time = None
         
         # Retry loop
         for attempt in range(max_retries):
             if attempt > 0:
-                # Attendre avant de réessayer (backoff exponentiel)
-                wait_time = 2 ** attempt
-                logger.info(f"Retry {attempt}/{max_retries} for {self.name} - Question {question['id']} after {wait_time}s wait")
+                # Attendre avant de réessayer (jitter décorrélé)
+                wait_time = self.retry_policy.next_delay(wait_time)
+                logger.info(f"Retry {attempt}/{max_retries} for {self.name} - Question {question['id']} after {wait_time:.1f}s wait")
                 await asyncio.sleep(wait_time)
             
             try:
+                attempt_timeout = self.timeouts.timeout_for(question.get('type'), timeout) if self.timeouts else timeout
                 result = await self._evaluate_question_single_attempt(
-                    tree_description, question, session, timeout, language, total_start_time
+                    tree_description, question, session, attempt_timeout, language, total_start_time, history,
+                    shared=attempt == 0
                 )
+                result.timeout = attempt_timeout
+                # L'attente en file n'est pas comptée dans le temps de réponse
+                total_start_time += result.queue_time
+                total_queue_time += result.queue_time
+                result.queue_time = total_queue_time
                 
-                # Si la réponse est valide ou si c'est la dernière tentative, retourner
-                if not result.no_response or attempt == max_retries - 1:
-                    if attempt > 0 and not result.no_response:
+                # Si la réponse est valide ou l'erreur non réessayable, retourner
+                error_class = classify_error(result.error, result.no_response)
+                if not self.retry_policy.should_retry(error_class, attempt, max_retries):
+                    if attempt > 0 and error_class is None:
                         logger.info(f"Success after {attempt + 1} attempts for {self.name} - Question {question['id']}")
                     return result
                 
                 # Sinon, continuer avec la prochaine tentative
-                logger.warning(f"Empty response on attempt {attempt + 1}/{max_retries} for {self.name} - Question {question['id']}")
+                logger.warning(f"{error_class.capitalize()} error on attempt {attempt + 1}/{max_retries} for {self.name} - Question {question['id']}")
                 last_error = result
                 
             except Exception as e:
                 logger.error(f"Exception on attempt {attempt + 1}/{max_retries} for {self.name} - Question {question['id']}: {str(e)}")
                 last_error = e
-                if attempt == max_retries - 1:
+                if not self.retry_policy.should_retry(classify_error(str(e)), attempt, max_retries):
                     return self._create_error_result(question, str(e), time.time() - total_start_time)
         
         # Si on arrive ici, toutes les tentatives ont échoué
@@ -95,109 +179,88 @@ class ModelEvaluator:
                                                session: aiohttp.ClientSession,
                                                timeout: int,
                                                language: str,
-                                               total_start_time: float) -> EvaluationResult:
-        """Évalue une question unique - une seule tentative."""
+                                               total_start_time: float,
+                                               history: Optional[ConversationHistory] = None,
+                                               shared: bool = True) -> EvaluationResult:
+        """Évalue une question unique - une seule tentative (`shared` : voir `_send`)."""
         
-        # Construire le prompt
-        prompt = self.prompt_builder.build_single_question_prompt(
-            tree_description, question['question'], language
-        )
+        # Seule la partie propre à la question est construite ; le préfixe est déjà encodé
+        prompt_suffix = self.prompt_builder.build_single_question_suffix(question['question'], language)
         
-        # Mesurer le temps de réponse
-        start_time = time.time()
+        queue_time = 0.0
         
         try:
-            # Faire l'appel API
-            headers = {
-                "Content-Type": "application/json",
-            }
-            
-            if self.api_key != "none":
-                headers["Authorization"] = f"Bearer {self.api_key}"
-            
             # Adapter le format selon le type d'API
-            data = self._build_api_request(prompt, language, batch=False)
-            url = self._get_api_url()
+            if history is not None:
+                template = self._get_conversation_template(tree_description, language)
+            else:
+                template = self._get_request_template(tree_description, language, batch=False, stream=self.stream)
+            values = self._slot_values(template, [question], prompt_suffix, batch=False)
+            if history is not None:
+                values['turns'] = history.encode(prompt_suffix)
+            body = template.render(**values)
             
             # Log de la requête envoyée
-            logger.debug(f"Sending request to {url} for {self.name}")
-            logger.debug(f"Request data: {json.dumps(data, indent=2)}")
+            logger.debug(f"Sending request for {self.name} ({len(body)} bytes) - Question {question['id']}")
             
-            async with session.post(url, json=data, headers=headers, timeout=timeout) as response:
-                response_time = time.time() - start_time
-                
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(f"API Error {response.status} for {self.name}: {error_text}")
-                    return self._create_error_result(
-                        question, f"API Error {response.status}: {error_text}", response_time
-                    )
-                
-                result = await response.json()
-                
-                # Log de debug pour les réponses API
-                logger.debug(f"API Response for {self.name} - Question {question['id']}: {json.dumps(result, indent=2) if result else 'None'}")
-                
-                # Vérifier que result n'est pas None
-                if result is None:
-                    return self._create_error_result(
-                        question, "Empty response from API", response_time, no_response=True
-                    )
-                
-                # Extraire la réponse selon le format
-                model_answer, tokens_used, reasoning_tokens, reasoning_text = self._extract_api_response(result)
-                
-                # Nettoyer la réponse
-                model_answer = self.cleaner.clean_answer(model_answer, language)
-                
-                # Log si la réponse est vide ou très courte
-                if not model_answer or len(model_answer) < 2:
-                    logger.warning(f"Empty or very short answer from {self.name} for question {question['id']}: '{model_answer}'")
-                    if reasoning_text:
-                        logger.debug(f"Reasoning text was: {reasoning_text[:500]}...")
-                
-                # Détecter les non-réponses
-                no_response = self.cleaner.is_no_response(model_answer)
-                
-                # Évaluer la réponse
-                if no_response:
-                    is_exact_match = False
-                    partial_score = 0.0
-                    is_correct = False
+            response = await self._send(session, body, timeout, shared=shared)
+            queue_time = response.queue_time
+            self._observe_latency(question.get('type'), response)
+            
+            if response.error:
+                if response.status == 0:
+                    logger.error(f"{response.error} after {response.response_time:.1f}s for {self.name} on question {question['id']}")
                 else:
-                    is_exact_match = self.cleaner.check_exact_match(model_answer, question['answer'])
-                    partial_score = self.cleaner.calculate_partial_match(model_answer, question['answer'])
-                    is_correct = is_exact_match or partial_score >= 0.9
-                
-                # Calculer le temps total depuis le début (incluant les retries)
-                total_response_time = time.time() - total_start_time
-                
-                return EvaluationResult(
-                    model_name=self.name,
-                    benchmark_name="",
-                    question_id=question['id'],
-                    question=question['question'],
-                    expected_answer=question['answer'],
-                    model_answer=model_answer,
-                    is_correct=is_correct,
-                    is_exact_match=is_exact_match,
-                    partial_match_score=partial_score,
-                    response_time=total_response_time,
-                    tokens_used=tokens_used,
-                    no_response=no_response,
-                    reasoning_tokens=reasoning_tokens,
-                    reasoning_text=reasoning_text,
-                    question_type=question.get('type'),
-                    is_enigma=question.get('type') == 'enigme',
-                    enigma_complexity=question.get('complexity') if question.get('type') == 'enigme' else None
+                    logger.error(f"API Error {response.status} for {self.name}: {response.error}")
+                return self._create_error_result(
+                    question, response.error, time.time() - total_start_time - queue_time, queue_time=queue_time
                 )
-                
-        except asyncio.TimeoutError:
-            logger.error(f"Timeout after {timeout}s for {self.name} on question {question['id']}")
-            return self._create_error_result(question, "Timeout", time.time() - total_start_time)
+            
+            result = response.data
+            
+            # Log de debug pour les réponses API
+            logger.debug(f"API Response for {self.name} - Question {question['id']}: {json.dumps(result, indent=2) if result else 'None'}")
+            
+            # Vérifier que result n'est pas None
+            if result is None:
+                return self._create_error_result(
+                    question, "Empty response from API", response.response_time, no_response=True, queue_time=queue_time
+                )
+            
+            # Calculer le temps total depuis le début (incluant les retries, hors file d'attente)
+            total_response_time = time.time() - total_start_time - queue_time
+            
+            result = self._result_from_response(question, result, language, total_response_time, queue_time)
+            return self._apply_stream_metrics([result], response)[0]
+            
         except Exception as e:
             logger.error(f"Exception for {self.name} on question {question['id']}: {str(e)}", exc_info=True)
-            return self._create_error_result(question, str(e), time.time() - total_start_time)
+            return self._create_error_result(question, str(e), time.time() - total_start_time - queue_time, queue_time=queue_time)
+    
+    async def evaluate_conversation(self,
+                                    tree_description: str,
+                                    questions: List[Dict[str, Any]],
+                                    session: aiohttp.ClientSession,
+                                    timeout: int = 60,
+                                    language: str = 'fr',
+                                    on_result: Optional[Callable[[EvaluationResult], None]] = None) -> List[EvaluationResult]:
+        """Pose les questions l'une après l'autre dans une même conversation.
+        
+        La description de l'arbre n'est envoyée qu'au tour d'ouverture ; chaque
+        question est ensuite un tour utilisateur, notée comme en mode question
+        unique. Les tours en erreur ou sans réponse ne sont pas ajoutés à
+        l'historique.
+        """
+        history = self.conversation.new_history()
+        results = []
+        for question in questions:
+            result = await self.evaluate_question(tree_description, question, session, timeout, language, history=history)
+            if not result.error and result.model_answer:
+                history.add(self.prompt_builder.build_single_question_suffix(question['question'], language), result.model_answer)
+            results.append(result)
+            if on_result:
+                on_result(result)
+        return results
     
     async def evaluate_questions_batch(self,
                                      tree_description: str,
@@ -205,56 +268,112 @@ class ModelEvaluator:
                                      session: aiohttp.ClientSession,
                                      timeout: int = 60,
                                      language: str = 'fr',
-                                     max_retries: int = 3) -> List[EvaluationResult]:
-        """Évalue un batch de questions en une seule requête avec retry automatique."""
+                                     max_retries: Optional[int] = None) -> List[EvaluationResult]:
+        """Évalue un batch de questions en une seule requête avec reprise partielle.
+        
+        Les réponses lues et alignées sont conservées : seules les questions
+        restées sans réponse exploitable sont renvoyées. Si le modèle échoue
+        plusieurs fois de suite à répondre à un groupe de questions, celui-ci
+        est coupé en deux moitiés évaluées séparément. Les erreurs sont
+        réessayées selon la politique `retry` du modèle.
+        """
+        results: List[Optional[EvaluationResult]] = [None] * len(questions)
+        await self._evaluate_batch_group(
+            tree_description, questions, list(range(len(questions))), results,
+            session, timeout, language, max_retries or self.retry_policy.max_attempts
+        )
+        return results
+    
+    async def _evaluate_batch_group(self,
+                                    tree_description: str,
+                                    questions: List[Dict[str, Any]],
+                                    indexes: List[int],
+                                    results: List[Optional[EvaluationResult]],
+                                    session: aiohttp.ClientSession,
+                                    timeout: int,
+                                    language: str,
+                                    max_retries: int,
+                                    shared: bool = True):
+        """Évalue les questions `indexes` du batch et range leurs résultats dans `results`.
+
+        Seule la première tentative peut reprendre une complétion partagée
+        (`shared`) ; les renvois et les moitiés d'un batch découpé envoient
+        leur propre requête.
+        """
         
         # Mesurer le temps de réponse total
         total_start_time = time.time()
-        last_error = None
+        total_queue_time = 0.0
+        pending = indexes
+        failures = 0
+        wait_time = None
         
-        # Retry loop
-        for attempt in range(max_retries):
-            if attempt > 0:
-                # Attendre avant de réessayer (backoff exponentiel)
-                wait_time = 2 ** attempt
-                logger.info(f"Retry {attempt}/{max_retries} for {self.name} - Batch of {len(questions)} questions after {wait_time}s wait")
-                await asyncio.sleep(wait_time)
+        while True:
+            attempt_start = time.time()
+            attempt_timeout = self.timeouts.timeout_for('batch', timeout, scale=len(pending)) if self.timeouts else timeout
+            attempt_results = await self._evaluate_questions_batch_single_attempt(
+                tree_description, [questions[i] for i in pending], session, attempt_timeout, language, total_start_time,
+                shared=shared
+            )
+            shared = False
+            # L'attente en file n'est pas comptée dans le temps de réponse
+            attempt_queue_time = attempt_results[0].queue_time
+            attempt_latency = time.time() - attempt_start - attempt_queue_time
+            total_start_time += attempt_queue_time
+            total_queue_time += attempt_queue_time
             
-            try:
-                results = await self._evaluate_questions_batch_single_attempt(
-                    tree_description, questions, session, timeout, language, total_start_time
-                )
-                
-                # Vérifier si toutes les réponses sont vides
-                all_empty = all(r.no_response for r in results)
-                
-                # Si au moins une réponse est valide ou si c'est la dernière tentative, retourner
-                if not all_empty or attempt == max_retries - 1:
-                    if attempt > 0 and not all_empty:
-                        logger.info(f"Success after {attempt + 1} attempts for {self.name} - Batch of {len(questions)} questions")
-                    return results
-                
-                # Sinon, continuer avec la prochaine tentative
-                logger.warning(f"All responses empty on attempt {attempt + 1}/{max_retries} for {self.name} - Batch of {len(questions)} questions")
-                last_error = results
-                
-            except Exception as e:
-                logger.error(f"Exception on attempt {attempt + 1}/{max_retries} for {self.name} - Batch: {str(e)}")
-                last_error = e
-                if attempt == max_retries - 1:
-                    # Retourner des erreurs pour toutes les questions
-                    return [self._create_error_result(
-                        q, str(e), (time.time() - total_start_time) / len(questions)
-                    ) for q in questions]
-        
-        # Si on arrive ici, toutes les tentatives ont échoué
-        logger.error(f"All {max_retries} attempts failed for {self.name} - Batch of {len(questions)} questions")
-        if isinstance(last_error, list):
-            return last_error
-        # Retourner des erreurs pour toutes les questions
-        return [self._create_error_result(
-            q, "All retry attempts failed", (time.time() - total_start_time) / len(questions)
-        ) for q in questions]
+            unanswered = []
+            for index, result in zip(pending, attempt_results):
+                result.queue_time = total_queue_time
+                result.timeout = attempt_timeout
+                results[index] = result
+                if result.error:
+                    unanswered.append(index)
+                else:
+                    self.batcher.observe_answer(result.question_type, result.model_answer)
+            
+            # Les réponses illisibles et les expirations indiquent un batch trop grand
+            missing = sum(1 for i in unanswered if results[i].error == self.MISSING_ANSWER_ERROR)
+            timed_out = any(results[i].error == "Timeout" for i in unanswered)
+            if missing or timed_out or not unanswered:
+                self.batcher.record(len(pending), missing, attempt_latency, timed_out)
+            
+            if not unanswered:
+                if failures > 0:
+                    logger.info(f"Success after {failures + 1} attempts for {self.name} - Batch of {len(pending)} questions")
+                return
+            
+            if len(unanswered) < len(pending):
+                # Réponses partielles : ne renvoyer que les questions manquantes
+                logger.info(f"Resending {len(unanswered)}/{len(pending)} unanswered questions for {self.name}")
+                pending = unanswered
+                failures = 0
+                continue
+            
+            failures += 1
+            # Une réponse reçue mais inexploitable justifie de réduire le batch ;
+            # une erreur API ou réseau est simplement réessayée
+            if missing and len(pending) > 1 and failures >= min(2, max_retries):
+                middle = len(pending) // 2
+                logger.warning(f"Splitting batch of {len(pending)} questions for {self.name} after {failures} failed attempts")
+                await asyncio.gather(*(
+                    self._evaluate_batch_group(
+                        tree_description, questions, half, results, session, timeout, language, max_retries,
+                        shared=False
+                    )
+                    for half in (pending[:middle], pending[middle:])
+                ))
+                return
+            
+            error_classes = {classify_error(results[i].error, results[i].no_response) for i in unanswered}
+            if not any(self.retry_policy.should_retry(error_class, failures - 1, max_retries) for error_class in error_classes):
+                logger.error(f"Giving up after {failures} attempts for {self.name} - Batch of {len(pending)} questions ({', '.join(sorted(error_classes))})")
+                return
+            
+            # Attendre avant de réessayer (jitter décorrélé)
+            wait_time = self.retry_policy.next_delay(wait_time)
+            logger.info(f"Retry {failures}/{max_retries} for {self.name} - Batch of {len(pending)} questions after {wait_time:.1f}s wait")
+            await asyncio.sleep(wait_time)
     
     async def _evaluate_questions_batch_single_attempt(self,
                                                      tree_description: str,
@@ -262,156 +381,733 @@ class ModelEvaluator:
                                                      session: aiohttp.ClientSession,
                                                      timeout: int,
                                                      language: str,
-                                                     total_start_time: float) -> List[EvaluationResult]:
-        """Évalue un batch de questions en une seule requête - une seule tentative."""
+                                                     total_start_time: float,
+                                                     shared: bool = True) -> List[EvaluationResult]:
+        """Évalue un batch de questions en une seule requête - une seule tentative (`shared` : voir `_send`)."""
         
-        # Construire le prompt pour plusieurs questions
-        prompt = self.prompt_builder.build_batch_prompt(tree_description, questions, language)
+        # Seule la liste des questions est construite ; le préfixe est déjà encodé
+        prompt_suffix = self.prompt_builder.build_batch_suffix(questions, language)
         
-        # Mesurer le temps de réponse
-        start_time = time.time()
+        queue_time = 0.0
         
         try:
-            # Faire l'appel API
-            headers = {
-                "Content-Type": "application/json",
-            }
-            
-            if self.api_key != "none":
-                headers["Authorization"] = f"Bearer {self.api_key}"
-            
             # Adapter le format selon le type d'API
-            data = self._build_api_request(prompt, language, batch=True)
-            url = self._get_api_url()
+            template = self._get_request_template(tree_description, language, batch=True, stream=self.stream)
+            body = template.render(**self._slot_values(template, questions, prompt_suffix, batch=True))
             
             # Log de la requête envoyée
-            logger.debug(f"Sending request to {url} for {self.name}")
-            logger.debug(f"Request data: {json.dumps(data, indent=2)}")
+            logger.debug(f"Sending request for {self.name} ({len(body)} bytes) - Batch of {len(questions)} questions")
             
-            async with session.post(url, json=data, headers=headers, timeout=timeout) as response:
-                response_time = time.time() - start_time
-                
-                if response.status != 200:
-                    error_text = await response.text()
-                    # Retourner des erreurs pour toutes les questions du batch
-                    return [self._create_error_result(
-                        q, f"API Error {response.status}: {error_text}", 
-                        (time.time() - total_start_time) / len(questions)
-                    ) for q in questions]
-                
-                result = await response.json()
-                
-                # Vérifier que result n'est pas None
-                if result is None:
-                    return [self._create_error_result(
-                        q, "Empty response from API", response_time, no_response=True
-                    ) for q in questions]
-                
-                # Extraire la réponse selon le format
-                model_response, tokens_used, reasoning_tokens, reasoning_text = self._extract_api_response(result)
-                
-                # Parser la réponse JSON
-                try:
-                    # Extraire le JSON de la réponse
-                    json_match = re.search(r'\[.*\]', model_response, re.DOTALL)
-                    if json_match:
-                        answers = json.loads(json_match.group())
-                    else:
-                        answers = json.loads(model_response)
-                    
-                    # S'assurer qu'on a le bon nombre de réponses
-                    if len(answers) != len(questions):
-                        answers = answers[:len(questions)] + [''] * (len(questions) - len(answers))
-                    
-                except:
-                    # Si le parsing échoue, retourner des non-réponses
-                    answers = [''] * len(questions)
-                
-                # Créer les résultats pour chaque question
-                results = []
-                for i, (question, answer) in enumerate(zip(questions, answers)):
-                    # Nettoyer la réponse
-                    model_answer = self.cleaner.clean_answer(str(answer), language)
-                    
-                    # Détecter les non-réponses
-                    no_response = self.cleaner.is_no_response(model_answer)
-                    
-                    # Évaluer la réponse
-                    if no_response:
-                        is_exact_match = False
-                        partial_score = 0.0
-                        is_correct = False
-                    else:
-                        is_exact_match = self.cleaner.check_exact_match(model_answer, question['answer'])
-                        partial_score = self.cleaner.calculate_partial_match(model_answer, question['answer'])
-                        is_correct = is_exact_match or partial_score >= 0.9
-                    
-                    results.append(EvaluationResult(
-                        model_name=self.name,
-                        benchmark_name="",
-                        question_id=question['id'],
-                        question=question['question'],
-                        expected_answer=question['answer'],
-                        model_answer=model_answer,
-                        is_correct=is_correct,
-                        is_exact_match=is_exact_match,
-                        partial_match_score=partial_score,
-                        response_time=(time.time() - total_start_time) / len(questions),  # Temps moyen par question
-                        tokens_used=tokens_used // len(questions),  # Tokens moyens par question
-                        no_response=no_response,
-                        reasoning_tokens=reasoning_tokens // len(questions) if reasoning_tokens > 0 else 0,
-                        reasoning_text=reasoning_text,  # Partagé entre toutes les questions du batch
-                        question_type=question.get('type'),
-                        is_enigma=question.get('type') == 'enigme',
-                        enigma_complexity=question.get('complexity') if question.get('type') == 'enigme' else None
-                    ))
-                
-                return results
-                
-        except asyncio.TimeoutError:
-            return [self._create_error_result(
-                q, "Timeout", (time.time() - total_start_time) / len(questions)
-            ) for q in questions]
+            response = await self._send(session, body, timeout, answer_count=len(questions), shared=shared)
+            queue_time = response.queue_time
+            self._observe_latency('batch', response, scale=len(questions))
+            
+            if response.error:
+                # Retourner des erreurs pour toutes les questions du batch
+                return [self._create_error_result(
+                    q, response.error,
+                    (time.time() - total_start_time - queue_time) / len(questions),
+                    queue_time=queue_time
+                ) for q in questions]
+            
+            result = response.data
+            
+            # Vérifier que result n'est pas None
+            if result is None:
+                return [self._create_error_result(
+                    q, "Empty response from API", response.response_time, no_response=True, queue_time=queue_time
+                ) for q in questions]
+            
+            # Temps moyen par question
+            response_time = (time.time() - total_start_time - queue_time) / len(questions)
+            results = self._batch_results_from_response(questions, result, language, response_time, queue_time)
+            return self._apply_stream_metrics(results, response)
             
         except Exception as e:
             return [self._create_error_result(
-                q, str(e), (time.time() - total_start_time) / len(questions)
+                q, str(e), (time.time() - total_start_time - queue_time) / len(questions), queue_time=queue_time
             ) for q in questions]
     
-    def _build_api_request(self, prompt: str, language: str, batch: bool = False) -> Dict[str, Any]:
-        """Construit la requête API selon le type d'API."""
+    async def evaluate_offline(self,
+                               tree_description: str,
+                               batches: List[List[Dict[str, Any]]],
+                               session: aiohttp.ClientSession,
+                               language: str = 'fr',
+                               batch_prompt: bool = False,
+                               job_name: str = "run") -> List[EvaluationResult]:
+        """Évalue un run complet via l'API batch du fournisseur.
+        
+        Chaque groupe de `batches` devient une requête du fichier de batch
+        (prompt batch si `batch_prompt`, sinon une question par requête).
+        Les réponses passent par le même nettoyage et la même notation qu'en
+        mode synchrone ; le temps de réponse n'est pas mesuré dans ce mode.
+        """
+        options = self.batch_api if isinstance(self.batch_api, dict) else {}
+        client = create_batch_client(self.api_base, self._get_headers(), self.api_key, options)
+        
+        lines = []
+        for index, group in enumerate(batches):
+            if batch_prompt:
+                template = self._get_request_template(tree_description, language, batch=True)
+                prompt_suffix = self.prompt_builder.build_batch_suffix(group, language)
+            else:
+                template = self._get_request_template(tree_description, language, batch=False)
+                prompt_suffix = self.prompt_builder.build_single_question_suffix(group[0]['question'], language)
+            lines.append(client.request_line(f"request-{index}", template.render(**self._slot_values(template, group, prompt_suffix, batch_prompt))))
+        
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', f"{self.name}_{job_name}")
+        path = Path(options.get('dir', 'evaluation_results/batch_api')) / f"{safe_name}.jsonl"
+        
+        try:
+            responses = await client.run(session, lines, path)
+        except Exception as e:
+            logger.error(f"Batch API submission failed for {self.name} ({job_name}): {str(e)}")
+            return [self._create_error_result(q, str(e), 0.0) for group in batches for q in group]
+        
+        results = []
+        for index, group in enumerate(batches):
+            data, error = responses.get(f"request-{index}", (None, "Missing from batch results"))
+            if error or data is None:
+                results.extend(self._create_error_result(q, error or "Empty response from API", 0.0, no_response=data is None) for q in group)
+            elif batch_prompt:
+                results.extend(self._batch_results_from_response(group, data, language, 0.0))
+            else:
+                results.append(self._result_from_response(group[0], data, language, 0.0))
+        return results
+    
+    def _observe_latency(self, kind: str, response: ApiResponse, scale: int = 1):
+        """Alimente les timeouts adaptatifs avec la durée d'une requête réussie ou expirée."""
+        if self.timeouts and (not response.error or response.error == "Timeout"):
+            self.timeouts.observe(kind, response.response_time, scale)
+    
+    def _slot_values(self, template: RequestTemplate, questions: List[Dict[str, Any]], prompt_suffix: str, batch: bool) -> Dict[str, Any]:
+        """Valeurs des emplacements du modèle de requête pour ces questions."""
+        values: Dict[str, Any] = {'prompt_suffix': prompt_suffix}
+        if 'response_format' in template.slot_names:
+            values['response_format'] = self._batch_response_format(len(questions))
+        if 'max_tokens' in template.slot_names:
+            values['max_tokens'] = self.output_budget.tokens_for(questions, batch)
+        return values
+    
+    @staticmethod
+    def _apply_stream_metrics(results: List[EvaluationResult], response: ApiResponse) -> List[EvaluationResult]:
+        """Reporte les mesures du flux (mode streaming) sur les résultats d'une requête."""
+        for result in results:
+            result.time_to_first_token = response.time_to_first_token
+            result.time_to_first_answer_token = response.time_to_first_answer_token
+            result.tokens_per_second = response.tokens_per_second
+        return results
+    
+    def _result_from_response(self,
+                              question: Dict[str, Any],
+                              result: Dict[str, Any],
+                              language: str,
+                              response_time: float,
+                              queue_time: float = 0.0) -> EvaluationResult:
+        """Nettoie et note la réponse de l'API à une question unique."""
+        # Extraire la réponse selon le format
+        model_answer, tokens_used, reasoning_tokens, reasoning_text = self._extract_api_response(result)
+        prompt_tokens, cached_tokens = self._extract_cache_usage(result)
+        
+        # Nettoyer la réponse
+        model_answer = self.cleaner.clean_answer(model_answer, language)
+        
+        # Log si la réponse est vide ou très courte
+        if not model_answer or len(model_answer) < 2:
+            logger.warning(f"Empty or very short answer from {self.name} for question {question['id']}: '{model_answer}'")
+            if reasoning_text:
+                logger.debug(f"Reasoning text was: {reasoning_text[:500]}...")
+        
+        # Détecter les non-réponses
+        no_response = self.cleaner.is_no_response(model_answer)
+        
+        # Évaluer la réponse
+        if no_response:
+            is_exact_match = False
+            partial_score = 0.0
+            is_correct = False
+        else:
+            is_exact_match = self.cleaner.check_exact_match(model_answer, question['answer'])
+            partial_score = self.cleaner.calculate_partial_match(model_answer, question['answer'])
+            is_correct = is_exact_match or partial_score >= 0.9
+        
+        return EvaluationResult(
+            model_name=self.name,
+            benchmark_name="",
+            question_id=question['id'],
+            question=question['question'],
+            expected_answer=question['answer'],
+            model_answer=model_answer,
+            is_correct=is_correct,
+            is_exact_match=is_exact_match,
+            partial_match_score=partial_score,
+            response_time=response_time,
+            tokens_used=tokens_used,
+            no_response=no_response,
+            reasoning_tokens=reasoning_tokens,
+            reasoning_text=reasoning_text,
+            prompt_tokens=prompt_tokens,
+            cached_tokens=cached_tokens,
+            queue_time=queue_time,
+            question_type=question.get('type'),
+            is_enigma=question.get('type') == 'enigme',
+            enigma_complexity=question.get('complexity') if question.get('type') == 'enigme' else None
+        )
+    
+    def _batch_results_from_response(self,
+                                     questions: List[Dict[str, Any]],
+                                     result: Dict[str, Any],
+                                     language: str,
+                                     response_time: float,
+                                     queue_time: float = 0.0) -> List[EvaluationResult]:
+        """Découpe, nettoie et note la réponse de l'API à un batch de questions.
+        
+        Les questions sans réponse lisible reçoivent l'erreur `MISSING_ANSWER_ERROR`.
+        """
+        # Extraire la réponse selon le format
+        model_response, tokens_used, reasoning_tokens, reasoning_text = self._extract_api_response(result)
+        prompt_tokens, cached_tokens = self._extract_cache_usage(result)
+        
+        # Parser la réponse JSON (None pour chaque réponse manquante ou illisible)
+        answers = self.cleaner.parse_batch_answers(model_response, len(questions))
+        
+        # Créer les résultats pour chaque question
+        results = []
+        for i, (question, answer) in enumerate(zip(questions, answers)):
+            if answer is None:
+                results.append(self._create_error_result(
+                    question, self.MISSING_ANSWER_ERROR, response_time,
+                    no_response=True, queue_time=queue_time
+                ))
+                continue
+            
+            # Nettoyer la réponse
+            model_answer = self.cleaner.clean_answer(str(answer), language)
+            
+            # Détecter les non-réponses
+            no_response = self.cleaner.is_no_response(model_answer)
+            
+            # Évaluer la réponse
+            if no_response:
+                is_exact_match = False
+                partial_score = 0.0
+                is_correct = False
+            else:
+                is_exact_match = self.cleaner.check_exact_match(model_answer, question['answer'])
+                partial_score = self.cleaner.calculate_partial_match(model_answer, question['answer'])
+                is_correct = is_exact_match or partial_score >= 0.9
+            
+            results.append(EvaluationResult(
+                model_name=self.name,
+                benchmark_name="",
+                question_id=question['id'],
+                question=question['question'],
+                expected_answer=question['answer'],
+                model_answer=model_answer,
+                is_correct=is_correct,
+                is_exact_match=is_exact_match,
+                partial_match_score=partial_score,
+                response_time=response_time,  # Temps moyen par question
+                tokens_used=tokens_used // len(questions),  # Tokens moyens par question
+                no_response=no_response,
+                reasoning_tokens=reasoning_tokens // len(questions) if reasoning_tokens > 0 else 0,
+                reasoning_text=reasoning_text,  # Partagé entre toutes les questions du batch
+                prompt_tokens=prompt_tokens // len(questions),
+                cached_tokens=cached_tokens // len(questions),
+                queue_time=queue_time,
+                question_type=question.get('type'),
+                is_enigma=question.get('type') == 'enigme',
+                enigma_complexity=question.get('complexity') if question.get('type') == 'enigme' else None
+            ))
+        
+        return results
+    
+    def _build_api_request(self, prompt_prefix: str, prompt_suffix: str, language: str, batch: bool = False, stream: bool = False) -> Dict[str, Any]:
+        """Construit la requête API selon le type d'API.
+        
+        Le préfixe commun (description de l'arbre) est toujours placé en tête
+        du message utilisateur, juste après le prompt système, pour que toutes
+        les requêtes d'un benchmark partagent le même préfixe.
+        """
+        content = self._build_user_content(prompt_prefix, prompt_suffix)
+        
         if "anthropic" in self.api_base:
             # Format Anthropic
-            return {
+            data = {
                 "model": self.model,
-                "messages": [{"role": "user", "content": prompt}],
+                "messages": [{"role": "user", "content": content}],
                 "temperature": self.temperature,
                 "max_completion_tokens": self.max_tokens
             }
+            if self.output_budget:
+                data["max_completion_tokens"] = RequestTemplate.slot('max_tokens')
+                # Anthropic refuse les séquences d'arrêt faites uniquement d'espaces
+                stop = [sequence for sequence in self.output_budget.stop_for(batch) if sequence.strip()]
+                if stop:
+                    data["stop_sequences"] = stop
+            if stream:
+                data["stream"] = True
+            return data
         else:
             # Format OpenAI
             data = {
                 "model": self.model,
                 "messages": [
                     {"role": "system", "content": self.prompt_builder.get_system_prompt(language, batch)},
-                    {"role": "user", "content": prompt}
+                    {"role": "user", "content": content}
                 ],
                 "temperature": self.temperature,
                 "max_tokens": self.max_tokens
             }
             
+            # Limite de sortie propre à chaque requête
+            if self.output_budget:
+                data["max_tokens"] = RequestTemplate.slot('max_tokens')
+                stop = self.output_budget.stop_for(batch)
+                if stop:
+                    data["stop"] = stop
+            
             # Ajouter la configuration de reasoning si présente
             if self.reasoning_config and "openrouter" in self.api_base:
                 data["reasoning"] = self.reasoning_config
             
+            # OpenAI met en cache automatiquement les préfixes identiques ;
+            # la clé de cache regroupe les requêtes d'un même benchmark sur le même serveur
+            if self.prompt_cache and "api.openai.com" in self.api_base:
+                data["prompt_cache_key"] = hashlib.sha256(prompt_prefix.encode('utf-8')).hexdigest()[:32]
+            
+            # Le schéma dépend du nombre de questions : il est inséré à chaque requête
+            if batch and self._supports_structured_output():
+                data["response_format"] = RequestTemplate.slot('response_format')
+            
+            # L'usage n'est envoyé dans le flux que sur demande
+            if stream:
+                data["stream"] = True
+                data["stream_options"] = {"include_usage": True}
+            
             return data
     
-    def _get_api_url(self) -> str:
+    def _get_headers(self, api_key: Optional[str] = None) -> Dict[str, str]:
+        """Retourne les en-têtes HTTP de la requête (clé du point d'accès choisi, sinon la principale)."""
+        api_key = api_key or self.api_key
+        headers = {
+            "Content-Type": "application/json",
+        }
+        
+        if api_key != "none":
+            headers["Authorization"] = f"Bearer {api_key}"
+        return headers
+    
+    def enable_multi_sample(self, samples: int) -> bool:
+        """Demande `samples` complétions par requête, une par run (option `multi_sample`).
+        
+        Réservé aux runs qui posent les mêmes questions : chaque run reçoit
+        une des complétions et la note séparément. Sans effet pour les API
+        sans paramètre `n` (Anthropic) et en streaming.
+        """
+        if not self.multi_sample or samples < 2 or self.stream or "anthropic" in self.api_base:
+            return False
+        self.sampler = SampleSharer(samples)
+        logger.info(f"Requesting {samples} completions per call for {self.name}")
+        return True
+    
+    async def _send(self, session: aiohttp.ClientSession, body: bytes, timeout: int, answer_count: Optional[int] = None,
+                    shared: bool = True) -> ApiResponse:
+        """Envoie la requête, ou reprend une complétion déjà reçue pour un autre run.
+
+        Une nouvelle tentative (`shared` faux) envoie toujours sa propre
+        requête : le même corps reprendrait sinon la complétion réservée à un
+        autre run.
+        """
+        if self.sampler is None or not shared:
+            return await self._send_with_hedging(session, body, timeout, answer_count)
+        return await self.sampler.send(body, lambda sampled: self._send_with_hedging(session, sampled, timeout, answer_count))
+    
+    async def _send_with_hedging(self, session: aiohttp.ClientSession, body: bytes, timeout: int, answer_count: Optional[int] = None) -> ApiResponse:
+        """Envoie la requête et la double si elle tarde (option `hedging` du modèle).
+        
+        Le délai court à partir de l'envoi effectif (après les files d'attente
+        des limiteurs). Le doublon passe par les mêmes limites et, choisi
+        par le pool de points d'accès, part de préférence vers un autre point
+        d'accès. La première réponse sans erreur est retenue, l'autre requête
+        est annulée.
+        """
+        if self.hedger is None:
+            return await self._send_request(session, body, timeout, answer_count)
+        
+        self.hedger.requests += 1
+        start_time = time.time()
+        sent = asyncio.Event()
+        primary = asyncio.ensure_future(self._send_request(session, body, timeout, answer_count, sent))
+        tasks = {primary}
+        hedge = None
+        sent_time = None
+        try:
+            delay = self.hedger.delay(answer_count)
+            if delay is not None:
+                sent_waiter = asyncio.ensure_future(sent.wait())
+                try:
+                    await asyncio.wait({primary, sent_waiter}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    sent_waiter.cancel()
+                sent_time = time.time()
+                if not primary.done():
+                    done, _ = await asyncio.wait({primary}, timeout=delay)
+                    if not done and self.hedger.try_hedge():
+                        logger.debug(f"Hedging request for {self.name} after {delay:.2f}s")
+                        hedge = asyncio.ensure_future(self._send_request(session, body, timeout, answer_count))
+                        tasks.add(hedge)
+            
+            response = None
+            winner = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if response is None or (response.error and not task.result().error):
+                        response, winner = task.result(), task
+                if not response.error:
+                    break
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        
+        if winner is hedge:
+            self.hedger.hedge_wins += 1
+            # L'attente en file est celle de la requête d'origine
+            response.queue_time = sent_time - start_time
+        if not response.error:
+            self.hedger.observe(answer_count, response.response_time)
+        return response
+    
+    async def _send_request(self,
+                            session: aiohttp.ClientSession,
+                            body: bytes,
+                            timeout: int,
+                            answer_count: Optional[int] = None,
+                            sent: Optional[asyncio.Event] = None) -> ApiResponse:
+        """Envoie un corps de requête déjà encodé en respectant les limites du fournisseur.
+        
+        Le point d'accès (clé API, URL) est choisi par le pool du modèle. La
+        requête attend ensuite l'autorisation de son limiteur de débit (pause
+        après 429, RPM, TPM estimés depuis la taille du corps) puis une place
+        de concurrence. Une réponse 429 est renvoyée, sans compter comme une
+        tentative, sur un autre point d'accès disponible ou après le délai
+        demandé par le serveur ; une erreur propre au point d'accès (réseau,
+        5xx, clé refusée) est renvoyée une fois sur chacun des autres. Les
+        erreurs HTTP, timeouts et erreurs réseau sont retournés dans
+        `ApiResponse.error` plutôt que levés.
+        
+        En mode streaming, `answer_count` (nombre de réponses d'un batch, None
+        pour une question seule) permet d'arrêter la lecture dès la réponse
+        complète. `sent` est levé au premier envoi effectif.
+        """
+        if self.local is not None:
+            return await self._send_local(body, timeout, sent)
+        
+        estimated_tokens = estimate_tokens(len(body))
+        queue_time = 0.0
+        throttle_attempt = 0
+        failovers = 0
+        
+        while True:
+            endpoint = self.endpoints.acquire()
+            url = self._get_api_url(endpoint.api_base)
+            breaker = self.circuit_breakers.get(ConcurrencyLimiter.host_of(url), self.circuit_breaker_config)
+            response = None
+            throttled = False
+            retry_after = None
+            acquired = False
+            epoch = None
+            try:
+                if breaker:
+                    queue_time += await breaker.wait()
+                try:
+                    queue_time += await endpoint.rate_limiter.acquire(estimated_tokens)
+                    acquired = True
+                    epoch = endpoint.rate_limiter.epoch
+                    async with self.limiter.slot(self.name, url, self.max_concurrency) as slot:
+                        queue_time += slot.wait_time
+                        if sent is not None:
+                            sent.set()
+                        if self.stream:
+                            response = await self._post_stream(session, url, body, timeout, self._get_headers(endpoint.api_key), answer_count)
+                        else:
+                            response = await self._post_once(session, url, body, timeout, self._get_headers(endpoint.api_key))
+                    
+                    if breaker:
+                        breaker.record(response.status)
+                    if response.status == 429:
+                        throttled = True
+                        retry_after = parse_retry_after(response.headers, response.error or "")
+                    else:
+                        retry_after = exhausted_reset(response.headers)
+                        if response.data:
+                            endpoint.rate_limiter.record_usage(estimated_tokens, self._extract_cache_usage(response.data)[0])
+                finally:
+                    if acquired:
+                        await endpoint.rate_limiter.release(throttled, retry_after, epoch)
+            finally:
+                self.endpoints.release(
+                    endpoint,
+                    response.status if response else None,
+                    response.response_time if response else 0.0,
+                    retry_after if throttled else None
+                )
+            
+            response.queue_time = queue_time
+            if throttled and throttle_attempt < self.max_throttle_retries:
+                throttle_attempt += 1
+                logger.warning(f"Rate limited (429) for {self.name} on {endpoint.label}, resending ({throttle_attempt}/{self.max_throttle_retries})")
+            elif (EndpointPool.is_endpoint_failure(response.status)
+                  and failovers < len(self.endpoints.endpoints) - 1
+                  and self.endpoints.has_alternative(endpoint)):
+                failovers += 1
+                logger.warning(f"{response.error} on {endpoint.label} for {self.name}, resending on another endpoint")
+            else:
+                return response
+    
+    async def _send_local(self, body: bytes, timeout: int, sent: Optional[asyncio.Event] = None) -> ApiResponse:
+        """Exécute la requête sur le modèle local ; réponses et erreurs au format des appels HTTP."""
+        start_time = time.time()
+        if sent is not None:
+            sent.set()
+        try:
+            data = await asyncio.wait_for(self.local.complete(json.loads(body)), timeout)
+        except asyncio.TimeoutError:
+            return ApiResponse(status=0, error="Timeout", response_time=time.time() - start_time)
+        return ApiResponse(status=200, data=data, response_time=time.time() - start_time)
+    
+    def _get_transport(self, session) -> Transport:
+        """Transport du modèle : choisi dans le pool partagé, sinon aiohttp sur la session fournie."""
+        if isinstance(session, HttpPool):
+            return session.transport(self.transport)
+        return AiohttpTransport(session)
+    
+    async def _post_once(self, session: aiohttp.ClientSession, url: str, body: bytes, timeout: int, headers: Optional[Dict[str, str]] = None) -> ApiResponse:
+        """Effectue un unique appel HTTP POST."""
+        start_time = time.time()
+        try:
+            response = await self._get_transport(session).post(url, body, headers or self._get_headers(), timeout)
+        except asyncio.TimeoutError:
+            return ApiResponse(status=0, error="Timeout", response_time=time.time() - start_time)
+        except TransportError as e:
+            return ApiResponse(status=0, error=str(e), response_time=time.time() - start_time)
+        
+        if response.status != 200:
+            return ApiResponse(
+                status=response.status,
+                error=f"API Error {response.status}: {response.text()}",
+                headers=response.headers,
+                response_time=time.time() - start_time
+            )
+        
+        try:
+            data = response.json()
+        except ValueError:
+            return ApiResponse(
+                status=response.status,
+                error=f"Invalid JSON response: {response.text()[:200]}",
+                headers=response.headers,
+                response_time=time.time() - start_time
+            )
+        return ApiResponse(
+            status=response.status,
+            data=data,
+            headers=response.headers,
+            response_time=time.time() - start_time
+        )
+    
+    async def _post_stream(self,
+                           session: aiohttp.ClientSession,
+                           url: str,
+                           body: bytes,
+                           timeout: int,
+                           headers: Dict[str, str],
+                           answer_count: Optional[int] = None) -> ApiResponse:
+        """Effectue un appel POST en streaming et reconstitue la réponse complète.
+        
+        Mesure le délai avant le premier token (raisonnement compris), avant le
+        premier token de réponse et le débit de génération. Avec
+        `stream_cutoff`, la lecture s'arrête dès que la réponse est complète
+        (voir `_answer_is_complete`) : la connexion est fermée et le
+        fournisseur cesse de générer.
+        """
+        start_time = time.time()
+        accumulator = StreamAccumulator("anthropic" in self.api_base, start_time)
+        cutoff = False
+        
+        async def read_stream():
+            nonlocal cutoff
+            async with self._get_transport(session).stream(url, body, headers, timeout) as response:
+                if response.status != 200:
+                    text = (await response.read()).decode('utf-8', errors='replace')
+                    return ApiResponse(
+                        status=response.status,
+                        error=f"API Error {response.status}: {text}",
+                        headers=response.headers,
+                        response_time=time.time() - start_time
+                    )
+                async for data in iter_sse_data(response.lines):
+                    answer = accumulator.add(data)
+                    if accumulator.error:
+                        break
+                    if self.stream_cutoff and answer and self._answer_is_complete(answer, accumulator.text, answer_count):
+                        cutoff = True
+                        break
+                return ApiResponse(status=response.status, headers=response.headers)
+        
+        try:
+            response = await asyncio.wait_for(read_stream(), timeout)
+        except asyncio.TimeoutError:
+            return ApiResponse(status=0, error="Timeout", response_time=time.time() - start_time, **accumulator.metrics())
+        except TransportError as e:
+            return ApiResponse(status=0, error=str(e), response_time=time.time() - start_time, **accumulator.metrics())
+        
+        response.response_time = time.time() - start_time
+        if response.error:
+            return response
+        if accumulator.error:
+            response.error = accumulator.error
+            return response
+        if cutoff:
+            logger.debug(f"Stream cut off after complete answer for {self.name} ({response.response_time:.2f}s)")
+        response.data = accumulator.to_response()
+        response.stream_cutoff = cutoff
+        for key, value in accumulator.metrics().items():
+            setattr(response, key, value)
+        return response
+    
+    def _answer_is_complete(self, new_text: str, text: str, answer_count: Optional[int]) -> bool:
+        """Indique si le texte reçu contient déjà la réponse complète.
+
+        Seules des marques de fin sans ambiguïté arrêtent la lecture :
+        `</answer>`, fin de boîte GLM, ou tableau JSON fermé contenant les
+        `answer_count` réponses d'un batch. Avec `stream_cutoff: line`, une
+        question seule s'arrête aussi à la première fin de ligne. Rien n'est
+        coupé tant qu'un bloc `<think>` est ouvert ; le raisonnement envoyé à
+        part (`reasoning`) n'entre pas dans `text`.
+        """
+        if '<think>' in text:
+            if '</think>' not in text:
+                return False
+            text = text.rsplit('</think>', 1)[1]
+        if answer_count is None:
+            if '>' in new_text and ('</answer>' in text or '<|end_of_box|>' in text):
+                return True
+            if self.stream_cutoff != 'line' or '<answer>' in text or '|begin_of_box|' in text:
+                return False
+            return '\n' in new_text and bool(text.strip()) and '\n' in text.lstrip()
+        if ']' not in new_text:
+            return False
+        return all(answer is not None for answer in self.cleaner.parse_batch_answers(text, answer_count))
+    
+    def _get_request_template(self, tree_description: str, language: str, batch: bool, stream: bool = False) -> RequestTemplate:
+        """Retourne le corps de requête pré-encodé pour ce benchmark.
+        
+        La description n'est encodée qu'une fois par benchmark : les requêtes
+        suivantes ne font qu'insérer la partie propre à la question.
+        """
+        key = (tree_description, language, batch, stream)
+        template = self._request_templates.get(key)
+        if template is not None:
+            self._request_templates.move_to_end(key)
+            return template
+        
+        prompt_prefix = self.prompt_builder.build_shared_prefix(tree_description, language)
+        data = self._build_api_request(prompt_prefix, RequestTemplate.slot('prompt_suffix'), language, batch, stream)
+        template = RequestTemplate(data)
+        logger.debug(f"Request template for {self.name}: {template.size} bytes pre-encoded")
+        
+        self._request_templates[key] = template
+        while len(self._request_templates) > self.MAX_REQUEST_TEMPLATES:
+            self._request_templates.popitem(last=False)
+        return template
+    
+    def _get_conversation_template(self, tree_description: str, language: str) -> RequestTemplate:
+        """Retourne la requête pré-encodée d'un tour : ouverture, réponse fixe, puis emplacement `turns`.
+        
+        L'ouverture est identique pour toutes les conversations du benchmark
+        et n'est encodée qu'une fois ; l'emplacement `turns` reçoit
+        l'historique et la question courante déjà encodés
+        (`ConversationHistory.encode`). Chaque requête prolonge la précédente
+        tant que l'historique n'est pas remis à zéro : les serveurs à cache de
+        préfixe automatique ne traitent alors que les derniers tours.
+        """
+        key = (tree_description, language, 'conversation', self.stream)
+        template = self._request_templates.get(key)
+        if template is not None:
+            self._request_templates.move_to_end(key)
+            return template
+        
+        opening = self.prompt_builder.build_conversation_opening(tree_description, language)
+        data = self._build_api_request(opening, "", language, batch=False, stream=self.stream)
+        messages = data["messages"]
+        messages.append({"role": "assistant", "content": self.prompt_builder.get_conversation_acknowledgement(language)})
+        messages.append(RequestTemplate.slot('turns'))
+        template = RequestTemplate(data)
+        
+        self._request_templates[key] = template
+        while len(self._request_templates) > self.MAX_REQUEST_TEMPLATES:
+            self._request_templates.popitem(last=False)
+        return template
+    
+    def _supports_cache_control(self) -> bool:
+        """Indique si le fournisseur accepte des blocs `cache_control` explicites."""
+        if not self.prompt_cache:
+            return False
+        if "anthropic" in self.api_base:
+            return True
+        # OpenRouter transmet les points de cache aux modèles Anthropic et Gemini
+        return "openrouter" in self.api_base and self.model.startswith(("anthropic/", "google/"))
+    
+    def _supports_structured_output(self) -> bool:
+        """Indique si le fournisseur accepte un `response_format` de type schéma JSON."""
+        if self.structured_output is not None:
+            return bool(self.structured_output) and "anthropic" not in self.api_base
+        return "api.openai.com" in self.api_base or "openrouter" in self.api_base
+    
+    @staticmethod
+    def _batch_response_format(count: int) -> Dict[str, Any]:
+        """Schéma imposant exactement `count` réponses sous forme de chaînes."""
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "batch_answers",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "answers": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "minItems": count,
+                            "maxItems": count
+                        }
+                    },
+                    "required": ["answers"],
+                    "additionalProperties": False
+                }
+            }
+        }
+    
+    def _build_user_content(self, prompt_prefix: str, prompt_suffix: str) -> Union[str, List[Dict[str, Any]]]:
+        """Construit le contenu du message utilisateur avec indice de cache si possible."""
+        if not self._supports_cache_control():
+            return prompt_prefix + prompt_suffix
+        content = [{"type": "text", "text": prompt_prefix, "cache_control": {"type": "ephemeral"}}]
+        if prompt_suffix:
+            content.append({"type": "text", "text": prompt_suffix})
+        return content
+    
+    def _get_api_url(self, api_base: Optional[str] = None) -> str:
         """Retourne l'URL de l'API selon le type."""
+        api_base = api_base or self.api_base
         if "anthropic" in self.api_base:
-            return f"{self.api_base}/messages"
+            return f"{api_base}/messages"
         else:
-            return f"{self.api_base}/chat/completions"
+            return f"{api_base}/chat/completions"
     
     def _extract_api_response(self, result: Dict[str, Any]) -> tuple[str, int, int, Optional[str]]:
         """Extrait la réponse du modèle selon le format de l'API."""
@@ -464,7 +1160,21 @@ class ModelEvaluator:
         
         return model_answer, tokens_used, reasoning_tokens, reasoning_text
     
-    def _create_error_result(self, question: Dict[str, Any], error: str, response_time: float, no_response: bool = False) -> EvaluationResult:
+    def _extract_cache_usage(self, result: Dict[str, Any]) -> Tuple[int, int]:
+        """Extrait le nombre de tokens de prompt et de tokens lus depuis le cache."""
+        usage = result.get('usage') or {}
+        
+        if "anthropic" in self.api_base:
+            cached_tokens = usage.get('cache_read_input_tokens') or 0
+            prompt_tokens = (usage.get('input_tokens') or 0) + cached_tokens + (usage.get('cache_creation_input_tokens') or 0)
+        else:
+            details = usage.get('prompt_tokens_details') or {}
+            cached_tokens = details.get('cached_tokens') or 0
+            prompt_tokens = usage.get('prompt_tokens') or 0
+        
+        return prompt_tokens, cached_tokens
+    
+    def _create_error_result(self, question: Dict[str, Any], error: str, response_time: float, no_response: bool = False, queue_time: float = 0.0) -> EvaluationResult:
         """Crée un résultat d'erreur."""
         return EvaluationResult(
             model_name=self.name,
@@ -482,6 +1192,7 @@ class ModelEvaluator:
             no_response=no_response,
             reasoning_tokens=0,
             reasoning_text=None,
+            queue_time=queue_time,
             question_type=question.get('type'),
             is_enigma=question.get('type') == 'enigme',
             enigma_complexity=question.get('complexity') if question.get('type') == 'enigme' else None
@@ -0,0 +1,80 @@
+"""Limite de tokens de sortie et séquences d'arrêt adaptées à chaque requête."""
+
+from typing import Any, Dict, List, Optional
+
+from .batching import ANSWER_OVERHEAD_TOKENS, DEFAULT_ANSWER_TOKENS, EXPECTED_ANSWER_TOKENS
+from .rate_limiter import estimate_tokens
+
+DEFAULT_STOP_SEQUENCES = ["\n\n"]
+
+
+class OutputBudget:
+    """Calcule le `max_tokens` d'une requête d'après les réponses attendues.
+
+    Chaque question compte la longueur attendue de son type ou, si elle est
+    plus longue, celle de la réponse connue à la génération du benchmark (la
+    bonne réponse n'est jamais tronquée), multipliée par `margin`. S'y
+    ajoutent `min_tokens` par requête et, pour les modèles à raisonnement,
+    `reasoning_tokens`. Le résultat ne dépasse jamais le `max_tokens` du modèle.
+
+    Les séquences d'arrêt coupent les sorties qui s'étendent au-delà de la
+    réponse ; elles ne sont pas envoyées aux modèles à raisonnement, dont le
+    texte peut contenir ces séquences avant la réponse.
+    """
+
+    def __init__(self,
+                 max_tokens: int = 2000,
+                 margin: float = 3.0,
+                 min_tokens: int = 16,
+                 reasoning_tokens: int = 0,
+                 stop_sequences: Optional[List[str]] = None,
+                 batch_stop_sequences: Optional[List[str]] = None):
+        self.max_tokens = max_tokens
+        self.margin = margin
+        self.min_tokens = min_tokens
+        self.reasoning_tokens = reasoning_tokens
+        self.stop_sequences = list(DEFAULT_STOP_SEQUENCES if stop_sequences is None else stop_sequences)
+        self.batch_stop_sequences = list(batch_stop_sequences or [])
+
+    @classmethod
+    def from_config(cls, config: Any, max_tokens: int, reasoning_config: Optional[Dict[str, Any]] = None) -> Optional["OutputBudget"]:
+        """Construit le budget depuis la clé `output_budget` d'un modèle (None si absente).
+
+        Sans `reasoning_tokens`, un modèle configuré avec `reasoning` reçoit
+        le `max_tokens` de sa configuration de raisonnement, sinon son
+        `max_tokens` complet.
+        """
+        if not config:
+            return None
+        config = config if isinstance(config, dict) else {}
+        reasoning_tokens = config.get('reasoning_tokens')
+        if reasoning_tokens is None:
+            reasoning_tokens = (reasoning_config.get('max_tokens') or max_tokens) if reasoning_config else 0
+        return cls(
+            max_tokens=max_tokens,
+            margin=config.get('margin', 3.0),
+            min_tokens=config.get('min_tokens', 16),
+            reasoning_tokens=reasoning_tokens,
+            stop_sequences=config.get('stop_sequences'),
+            batch_stop_sequences=config.get('batch_stop_sequences')
+        )
+
+    @staticmethod
+    def answer_tokens(question: Dict[str, Any]) -> int:
+        """Longueur de réponse prévue : celle du type, ou la réponse connue si plus longue."""
+        expected = EXPECTED_ANSWER_TOKENS.get(question.get('type'), DEFAULT_ANSWER_TOKENS)
+        known = estimate_tokens(len(str(question.get('answer', '')).encode('utf-8')))
+        return max(expected, known)
+
+    def tokens_for(self, questions: List[Dict[str, Any]], batch: bool = False) -> int:
+        """`max_tokens` d'une requête portant sur `questions`."""
+        overhead = ANSWER_OVERHEAD_TOKENS if batch else 0
+        answers = sum(self.answer_tokens(question) + overhead for question in questions)
+        budget = int(answers * self.margin) + self.min_tokens + self.reasoning_tokens
+        return min(self.max_tokens, budget)
+
+    def stop_for(self, batch: bool = False) -> List[str]:
+        """Séquences d'arrêt du mode (aucune pour un modèle à raisonnement)."""
+        if self.reasoning_tokens:
+            return []
+        return self.batch_stop_sequences if batch else self.stop_sequences
@@ -0,0 +1,190 @@
+"""Préparation des benchmarks : arbre, description et questions."""
+
+import asyncio
+import json
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+from tree_evaluator.models import Person
+from tree_evaluator.tree_generator import generate_tree
+from tree_evaluator.tree_store import load_tree, random_state_from_json
+from tree_evaluator.text_converter import convert_tree_to_text
+from tree_evaluator.question_generator import build_question_pool, draw_questions
+from tree_evaluator.benchmark_package import BenchmarkPackage
+
+logger = logging.getLogger(__name__)
+
+# Paquets ouverts, partagés entre les runs d'un même processus
+_open_packages: Dict[str, BenchmarkPackage] = {}
+
+# Arbres et pools de questions déjà calculés, par paramètres d'arbre
+_question_pools: Dict[str, Dict[str, Any]] = {}
+
+# Paramètres qui déterminent l'arbre (et donc le pool de questions)
+TREE_KEYS = ('people', 'depth', 'max_children', 'seed', 'root_couples', 'language', 'tree_file')
+
+# Modes de tirage des questions entre les runs d'un même benchmark
+QUESTION_DRAW_MODES = ('identical', 'independent', 'disjoint')
+
+# Thread unique de préparation : les générations utilisent l'état aléatoire
+# global et ne doivent pas s'entrelacer
+_preparation_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="benchmark-preparation")
+
+
+@dataclass
+class PreparedBenchmark:
+    """Benchmark prêt à être évalué."""
+    name: str
+    language: str
+    tree_description: str
+    questions: List[Dict[str, Any]]
+    content_hash: Optional[str] = None
+
+
+def open_package(path: str) -> BenchmarkPackage:
+    """Ouvre un paquet de benchmark (une seule fois par processus)."""
+    key = str(Path(path).resolve())
+    if key not in _open_packages:
+        _open_packages[key] = BenchmarkPackage(path)
+    return _open_packages[key]
+
+
+def load_or_generate_tree(benchmark_config: Dict[str, Any]) -> Tuple[Dict[str, Person], str]:
+    """Charge l'arbre sauvegardé du benchmark (`tree_file`) ou en génère un nouveau."""
+    tree_file = benchmark_config.get('tree_file')
+    if not tree_file:
+        language = benchmark_config.get('language', 'fr')
+        tree = generate_tree(
+            total_people=benchmark_config['people'],
+            max_depth=benchmark_config['depth'],
+            max_children_per_person=benchmark_config.get('max_children', 3),
+            seed=benchmark_config.get('seed'),
+            num_root_couples=benchmark_config.get('root_couples', 1),
+            language=language
+        )
+        return tree, language
+    
+    tree, tree_metadata = load_tree(tree_file)
+    language = benchmark_config.get('language', tree_metadata.get('language', 'fr'))
+    # Reprendre l'état aléatoire d'après génération pour retrouver les mêmes questions
+    if benchmark_config.get('seed') is not None:
+        random.seed(benchmark_config['seed'])
+    elif 'random_state' in tree_metadata:
+        random.setstate(random_state_from_json(tree_metadata['random_state']))
+    return tree, language
+
+
+def _pool_cache_key(benchmark_config: Dict[str, Any]) -> Optional[str]:
+    """Clé de cache du pool, ou None si l'arbre n'est pas reproductible (sans graine)."""
+    if benchmark_config.get('seed') is None and not benchmark_config.get('tree_file'):
+        return None
+    return json.dumps({key: benchmark_config.get(key) for key in TREE_KEYS}, sort_keys=True)
+
+
+def get_question_pool(benchmark_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Retourne l'arbre et le pool complet de questions du benchmark, calculés une seule fois.
+    
+    L'entrée contient aussi l'état aléatoire juste après la construction du
+    pool, à partir duquel les tirages sont effectués.
+    """
+    cache_key = _pool_cache_key(benchmark_config)
+    if cache_key is not None and cache_key in _question_pools:
+        return _question_pools[cache_key]
+    
+    tree, language = load_or_generate_tree(benchmark_config)
+    pool = build_question_pool(tree, language)
+    entry = {
+        'tree': tree,
+        'language': language,
+        'pool': pool,
+        'random_state': random.getstate(),
+        'descriptions': {}
+    }
+    logger.debug(f"Question pool for {benchmark_config.get('name')}: {len(pool['normal'])} normal, {len(pool['enigma'])} enigmas")
+    
+    if cache_key is not None:
+        _question_pools[cache_key] = entry
+    return entry
+
+
+def _draw_rng(entry: Dict[str, Any], benchmark_config: Dict[str, Any], run_index: int, question_draws: str) -> Tuple[random.Random, int]:
+    """Retourne le générateur et le rang de tirage pour un run."""
+    rng = random.Random()
+    rng.setstate(entry['random_state'])
+    
+    if question_draws == 'independent' and run_index > 0:
+        # Graine dérivée du run : tirages indépendants mais reproductibles
+        rng = random.Random(f"{benchmark_config.get('seed')}:{run_index}")
+        return rng, 0
+    if question_draws == 'disjoint':
+        # Même mélange pour tous les runs, chaque run prend une tranche différente
+        return rng, run_index
+    return rng, 0
+
+
+def prepare_benchmark(benchmark_config: Dict[str, Any],
+                      run_index: int = 0,
+                      question_draws: str = 'identical') -> PreparedBenchmark:
+    """Prépare un benchmark depuis un paquet pré-construit (`package`) ou en le générant.
+    
+    Args:
+        run_index: Rang du run pour ce benchmark
+        question_draws: `identical` (même tirage à chaque run), `independent`
+            (un tirage par run) ou `disjoint` (tirages sans question commune)
+    """
+    package_path = benchmark_config.get('package')
+    if package_path:
+        package = open_package(package_path)
+        return PreparedBenchmark(
+            name=benchmark_config.get('name', package.name),
+            language=package.language,
+            tree_description=package.tree_description,
+            questions=package.questions,
+            content_hash=package.content_hash
+        )
+    
+    question_draws = benchmark_config.get('question_draws', question_draws)
+    if question_draws not in QUESTION_DRAW_MODES:
+        raise ValueError(f"Mode de tirage inconnu : {question_draws} (attendu : {', '.join(QUESTION_DRAW_MODES)})")
+    
+    entry = get_question_pool(benchmark_config)
+    language = entry['language']
+    
+    # Une graine de mélange sélectionne une variante d'ordre déterministe de la description
+    shuffle_seed = benchmark_config.get('shuffle_seed')
+    tree_description = entry['descriptions'].get(shuffle_seed)
+    if tree_description is None:
+        tree_description = convert_tree_to_text(
+            entry['tree'], shuffle=shuffle_seed is not None, language=language, shuffle_seed=shuffle_seed
+        )
+        entry['descriptions'][shuffle_seed] = tree_description
+    
+    rng, draw_index = _draw_rng(entry, benchmark_config, run_index, question_draws)
+    enigma_percentage = benchmark_config.get('enigma_percentage', 10)
+    questions = draw_questions(entry['pool'], benchmark_config['questions'], enigma_percentage, rng, draw_index)
+    if len(questions) < benchmark_config['questions']:
+        logger.warning(f"Only {len(questions)} questions left in the pool of {benchmark_config['name']} for run {run_index + 1}")
+    
+    return PreparedBenchmark(
+        name=benchmark_config['name'],
+        language=language,
+        tree_description=tree_description,
+        questions=questions
+    )
+
+
+async def prepare_benchmark_async(benchmark_config: Dict[str, Any],
+                                  run_index: int = 0,
+                                  question_draws: str = 'identical') -> PreparedBenchmark:
+    """Prépare le benchmark dans le thread de préparation, sans bloquer la boucle asyncio.
+    
+    Les requêtes déjà en vol continuent d'être envoyées et lues pendant la
+    génération ; les préparations demandées s'exécutent une à une, dans
+    l'ordre des appels.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_preparation_executor, prepare_benchmark, benchmark_config, run_index, question_draws)
@@ -7,36 +7,44 @@ class PromptBuilder:
     """Construit les prompts pour l'évaluation des modèles."""
     
     @staticmethod
-    def build_single_question_prompt(tree_description: str, question: str, language: str = 'fr') -> str:
-        """Construit le prompt pour une question unique."""
+    def build_shared_prefix(tree_description: str, language: str = 'fr') -> str:
+        """Construit le préfixe commun à toutes les questions d'un benchmark.
+        
+        Ce préfixe est identique octet pour octet d'une requête à l'autre afin
+        de pouvoir être mis en cache par les fournisseurs.
+        """
         if language == 'en':
             return f"""Here is a family description:
 
 {tree_description}
 
-Question: {question}
-
-Respond ONLY with the requested name or list of names (separated by commas without spaces), or "None" if no one matches."""
+"""
         else:
             return f"""Voici la description d'une famille:
 
 {tree_description}
 
-Question: {question}
+"""
+    
+    @staticmethod
+    def build_single_question_suffix(question: str, language: str = 'fr') -> str:
+        """Construit la partie variable du prompt pour une question unique."""
+        if language == 'en':
+            return f"""Question: {question}
+
+Respond ONLY with the requested name or list of names (separated by commas without spaces), or "None" if no one matches."""
+        else:
+            return f"""Question: {question}
 
 Réponds UNIQUEMENT avec le nom ou la liste de noms demandée (séparés par des virgules sans espaces), ou "Aucun" si personne ne correspond."""
     
     @staticmethod
-    def build_batch_prompt(tree_description: str, questions: List[Dict[str, Any]], language: str = 'fr') -> str:
-        """Construit le prompt pour un batch de questions."""
+    def build_batch_suffix(questions: List[Dict[str, Any]], language: str = 'fr') -> str:
+        """Construit la partie variable du prompt pour un batch de questions."""
         questions_text = "\n".join([f"{i+1}. {q['question']}" for i, q in enumerate(questions)])
         
         if language == 'en':
-            return f"""Here is a family description:
-
-{tree_description}
-
-Answer the following questions based on this family description. 
+            return f"""Answer the following questions based on this family description. 
 Provide your answers as a JSON array of strings in the same order as the questions.
 For lists of names, separate them with commas without spaces.
 If no one matches, answer "None".
@@ -46,11 +54,7 @@ Questions:
 
 Respond ONLY with a JSON array like: ["Answer1", "Answer2", "Answer3"]"""
         else:
-            return f"""Voici la description d'une famille:
-
-{tree_description}
-
-Réponds aux questions suivantes basées sur cette description familiale.
+            return f"""Réponds aux questions suivantes basées sur cette description familiale.
 Fournis tes réponses sous forme d'un tableau JSON de chaînes dans le même ordre que les questions.
 Pour les listes de noms, sépare-les par des virgules sans espaces.
 Si personne ne correspond, réponds "Aucun".
@@ -60,6 +64,36 @@ Questions:
 
 Réponds UNIQUEMENT avec un tableau JSON comme: ["Réponse1", "Réponse2", "Réponse3"]"""
     
+    @classmethod
+    def build_conversation_opening(cls, tree_description: str, language: str = 'fr') -> str:
+        """Construit le premier tour d'une conversation : la description, sans question.
+        
+        Il commence par le préfixe commun aux autres modes et reste identique
+        pour toutes les conversations d'un benchmark.
+        """
+        if language == 'en':
+            return cls.build_shared_prefix(tree_description, language) + "I will now ask you questions about this family, one at a time."
+        else:
+            return cls.build_shared_prefix(tree_description, language) + "Je vais maintenant te poser des questions sur cette famille, une à la fois."
+    
+    @staticmethod
+    def get_conversation_acknowledgement(language: str = 'fr') -> str:
+        """Retourne la réponse fixe de l'assistant au premier tour d'une conversation."""
+        return {
+            "fr": "Compris.",
+            "en": "Understood."
+        }.get(language, "Compris.")
+    
+    @classmethod
+    def build_single_question_prompt(cls, tree_description: str, question: str, language: str = 'fr') -> str:
+        """Construit le prompt pour une question unique."""
+        return cls.build_shared_prefix(tree_description, language) + cls.build_single_question_suffix(question, language)
+    
+    @classmethod
+    def build_batch_prompt(cls, tree_description: str, questions: List[Dict[str, Any]], language: str = 'fr') -> str:
+        """Construit le prompt pour un batch de questions."""
+        return cls.build_shared_prefix(tree_description, language) + cls.build_batch_suffix(questions, language)
+    
     @staticmethod
     def get_system_prompt(language: str = 'fr', batch: bool = False) -> str:
         """Retourne le prompt système selon la langue et le mode."""
@@ -0,0 +1,269 @@
+"""Respect des limites de débit des fournisseurs (RPM, TPM, 429 et Retry-After)."""
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Durées OpenAI du type "1s", "6m0s", "250ms", "1h2m3.5s"
+_DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+# Messages d'erreur du type "Please try again in 1.5s"
+_RETRY_IN_PATTERN = re.compile(r'try again in\s+(\d+(?:\.\d+)?)\s*(ms|s)', re.IGNORECASE)
+
+
+def estimate_tokens(size_in_bytes: int) -> int:
+    """Estime grossièrement le nombre de tokens d'un texte (~4 octets par token)."""
+    return max(1, size_in_bytes // 4)
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    matches = _DURATION_PATTERN.findall(value)
+    if not matches:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in matches)
+
+
+def _parse_reset(value: str, now: float) -> Optional[float]:
+    """Convertit une valeur d'en-tête de réinitialisation en délai (secondes)."""
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        number = None
+
+    if number is not None:
+        # Timestamp epoch en millisecondes (OpenRouter) ou en secondes, sinon un délai
+        if number > 1e12:
+            return max(0.0, number / 1000 - now)
+        if number > 1e9:
+            return max(0.0, number - now)
+        return number
+
+    duration = _parse_duration(value)
+    if duration is not None:
+        return duration
+
+    for parser in (datetime.fromisoformat, parsedate_to_datetime):
+        try:
+            moment = parser(value.replace('Z', '+00:00'))
+        except (TypeError, ValueError):
+            continue
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return max(0.0, moment.timestamp() - now)
+    return None
+
+
+def parse_retry_after(headers: Dict[str, str], body: str = "") -> Optional[float]:
+    """Extrait le délai d'attente demandé par le serveur après un 429, en secondes."""
+    headers = {key.lower(): value for key, value in headers.items()}
+    now = time.time()
+
+    retry_after = headers.get('retry-after')
+    if retry_after:
+        delay = _parse_reset(retry_after, now)
+        if delay is not None:
+            return delay
+
+    delays = [
+        _parse_reset(headers[key], now)
+        for key in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens', 'x-ratelimit-reset',
+                    'anthropic-ratelimit-requests-reset', 'anthropic-ratelimit-tokens-reset')
+        if key in headers
+    ]
+    delays = [delay for delay in delays if delay is not None]
+    if delays:
+        return max(delays)
+
+    match = _RETRY_IN_PATTERN.search(body or "")
+    if match:
+        return float(match.group(1)) * _DURATION_UNITS[match.group(2).lower()]
+    return None
+
+
+def exhausted_reset(headers: Dict[str, str]) -> Optional[float]:
+    """Délai avant réinitialisation si le serveur annonce un quota restant nul."""
+    headers = {key.lower(): value for key, value in headers.items()}
+    now = time.time()
+    for kind in ('requests', 'tokens'):
+        remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+        reset = headers.get(f'x-ratelimit-reset-{kind}')
+        if remaining is not None and reset and remaining.strip() == '0':
+            return _parse_reset(reset, now)
+    return None
+
+
+class TokenBucket:
+    """Seau à jetons rechargé en continu (`rate` jetons par minute)."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Attend que `amount` jetons soient disponibles puis les consomme."""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def adjust(self, delta: float):
+        """Corrige le solde a posteriori (ex: tokens réellement consommés)."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class RateLimiter:
+    """Limiteur de débit d'un fournisseur (hôte + clé API).
+
+    Combine des seaux RPM/TPM optionnels, une pause globale quand le serveur
+    signale un dépassement (429, Retry-After, quota restant nul) et une
+    concurrence adaptative : réduite multiplicativement une fois par épisode
+    de 429, puis augmentée additivement tant que les requêtes passent.
+
+    `epoch` compte les réductions : une requête envoyée avant la dernière
+    réduction qui reçoit à son tour un 429 appartient au même épisode et ne
+    réduit plus la concurrence.
+    """
+
+    def __init__(self,
+                 rpm: Optional[float] = None,
+                 tpm: Optional[float] = None,
+                 initial_concurrency: Optional[int] = None,
+                 max_concurrency: Optional[int] = None,
+                 min_concurrency: int = 1,
+                 decrease_factor: float = 0.5,
+                 default_retry_after: float = 5.0):
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        self.concurrency_limit: Optional[float] = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.decrease_factor = decrease_factor
+        self.default_retry_after = default_retry_after
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.throttle_count = 0
+        self.epoch = 0
+        self._condition = asyncio.Condition()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "RateLimiter":
+        """Construit le limiteur depuis la clé `rate_limit` d'un modèle."""
+        config = config or {}
+        return cls(
+            rpm=config.get('rpm'),
+            tpm=config.get('tpm'),
+            initial_concurrency=config.get('initial_concurrency'),
+            max_concurrency=config.get('max_concurrency'),
+            min_concurrency=config.get('min_concurrency', 1),
+            decrease_factor=config.get('decrease_factor', 0.5),
+            default_retry_after=config.get('default_retry_after', 5.0)
+        )
+
+    def _can_start(self) -> bool:
+        if time.time() < self.paused_until:
+            return False
+        return self.concurrency_limit is None or self.in_flight < int(self.concurrency_limit)
+
+    async def acquire(self, estimated_tokens: int = 0) -> float:
+        """Attend l'autorisation d'envoyer une requête ; retourne le temps d'attente."""
+        start = time.time()
+        async with self._condition:
+            while not self._can_start():
+                pause = self.paused_until - time.time()
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout=pause if pause > 0 else None)
+                except asyncio.TimeoutError:
+                    pass
+            self.in_flight += 1
+
+        try:
+            if self.request_bucket:
+                await self.request_bucket.acquire(1)
+            if self.token_bucket and estimated_tokens:
+                await self.token_bucket.acquire(estimated_tokens)
+        except BaseException:
+            # Annulée pendant l'attente des seaux (hedging, timeout) : rendre la place
+            self.in_flight -= 1
+            asyncio.get_running_loop().create_task(self._notify())
+            raise
+        return time.time() - start
+
+    async def _notify(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+    async def release(self, throttled: bool = False, retry_after: Optional[float] = None, epoch: Optional[int] = None):
+        """Libère la requête et ajuste la concurrence selon la réponse du serveur.
+
+        Args:
+            throttled: Le serveur a répondu 429
+            retry_after: Délai demandé par le serveur, ou avant réinitialisation
+                d'un quota épuisé (met en pause toutes les requêtes du fournisseur)
+            epoch: Valeur de `epoch` à l'obtention de la place ; si la
+                concurrence a été réduite depuis, le 429 ne la réduit pas à nouveau
+        """
+        async with self._condition:
+            self.in_flight -= 1
+            now = time.time()
+
+            if throttled:
+                self.throttle_count += 1
+                retry_after = retry_after if retry_after is not None else self.default_retry_after
+                if epoch is None or epoch == self.epoch:
+                    # Diminution multiplicative à partir de la concurrence effectivement atteinte
+                    current = self.concurrency_limit if self.concurrency_limit is not None else self.in_flight + 1
+                    self.concurrency_limit = max(self.min_concurrency, current * self.decrease_factor)
+                    self.epoch += 1
+                    logger.warning(f"Throttled: pausing for {retry_after:.1f}s, concurrency limit now {int(self.concurrency_limit)}")
+            elif self.concurrency_limit is not None:
+                # Augmentation additive (~ +1 par fenêtre complète de requêtes réussies)
+                self.concurrency_limit += 1.0 / max(1.0, self.concurrency_limit)
+                if self.max_concurrency:
+                    self.concurrency_limit = min(self.concurrency_limit, self.max_concurrency)
+
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+            self._condition.notify_all()
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Corrige le seau TPM avec le nombre réel de tokens consommés."""
+        if self.token_bucket and actual_tokens:
+            self.token_bucket.adjust(actual_tokens - estimated_tokens)
+
+
+class RateLimiterRegistry:
+    """Limiteurs partagés par fournisseur et par clé API.
+
+    Plusieurs modèles servis par le même hôte avec la même clé partagent un
+    seul limiteur ; la première configuration `rate_limit` rencontrée est utilisée.
+    """
+
+    def __init__(self):
+        self._limiters: Dict[str, RateLimiter] = {}
+
+    def get(self, host: str, api_key: str, config: Optional[Dict[str, Any]] = None) -> RateLimiter:
+        key = f"{host}:{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]}"
+        if key not in self._limiters:
+            self._limiters[key] = RateLimiter.from_config(config)
+        return self._limiters[key]
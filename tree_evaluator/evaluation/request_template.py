@@ -0,0 +1,76 @@
+"""Corps de requêtes JSON pré-encodés pour éviter de ré-sérialiser la description."""
+
+import json
+import re
+from typing import Any, Dict, List
+
+# Marqueur inséré dans les valeurs du dictionnaire à la place des parties variables
+_SLOT_MARKER = "\u0000slot:{name}\u0000"
+_ENCODED_SLOT_PATTERN = re.compile(r'\\u0000slot:([A-Za-z0-9_]+)\\u0000')
+
+
+def _is_closing_quote(segment: str) -> bool:
+    """Indique si le segment se termine par un guillemet JSON non échappé."""
+    if not segment.endswith('"'):
+        return False
+    backslashes = len(segment) - len(segment[:-1].rstrip('\\')) - 1
+    return backslashes % 2 == 0
+
+
+class RequestTemplate:
+    """Corps de requête encodé une seule fois, avec des emplacements à compléter.
+
+    Le dictionnaire de requête est sérialisé une fois (description de l'arbre
+    comprise) puis découpé autour des marqueurs `RequestTemplate.slot(nom)`.
+    Chaque requête ne fait qu'insérer les valeurs échappées des emplacements
+    entre les segments déjà encodés en UTF-8.
+
+    Un marqueur peut occuper toute une valeur (il est alors remplacé par
+    n'importe quelle valeur JSON, ou par des `bytes` déjà encodés insérés
+    tels quels) ou être intégré dans une chaîne plus longue (il doit alors
+    être remplacé par une chaîne).
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        encoded = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        parts = _ENCODED_SLOT_PATTERN.split(encoded)
+
+        segments: List[str] = parts[0::2]
+        self.slot_names: List[str] = parts[1::2]
+        self.whole_value_slots: List[bool] = []
+
+        for i in range(len(self.slot_names)):
+            before, after = segments[i], segments[i + 1]
+            whole_value = _is_closing_quote(before) and after.startswith('"')
+            if whole_value:
+                # Retirer les guillemets : la valeur sera insérée déjà encodée
+                segments[i] = before[:-1]
+                segments[i + 1] = after[1:]
+            self.whole_value_slots.append(whole_value)
+
+        self.segments: List[bytes] = [segment.encode('utf-8') for segment in segments]
+        self.size = sum(len(segment) for segment in self.segments)
+
+    @staticmethod
+    def slot(name: str) -> str:
+        """Retourne le marqueur à placer dans le dictionnaire pour l'emplacement `name`."""
+        return _SLOT_MARKER.format(name=name)
+
+    def render(self, **values: Any) -> bytes:
+        """Assemble le corps de la requête avec les valeurs des emplacements."""
+        chunks = [self.segments[0]]
+        for i, name in enumerate(self.slot_names):
+            value = values[name]
+            if self.whole_value_slots[i] and isinstance(value, bytes):
+                chunks.append(value)
+                chunks.append(self.segments[i + 1])
+                continue
+            if self.whole_value_slots[i]:
+                encoded = json.dumps(value, ensure_ascii=False)
+            elif isinstance(value, str):
+                encoded = json.dumps(value, ensure_ascii=False)[1:-1]
+            else:
+                raise TypeError(f"Slot '{name}' is embedded in a string and requires a str value")
+            chunks.append(encoded.encode('utf-8'))
+            chunks.append(self.segments[i + 1])
+        return b''.join(chunks)
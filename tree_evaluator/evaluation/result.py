@@ -1,7 +1,7 @@
 """Classe pour stocker les résultats d'évaluation."""
 
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
 
 
 @dataclass
@@ -22,6 +22,31 @@ class EvaluationResult:
     no_response: bool = False
     reasoning_tokens: int = 0
     reasoning_text: Optional[str] = None
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    queue_time: float = 0.0
     question_type: Optional[str] = None
     is_enigma: bool = False
-    enigma_complexity: Optional[int] = None
\ No newline at end of file
+    enigma_complexity: Optional[int] = None
+    # Mode streaming : délais depuis l'envoi et débit de génération
+    time_to_first_token: Optional[float] = None
+    time_to_first_answer_token: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+    # Timeout appliqué à la dernière tentative (avec response_time pour les expirations)
+    timeout: Optional[float] = None
+
+
+@dataclass
+class ApiResponse:
+    """Réponse brute d'un appel API (avant extraction de la réponse du modèle)."""
+    status: int  # 0 si aucune réponse HTTP n'a été reçue (timeout, erreur réseau)
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    response_time: float = 0.0
+    queue_time: float = 0.0
+    # Mode streaming (voir StreamAccumulator.metrics)
+    time_to_first_token: Optional[float] = None
+    time_to_first_answer_token: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+    stream_cutoff: bool = False  # Lecture arrêtée dès la réponse complète
\ No newline at end of file
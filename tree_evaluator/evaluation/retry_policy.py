@@ -0,0 +1,149 @@
+"""Politique de nouvelles tentatives et disjoncteur par fournisseur."""
+
+import asyncio
+import logging
+import random
+import re
+import time
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Classes d'erreurs d'une tentative
+TRANSPORT = 'transport'  # Connexion refusée, réinitialisée...
+TIMEOUT = 'timeout'
+THROTTLED = 'throttled'  # 429 encore reçu après les renvois du limiteur de débit
+SERVER = 'server'  # 5xx, réponse illisible
+CLIENT = 'client'  # Autres 4xx : la même requête échouera encore
+EMPTY = 'empty'  # Réponse vide ou sans réponse exploitable
+ERROR_CLASSES = (TRANSPORT, TIMEOUT, THROTTLED, SERVER, CLIENT, EMPTY)
+
+_API_ERROR = re.compile(r'^API Error (\d{3})')
+
+
+def classify_error(error: Optional[str], no_response: bool = False) -> Optional[str]:
+    """Classe l'erreur d'un résultat (None si la tentative a réussi)."""
+    if error:
+        if error == "Timeout":
+            return TIMEOUT
+        match = _API_ERROR.match(error)
+        if match:
+            status = int(match.group(1))
+            if status == 429:
+                return THROTTLED
+            if status == 408:
+                return TIMEOUT
+            return SERVER if status >= 500 else CLIENT
+        if error.startswith(("Invalid JSON response", "Stream error")):
+            return SERVER
+        return EMPTY if no_response else TRANSPORT
+    return EMPTY if no_response else None
+
+
+class RetryPolicy:
+    """Nombre de tentatives, erreurs réessayées et délais entre tentatives.
+
+    Les délais suivent un « decorrelated jitter » : chaque attente est tirée
+    entre `base_delay` et trois fois l'attente précédente, plafonnée à
+    `max_delay`, pour que des centaines de requêtes échouées ensemble ne
+    réessaient pas en même temps.
+    """
+
+    DEFAULT_RETRY_ON = (TRANSPORT, TIMEOUT, THROTTLED, SERVER, EMPTY)
+
+    def __init__(self,
+                 max_attempts: int = 3,
+                 base_delay: float = 1.0,
+                 max_delay: float = 30.0,
+                 retry_on: Iterable[str] = DEFAULT_RETRY_ON):
+        unknown = set(retry_on) - set(ERROR_CLASSES)
+        if unknown:
+            raise ValueError(f"Classes d'erreurs inconnues : {', '.join(sorted(unknown))} (attendues : {', '.join(ERROR_CLASSES)})")
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = frozenset(retry_on)
+        # Générateur propre : l'état aléatoire global sert à la génération des benchmarks
+        self._rng = random.Random()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "RetryPolicy":
+        """Construit la politique depuis la clé `retry` d'un modèle."""
+        config = config or {}
+        return cls(
+            max_attempts=config.get('max_attempts', 3),
+            base_delay=config.get('base_delay', 1.0),
+            max_delay=config.get('max_delay', 30.0),
+            retry_on=config.get('retry_on', cls.DEFAULT_RETRY_ON)
+        )
+
+    def should_retry(self, error_class: Optional[str], attempt: int, max_attempts: Optional[int] = None) -> bool:
+        """Indique si la tentative `attempt` (à partir de 0) doit être suivie d'une autre."""
+        return error_class in self.retry_on and attempt + 1 < (max_attempts or self.max_attempts)
+
+    def next_delay(self, previous: Optional[float] = None) -> float:
+        """Attente avant la prochaine tentative, à partir de l'attente précédente."""
+        previous = previous if previous is not None else self.base_delay
+        return min(self.max_delay, self._rng.uniform(self.base_delay, previous * 3))
+
+
+class CircuitBreaker:
+    """Suspend les requêtes vers un fournisseur après une rafale d'échecs.
+
+    Après `failure_threshold` échecs consécutifs (erreurs réseau, timeouts,
+    5xx), les nouvelles requêtes attendent `cooldown` secondes au lieu de
+    consommer les questions restantes contre un service indisponible. À la
+    réouverture, un seul nouvel échec suffit à suspendre à nouveau.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 10, cooldown: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+
+    @classmethod
+    def from_config(cls, name: str, config: Optional[Dict[str, Any]]) -> "CircuitBreaker":
+        config = config if isinstance(config, dict) else {}
+        return cls(name, failure_threshold=config.get('failure_threshold', 10), cooldown=config.get('cooldown', 30.0))
+
+    async def wait(self) -> float:
+        """Attend la fin d'une suspension en cours ; retourne le temps d'attente."""
+        start = time.time()
+        while time.time() < self.open_until:
+            await asyncio.sleep(self.open_until - time.time())
+        return time.time() - start
+
+    def record(self, status: int):
+        """Enregistre le statut HTTP d'une réponse (0 sans réponse)."""
+        if status == 0 or status >= 500:
+            self.consecutive_failures += 1
+            # Les requêtes déjà en vol qui échouent pendant la suspension ne la prolongent pas
+            if self.consecutive_failures >= self.failure_threshold and time.time() >= self.open_until:
+                self.trips += 1
+                self.open_until = time.time() + self.cooldown
+                # Un seul échec après la suspension suffit à la relancer
+                self.consecutive_failures = self.failure_threshold - 1
+                logger.warning(f"Circuit open for {self.name} after repeated failures, pausing requests for {self.cooldown:.0f}s")
+        else:
+            self.consecutive_failures = 0
+
+
+class CircuitBreakerRegistry:
+    """Disjoncteurs partagés par hôte de fournisseur.
+
+    La première configuration `retry.circuit_breaker` rencontrée pour un hôte
+    est utilisée ; `circuit_breaker: false` désactive le disjoncteur du modèle.
+    """
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, host: str, config: Any = None) -> Optional[CircuitBreaker]:
+        if config is False:
+            return None
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker.from_config(host, config)
+        return self._breakers[host]
@@ -2,71 +2,173 @@
 
 import asyncio
 import logging
-from typing import Dict, List, Any
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Union
 
-import aiohttp
-
-from tree_evaluator.tree_generator import generate_tree
-from tree_evaluator.text_converter import convert_tree_to_text
-from tree_evaluator.question_generator import generate_questions
+from .http_pool import HttpPool
 from .model_evaluator import ModelEvaluator
+from .preparation import PreparedBenchmark, prepare_benchmark_async
 from .result import EvaluationResult
 
 logger = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def _session_scope(http_pool: Optional[HttpPool]):
+    """Utilise le pool partagé s'il est fourni, sinon un pool propre au run."""
+    if http_pool is not None:
+        yield http_pool
+    else:
+        async with HttpPool() as pool:
+            yield pool
+
+
+def _split_batches(model: ModelEvaluator,
+                   questions: List[Dict[str, Any]],
+                   tree_description: str,
+                   language: str,
+                   batch_size: Union[int, str]) -> List[List[Dict[str, Any]]]:
+    """Découpe les questions en batches de taille fixe ou adaptée au modèle ('auto')."""
+    if batch_size == 'auto':
+        return model.batcher.plan(questions, tree_description, language)
+    return [questions[i:i + batch_size] for i in range(0, len(questions), batch_size)]
+
+
+async def prepare_run(model: ModelEvaluator,
+                      benchmark_config: Dict[str, Any],
+                      run_index: int = 0,
+                      question_draws: str = 'identical') -> PreparedBenchmark:
+    """Génère (ou charge) le benchmark d'un run hors de la boucle asyncio."""
+    if benchmark_config.get('package'):
+        print(f"  [{model.name}] Chargement du paquet {benchmark_config['package']}...")
+    else:
+        print(f"  [{model.name}] Génération du benchmark {benchmark_config['name']}...")
+    return await prepare_benchmark_async(benchmark_config, run_index, question_draws)
+
+
 async def run_benchmark_evaluation(model: ModelEvaluator,
                                  benchmark_config: Dict[str, Any],
                                  timeout: int = 60,
-                                 batch_size: int = 1) -> List[EvaluationResult]:
-    """Exécute l'évaluation d'un benchmark complet."""
+                                 batch_size: Union[int, str] = 1,
+                                 run_index: int = 0,
+                                 question_draws: str = 'identical',
+                                 http_pool: Optional[HttpPool] = None,
+                                 prepared: Optional[PreparedBenchmark] = None) -> List[EvaluationResult]:
+    """Exécute l'évaluation d'un benchmark complet.
+    
+    Le pool de questions de l'arbre n'est calculé qu'une fois ; chaque run y
+    effectue un tirage selon `question_draws` (voir `prepare_benchmark`).
+    `prepared` permet de fournir un benchmark déjà préparé (voir `prepare_run`).
+    
+    `batch_size` vaut un entier ou 'auto' (taille adaptée aux budgets de tokens
+    du modèle) ; la valeur `batch_size` du modèle est prioritaire.
     
-    # Générer le benchmark
-    print(f"  Génération du benchmark {benchmark_config['name']}...")
-    language = benchmark_config.get('language', 'fr')
-    tree = generate_tree(
-        total_people=benchmark_config['people'],
-        max_depth=benchmark_config['depth'],
-        max_children_per_person=benchmark_config.get('max_children', 3),
-        seed=benchmark_config.get('seed'),
-        num_root_couples=benchmark_config.get('root_couples', 1),
-        language=language
-    )
+    `http_pool` permet de partager les connexions entre tous les runs ; sans
+    lui, un pool est ouvert puis fermé pour ce seul run.
+    """
+    batch_size = model.batch_size or batch_size
+    adaptive = batch_size == 'auto'
     
-    tree_description = convert_tree_to_text(tree, shuffle=False, language=language)
-    enigma_percentage = benchmark_config.get('enigma_percentage', 10)
-    questions = generate_questions(tree, benchmark_config['questions'], language=language, enigma_percentage=enigma_percentage)
+    # Générer le benchmark (ou le lire depuis un paquet pré-construit) s'il n'est pas fourni
+    if prepared is None:
+        prepared = await prepare_run(model, benchmark_config, run_index, question_draws)
+    language = prepared.language
+    tree_description = prepared.tree_description
+    questions = prepared.questions
     
     num_enigmas = sum(1 for q in questions if q.get('type') == 'enigme')
-    print(f"  Évaluation de {len(questions)} questions (dont {num_enigmas} énigmes)...")
-    if batch_size > 1:
-        print(f"  Utilisation du batching (taille: {batch_size})")
+    print(f"  [{model.name}] Évaluation de {len(questions)} questions (dont {num_enigmas} énigmes)...")
+    if model.conversation and not model.batch_api:
+        print(f"  [{model.name}] Mode conversation ({model.conversation.parallel} conversation(s), historique: {model.conversation.history} tours)")
+    elif adaptive:
+        print(f"  [{model.name}] Utilisation du batching adaptatif (taille cible: {model.batcher.target_size})")
+    elif batch_size > 1:
+        print(f"  [{model.name}] Utilisation du batching (taille: {batch_size})")
     
-    # Créer une session HTTP
-    async with aiohttp.ClientSession() as session:
+    # Connexions HTTP (partagées avec les autres runs si un pool est fourni)
+    async with _session_scope(http_pool) as session:
         results = []
         
-        if batch_size > 1:
-            # Évaluation par batch
-            for i in range(0, len(questions), batch_size):
-                batch = questions[i:i + batch_size]
-                batch_results = await model.evaluate_questions_batch(
-                    tree_description, batch, session, timeout, language
+        if model.batch_api:
+            # Soumission hors ligne : toutes les requêtes du run forment un seul batch fournisseur
+            print(f"  [{model.name}] Soumission via l'API batch du fournisseur...")
+            batch_prompt = adaptive or batch_size > 1
+            batches = _split_batches(model, questions, tree_description, language, batch_size) if batch_prompt else [[q] for q in questions]
+            results = await model.evaluate_offline(
+                tree_description, batches, session, language, batch_prompt,
+                job_name=f"{benchmark_config['name']}_run{run_index + 1}"
+            )
+        elif model.conversation:
+            # Conversations : l'arbre est envoyé une fois par conversation, puis
+            # les questions se succèdent ; les conversations partent en parallèle
+            done = 0
+            
+            def report_progress(result: EvaluationResult):
+                nonlocal done
+                done += 1
+                if len(questions) > 10 and done % 10 == 0:
+                    print(f"    [{model.name}] Progress: {done}/{len(questions)} questions")
+            
+            conversations = await asyncio.gather(*(
+                model.evaluate_conversation(tree_description, conversation, session, timeout, language, on_result=report_progress)
+                for conversation in model.conversation.split(questions)
+            ))
+            for conversation_results in conversations:
+                results.extend(conversation_results)
+        elif adaptive or batch_size > 1:
+            # Évaluation par batch : les batches partent en parallèle, sous les
+            # limites de concurrence et de débit appliquées à chaque requête
+            batches = _split_batches(model, questions, tree_description, language, batch_size)
+            batch_results: List[Optional[List[EvaluationResult]]] = [None] * len(batches)
+            done = 0
+            
+            async def evaluate_batch(index: int):
+                batch_results[index] = await model.evaluate_questions_batch(
+                    tree_description, batches[index], session, timeout, language
                 )
-                results.extend(batch_results)
-                
-                # Afficher la progression
+                return index
+            
+            def report_progress(index: int):
+                nonlocal done
+                done += len(batches[index])
+                # Afficher la progression, dans l'ordre de complétion
                 if len(questions) > 10:
-                    progress = min(i + batch_size, len(questions))
-                    print(f"    Progress: {progress}/{len(questions)} questions")
+                    print(f"    [{model.name}] Progress: {done}/{len(questions)} questions")
+            
+            pending = list(range(len(batches)))
+            if (model.prompt_cache or adaptive) and len(batches) > 1:
+                # Batch de chauffe : amorce le cache de préfixe avant les autres
+                # et donne une première mesure au batching adaptatif
+                report_progress(await evaluate_batch(pending.pop(0)))
+                if adaptive:
+                    # Redécouper les questions restantes avec la taille ajustée
+                    remaining = [q for index in pending for q in batches[index]]
+                    batches = batches[:1] + model.batcher.plan(remaining, tree_description, language)
+                    batch_results = batch_results[:1] + [None] * (len(batches) - 1)
+                    pending = list(range(1, len(batches)))
+            
+            for completed in asyncio.as_completed([evaluate_batch(index) for index in pending]):
+                report_progress(await completed)
+            
+            # Réassembler les résultats dans l'ordre des questions
+            for batch_result in batch_results:
+                results.extend(batch_result)
         else:
             # Évaluation individuelle (comportement original)
+            remaining = questions
+            if model.prompt_cache and len(questions) > 1:
+                # Requête de chauffe : amorce le cache de préfixe du fournisseur
+                # avant d'envoyer les autres questions en parallèle
+                warmup_result = await model.evaluate_question(tree_description, questions[0], session, timeout, language)
+                results.append(warmup_result)
+                remaining = questions[1:]
+            
             tasks = []
-            for question in questions:
+            for question in remaining:
                 task = model.evaluate_question(tree_description, question, session, timeout, language)
                 tasks.append(task)
             
-            results = await asyncio.gather(*tasks)
+            results.extend(await asyncio.gather(*tasks))
     
     # Ajouter le nom du benchmark
     for result in results:
@@ -0,0 +1,127 @@
+"""Plusieurs complétions par appel (`n`) partagées entre les runs d'un benchmark."""
+
+import asyncio
+import copy
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List
+
+from .result import ApiResponse
+
+logger = logging.getLogger(__name__)
+
+
+def _divide_usage(usage: Any, samples: int) -> Any:
+    """Répartit les compteurs d'usage d'une réponse entre ses complétions."""
+    if isinstance(usage, dict):
+        return {key: _divide_usage(value, samples) for key, value in usage.items()}
+    if isinstance(usage, int) and not isinstance(usage, bool):
+        return usage // samples
+    return usage
+
+
+def split_choices(response: ApiResponse, samples: int) -> List[ApiResponse]:
+    """Découpe une réponse à `n` complétions en réponses à une complétion chacune."""
+    choices = (response.data or {}).get('choices') or []
+    if response.error or len(choices) < 2:
+        return [response]
+
+    usage = _divide_usage(response.data.get('usage') or {}, len(choices))
+    responses = []
+    for choice in sorted(choices, key=lambda c: c.get('index', 0)):
+        data = {key: value for key, value in response.data.items() if key not in ('choices', 'usage')}
+        data['choices'] = [dict(choice, index=0)]
+        data['usage'] = copy.deepcopy(usage)
+        single = copy.copy(response)
+        single.data = data
+        responses.append(single)
+    return responses[:samples]
+
+
+class SampleSharer:
+    """Demande `samples` complétions pour un prompt et les distribue aux runs.
+
+    Avec des tirages de questions identiques, chaque run d'un benchmark
+    envoie exactement le même corps de requête. Le premier envoi demande
+    `n` complétions ; les envois identiques suivants (autres runs) reçoivent
+    les complétions restantes sans nouvel appel, la description de l'arbre
+    n'étant traitée qu'une fois. Si le fournisseur ignore `n` (une seule
+    complétion renvoyée), le partage est désactivé et chaque run envoie sa
+    propre requête.
+    Les nouvelles tentatives ne passent pas par le partage (voir
+    `ModelEvaluator._send`) : un renvoi du même corps prendrait sinon la
+    complétion réservée à un autre run.
+
+    Les complétions restantes d'un prompt sont retirées dès que toutes sont
+    reprises ; celles qu'aucun run ne réclame (run en échec ou interrompu)
+    sont abandonnées au-delà des `max_prompts` prompts les plus récents.
+    """
+
+    def __init__(self, samples: int, max_prompts: int = 1024):
+        self.samples = samples
+        self.max_prompts = max_prompts
+        self.supported = True
+        self.requests = 0
+        self.shared = 0
+        self.dropped = 0
+        self._leftovers: OrderedDict = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def with_n(body: bytes, samples: int) -> bytes:
+        """Ajoute le paramètre `n` à un corps JSON déjà encodé."""
+        return b'{"n":' + str(samples).encode('ascii') + b',' + body[1:]
+
+    async def send(self, body: bytes, send: Callable[[bytes], Awaitable[ApiResponse]]) -> ApiResponse:
+        """Retourne une complétion pour `body`, déjà reçue ou demandée avec `n`."""
+        key = hashlib.sha256(body).hexdigest()
+        while True:
+            leftovers = self._leftovers.get(key)
+            if leftovers:
+                response = leftovers.pop()
+                if leftovers:
+                    self._leftovers.move_to_end(key)
+                else:
+                    del self._leftovers[key]
+                self.shared += 1
+                response.queue_time = 0.0
+                return response
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                break
+            # Le même prompt est en cours pour un autre run : attendre ses complétions
+            await asyncio.shield(in_flight)
+
+        if not self.supported:
+            return await send(body)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            self.requests += 1
+            response = await send(self.with_n(body, self.samples))
+        finally:
+            del self._in_flight[key]
+            future.set_result(None)
+
+        samples = split_choices(response, self.samples)
+        if not response.error and response.data and len(samples) < self.samples and self.supported:
+            self.supported = False
+            logger.warning(f"Provider returned {len(samples)} completion(s) for n={self.samples}, sending separate requests per run")
+        if len(samples) > 1:
+            self._leftovers[key] = samples[1:]
+            while len(self._leftovers) > self.max_prompts:
+                _, unclaimed = self._leftovers.popitem(last=False)
+                self.dropped += len(unclaimed)
+        return samples[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Requêtes multi-complétions envoyées, complétions servies sans appel et abandonnées."""
+        return {
+            'samples_per_request': self.samples,
+            'multi_sample_requests': self.requests,
+            'shared_completions': self.shared,
+            'dropped_completions': self.dropped,
+            'n_supported': self.supported
+        }
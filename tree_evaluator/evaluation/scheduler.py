@@ -0,0 +1,110 @@
+"""Ordonnanceur global des évaluations (modèles × benchmarks × runs)."""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .http_pool import HttpPool
+from .model_evaluator import ModelEvaluator
+from .result import EvaluationResult
+from .runner import prepare_run, run_benchmark_evaluation
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EvaluationJob:
+    """Un run d'un benchmark pour un modèle ; ses questions sont évaluées en parallèle."""
+    model: ModelEvaluator
+    benchmark: Dict[str, Any]
+    benchmark_index: int
+    run_index: int
+    total_runs: int
+
+
+def expand_jobs(models: List[ModelEvaluator], benchmarks: List[Dict[str, Any]], runs: int) -> List[EvaluationJob]:
+    """Développe la configuration en une liste de jobs modèle × benchmark × run."""
+    return [
+        EvaluationJob(model, benchmark, benchmark_index, run_index, runs)
+        for model in models
+        for benchmark_index, benchmark in enumerate(benchmarks)
+        for run_index in range(runs)
+    ]
+
+
+async def run_jobs(jobs: List[EvaluationJob],
+                   timeout: int = 60,
+                   batch_size: Union[int, str] = 1,
+                   question_draws: str = 'identical',
+                   max_concurrent_jobs: Optional[int] = None,
+                   prefetch: int = 1,
+                   http_pool: Optional[HttpPool] = None,
+                   on_complete: Optional[Callable[[EvaluationJob, List[EvaluationResult]], None]] = None) -> Dict[str, List[EvaluationResult]]:
+    """Exécute tous les jobs simultanément, sous les limites de concurrence et de débit des modèles.
+
+    Un modèle lent ne bloque plus les autres : la durée totale tend vers celle
+    du modèle le plus lent plutôt que vers la somme des durées.
+
+    Les benchmarks sont générés dans un thread à part, dans l'ordre des jobs :
+    la génération du suivant avance pendant que les jobs déjà prêts attendent
+    le réseau, au lieu de s'ajouter à leur durée.
+
+    Args:
+        max_concurrent_jobs: Nombre maximal de runs évalués en même temps
+        prefetch: Nombre de runs préparés d'avance au-delà de `max_concurrent_jobs`
+        http_pool: Connexions HTTP partagées par tous les jobs
+        on_complete: Appelé à la fin de chaque job, dans l'ordre de complétion
+
+    Returns:
+        Résultats par nom de modèle, dans l'ordre de la configuration
+        (benchmark puis run), quel que soit l'ordre de complétion.
+    """
+    semaphore = asyncio.Semaphore(max_concurrent_jobs) if max_concurrent_jobs else None
+    # Borne les benchmarks préparés mais pas encore évalués
+    prepared_slots = asyncio.Semaphore(max_concurrent_jobs + prefetch) if max_concurrent_jobs else None
+    completed: Dict[int, List[EvaluationResult]] = {}
+
+    # Tirages identiques : les runs envoient les mêmes prompts et peuvent partager un appel à `n` complétions
+    if question_draws == 'identical':
+        for model in {id(job.model): job.model for job in jobs if job.total_runs > 1}.values():
+            model.enable_multi_sample(max(job.total_runs for job in jobs if job.model is model))
+
+    async def run_job(index: int, job: EvaluationJob):
+        if prepared_slots:
+            await prepared_slots.acquire()
+        try:
+            prepared = await prepare_run(job.model, job.benchmark, job.run_index, question_draws)
+            if semaphore:
+                await semaphore.acquire()
+            try:
+                results = await run_benchmark_evaluation(
+                    job.model,
+                    job.benchmark,
+                    timeout,
+                    batch_size,
+                    run_index=job.run_index,
+                    question_draws=question_draws,
+                    http_pool=http_pool,
+                    prepared=prepared
+                )
+            finally:
+                if semaphore:
+                    semaphore.release()
+        except Exception as e:
+            logger.error(f"Job failed for {job.model.name} on {job.benchmark['name']} (run {job.run_index + 1}): {str(e)}", exc_info=True)
+            return
+        finally:
+            if prepared_slots:
+                prepared_slots.release()
+
+        completed[index] = results
+        if on_complete:
+            on_complete(job, results)
+
+    await asyncio.gather(*(run_job(index, job) for index, job in enumerate(jobs)))
+
+    results_by_model: Dict[str, List[EvaluationResult]] = {job.model.name: [] for job in jobs}
+    for index, job in enumerate(jobs):
+        results_by_model[job.model.name].extend(completed.get(index, []))
+    return results_by_model
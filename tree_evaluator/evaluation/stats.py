@@ -14,11 +14,19 @@ def calculate_summary_stats(results: List[EvaluationResult]) -> Dict[str, Any]:
     exact_matches = sum(1 for r in results if r.is_exact_match)
     avg_partial_score = sum(r.partial_match_score for r in results) / total
     avg_response_time = sum(r.response_time for r in results) / total
+    avg_queue_time = sum(r.queue_time for r in results) / total
     total_tokens = sum(r.tokens_used for r in results)
     errors = sum(1 for r in results if r.error)
     no_responses = sum(1 for r in results if r.no_response)
     total_reasoning_tokens = sum(r.reasoning_tokens for r in results)
     questions_with_reasoning = sum(1 for r in results if r.reasoning_tokens > 0)
+    total_prompt_tokens = sum(r.prompt_tokens for r in results)
+    total_cached_tokens = sum(r.cached_tokens for r in results)
+    
+    # Mesures du mode streaming (absentes sans streaming)
+    ttfts = [r.time_to_first_token for r in results if r.time_to_first_token is not None]
+    answer_ttfts = [r.time_to_first_answer_token for r in results if r.time_to_first_answer_token is not None]
+    throughputs = [r.tokens_per_second for r in results if r.tokens_per_second is not None]
     
     # Statistiques pour les énigmes
     enigma_results = [r for r in results if r.is_enigma]
@@ -64,6 +72,8 @@ def calculate_summary_stats(results: List[EvaluationResult]) -> Dict[str, Any]:
         'exact_match_rate': exact_matches / total,
         'avg_partial_score': avg_partial_score,
         'avg_response_time': avg_response_time,
+        'avg_queue_time': avg_queue_time,
+        'max_queue_time': max(r.queue_time for r in results),
         'total_tokens': total_tokens,
         'errors': errors,
         'error_rate': errors / total,
@@ -72,6 +82,12 @@ def calculate_summary_stats(results: List[EvaluationResult]) -> Dict[str, Any]:
         'total_reasoning_tokens': total_reasoning_tokens,
         'questions_with_reasoning': questions_with_reasoning,
         'avg_reasoning_tokens': total_reasoning_tokens / questions_with_reasoning if questions_with_reasoning > 0 else 0,
+        'total_prompt_tokens': total_prompt_tokens,
+        'total_cached_tokens': total_cached_tokens,
+        'cache_hit_rate': total_cached_tokens / total_prompt_tokens if total_prompt_tokens > 0 else 0,
+        'avg_time_to_first_token': sum(ttfts) / len(ttfts) if ttfts else 0,
+        'avg_time_to_first_answer_token': sum(answer_ttfts) / len(answer_ttfts) if answer_ttfts else 0,
+        'avg_tokens_per_second': sum(throughputs) / len(throughputs) if throughputs else 0,
         'enigma_stats': enigma_stats,
         'normal_stats': normal_stats
     }
\ No newline at end of file
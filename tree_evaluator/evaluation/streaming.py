@@ -0,0 +1,133 @@
+"""Lecture incrémentale des réponses en streaming (server-sent events)."""
+
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+STREAM_DONE = "[DONE]"
+
+
+async def iter_sse_data(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Produit le champ `data` de chaque événement SSE (lignes jointes par `\\n`)."""
+    data_lines: List[str] = []
+    async for line in lines:
+        if not line:
+            if data_lines:
+                yield "\n".join(data_lines)
+                data_lines = []
+            continue
+        if line.startswith(':'):
+            continue  # Commentaire (keep-alive)
+        field, _, value = line.partition(':')
+        if field == 'data':
+            data_lines.append(value[1:] if value.startswith(' ') else value)
+    if data_lines:
+        yield "\n".join(data_lines)
+
+
+class StreamAccumulator:
+    """Reconstitue la réponse complète d'un flux et mesure ses latences.
+
+    Les événements OpenAI (`choices[].delta`) et Anthropic (`content_block_delta`,
+    `message_delta`) sont réassemblés dans le format des réponses non streamées,
+    pour que l'extraction et la notation restent inchangées. Les instants sont
+    relatifs à `start_time` (envoi de la requête).
+    """
+
+    def __init__(self, anthropic: bool, start_time: Optional[float] = None):
+        self.anthropic = anthropic
+        self.start_time = start_time if start_time is not None else time.time()
+        self.content: List[str] = []
+        self.reasoning: List[str] = []
+        self.usage: Dict[str, Any] = {}
+        self.chunks = 0
+        self.error: Optional[str] = None
+        self.first_token_time: Optional[float] = None
+        self.first_answer_time: Optional[float] = None
+        self.last_token_time: Optional[float] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.content)
+
+    def add(self, data: str) -> str:
+        """Ajoute un événement et retourne le texte de réponse qu'il apporte."""
+        if data == STREAM_DONE:
+            return ""
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return ""
+        if event.get('error'):
+            self.error = f"Stream error: {event['error']}"
+            return ""
+
+        if self.anthropic:
+            answer, reasoning = self._add_anthropic(event)
+        else:
+            answer, reasoning = self._add_openai(event)
+
+        if answer or reasoning:
+            now = time.time()
+            self.chunks += 1
+            self.last_token_time = now
+            if self.first_token_time is None:
+                self.first_token_time = now
+            if answer and self.first_answer_time is None:
+                self.first_answer_time = now
+        if answer:
+            self.content.append(answer)
+        if reasoning:
+            self.reasoning.append(reasoning)
+        return answer
+
+    def _add_openai(self, event: Dict[str, Any]):
+        if event.get('usage'):
+            self.usage = event['usage']
+        choices = event.get('choices') or []
+        if not choices:
+            return "", ""
+        delta = choices[0].get('delta') or {}
+        reasoning = delta.get('reasoning') or delta.get('reasoning_content') or ""
+        return delta.get('content') or "", reasoning
+
+    def _add_anthropic(self, event: Dict[str, Any]):
+        event_type = event.get('type')
+        if event_type == 'message_start':
+            self.usage.update((event.get('message') or {}).get('usage') or {})
+        elif event_type == 'message_delta':
+            self.usage.update(event.get('usage') or {})
+        elif event_type == 'content_block_delta':
+            delta = event.get('delta') or {}
+            if delta.get('type') == 'thinking_delta':
+                return "", delta.get('thinking') or ""
+            return delta.get('text') or "", ""
+        return "", ""
+
+    def completion_tokens(self) -> int:
+        """Tokens générés : usage du fournisseur, sinon nombre de fragments reçus."""
+        key = 'output_tokens' if self.anthropic else 'completion_tokens'
+        return self.usage.get(key) or self.chunks
+
+    def to_response(self) -> Dict[str, Any]:
+        """Réponse au format non streamé de l'API."""
+        usage = dict(self.usage)
+        if self.anthropic:
+            usage['output_tokens'] = self.completion_tokens()
+            return {'content': [{'type': 'text', 'text': self.text}], 'usage': usage}
+        usage['completion_tokens'] = self.completion_tokens()
+        message: Dict[str, Any] = {'role': 'assistant', 'content': self.text}
+        if self.reasoning:
+            message['reasoning'] = "".join(self.reasoning)
+        return {'choices': [{'index': 0, 'message': message}], 'usage': usage}
+
+    def metrics(self) -> Dict[str, Optional[float]]:
+        """Délais avant le premier token et la première partie de réponse, débit en tokens/s."""
+        tokens_per_second = None
+        if self.first_token_time is not None and self.last_token_time > self.first_token_time:
+            tokens_per_second = self.completion_tokens() / (self.last_token_time - self.first_token_time)
+        return {
+            'time_to_first_token': self.first_token_time - self.start_time if self.first_token_time is not None else None,
+            'time_to_first_answer_token': self.first_answer_time - self.start_time if self.first_answer_time is not None else None,
+            'tokens_per_second': tokens_per_second
+        }
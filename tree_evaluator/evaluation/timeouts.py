@@ -0,0 +1,78 @@
+"""Timeouts adaptés aux latences observées de chaque modèle."""
+
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Optional
+
+
+class AdaptiveTimeout:
+    """Timeout par type de requête dérivé de la distribution des latences.
+
+    Le timeout d'un type (type de question, ou `batch` rapporté à une
+    question) vaut le `quantile` des dernières latences multiplié par
+    `factor`, borné par `floor` et `ceiling`. Tant que `min_samples`
+    latences n'ont pas été observées, le timeout global est utilisé. Les
+    requêtes expirées sont comptées avec leur durée : une série de timeouts
+    fait donc remonter le timeout au lieu de le figer.
+    """
+
+    def __init__(self,
+                 quantile: float = 0.99,
+                 factor: float = 2.0,
+                 floor: float = 5.0,
+                 ceiling: float = 600.0,
+                 min_samples: int = 10,
+                 window: int = 200):
+        if not 0 < quantile <= 1:
+            raise ValueError(f"quantile doit être entre 0 et 1 (reçu : {quantile})")
+        self.quantile = quantile
+        self.factor = factor
+        self.floor = floor
+        self.ceiling = ceiling
+        self.min_samples = min_samples
+        self.window = window
+        self._latencies: Dict[Hashable, Deque[float]] = {}
+
+    @classmethod
+    def from_config(cls, config: Any) -> Optional["AdaptiveTimeout"]:
+        """Construit les timeouts depuis la clé `adaptive_timeout` d'un modèle (None si absente)."""
+        if not config:
+            return None
+        config = config if isinstance(config, dict) else {}
+        return cls(
+            quantile=config.get('quantile', 0.99),
+            factor=config.get('factor', 2.0),
+            floor=config.get('floor', 5.0),
+            ceiling=config.get('ceiling', 600.0),
+            min_samples=config.get('min_samples', 10),
+            window=config.get('window', 200)
+        )
+
+    def _estimate(self, kind: Hashable) -> Optional[float]:
+        latencies = self._latencies.get(kind)
+        if not latencies or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))] * self.factor
+
+    def timeout_for(self, kind: Hashable, default: float, scale: int = 1) -> float:
+        """Timeout d'une requête de ce type (`scale` : nombre de questions d'un batch)."""
+        estimate = self._estimate(kind)
+        value = default if estimate is None else estimate * scale
+        return min(self.ceiling, max(self.floor, value))
+
+    def observe(self, kind: Hashable, latency: float, scale: int = 1):
+        """Enregistre la durée d'une requête réussie ou expirée."""
+        latencies = self._latencies.get(kind)
+        if latencies is None:
+            latencies = self._latencies[kind] = deque(maxlen=self.window)
+        latencies.append(latency / scale)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Mesures et timeout courant (par question pour les batchs) de chaque type."""
+        return {
+            str(kind): {
+                'samples': len(latencies),
+                'timeout': self._estimate(kind)
+            }
+            for kind, latencies in self._latencies.items()
+        }
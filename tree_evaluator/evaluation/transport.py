@@ -0,0 +1,233 @@
+"""Transports HTTP interchangeables sous `ModelEvaluator` (aiohttp, httpx/HTTP2)."""
+
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+import aiohttp
+
+from .concurrency import ConcurrencyLimiter
+
+TRANSPORTS = ('aiohttp', 'httpx')
+
+
+class TransportError(Exception):
+    """Erreur réseau d'un transport (connexion refusée, réinitialisée...)."""
+
+
+class TransportResponse:
+    """Réponse HTTP complète, indépendante du transport utilisé."""
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes, http_version: str = "HTTP/1.1"):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.http_version = http_version
+
+    def text(self) -> str:
+        return self.body.decode('utf-8', errors='replace')
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class TransportStream:
+    """Réponse HTTP dont le corps est lu ligne par ligne (server-sent events)."""
+
+    def __init__(self,
+                 status: int,
+                 headers: Dict[str, str],
+                 lines: AsyncIterator[str],
+                 read: Callable[[], Awaitable[bytes]],
+                 http_version: str = "HTTP/1.1"):
+        self.status = status
+        self.headers = headers
+        self.lines = lines  # Sans fin de ligne
+        self.read = read  # Corps complet (réponses d'erreur)
+        self.http_version = http_version
+
+
+class Transport(ABC):
+    """Interface minimale d'envoi d'une requête POST.
+
+    `post` lève `asyncio.TimeoutError` en cas d'expiration et `TransportError`
+    pour les autres erreurs réseau ; les statuts HTTP d'erreur sont retournés.
+    `stream` fait de même dans un `async with` qui fournit un `TransportStream` :
+    sortir du bloc avant la fin du corps ferme la réponse.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def post(self, url: str, body: bytes, headers: Dict[str, str], timeout: Optional[float]) -> TransportResponse:
+        """Envoie la requête et lit le corps complet de la réponse."""
+
+    @abstractmethod
+    def stream(self, url: str, body: bytes, headers: Dict[str, str], timeout: Optional[float]):
+        """Gestionnaire de contexte asynchrone fournissant un `TransportStream`."""
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {}
+
+    async def close(self):
+        pass
+
+
+class AiohttpTransport(Transport):
+    """Transport par défaut (HTTP/1.1) sur un `HttpPool` ou une `aiohttp.ClientSession`."""
+
+    name = "aiohttp"
+
+    def __init__(self, session):
+        self.session = session
+
+    async def post(self, url: str, body: bytes, headers: Dict[str, str], timeout: Optional[float]) -> TransportResponse:
+        try:
+            async with self.session.post(url, data=body, headers=headers, timeout=timeout) as response:
+                return TransportResponse(
+                    response.status,
+                    dict(response.headers),
+                    await response.read(),
+                    f"HTTP/{response.version.major}.{response.version.minor}"
+                )
+        except aiohttp.ClientError as e:
+            raise TransportError(str(e)) from e
+
+    @staticmethod
+    async def _lines(content: aiohttp.StreamReader) -> AsyncIterator[str]:
+        async for line in content:
+            yield line.decode('utf-8', errors='replace').rstrip('\r\n')
+
+    @asynccontextmanager
+    async def stream(self, url: str, body: bytes, headers: Dict[str, str], timeout: Optional[float]) -> AsyncIterator[TransportStream]:
+        try:
+            async with self.session.post(url, data=body, headers=headers, timeout=timeout) as response:
+                yield TransportStream(
+                    response.status,
+                    dict(response.headers),
+                    self._lines(response.content),
+                    response.read,
+                    f"HTTP/{response.version.major}.{response.version.minor}"
+                )
+        except aiohttp.ClientError as e:
+            raise TransportError(str(e)) from e
+
+
+class HttpxTransport(Transport):
+    """Transport httpx, en HTTP/2 si le serveur le négocie (extra `httpx[http2]`).
+
+    En HTTP/2, les requêtes simultanées vers un même hôte sont multiplexées
+    sur quelques connexions au lieu d'ouvrir une connexion TCP/TLS chacune.
+    HTTP/2 n'est négocié que sur TLS ; `http2_prior_knowledge` l'impose aussi
+    en clair (serveur local h2c).
+    """
+
+    name = "httpx"
+
+    def __init__(self,
+                 http2: bool = True,
+                 max_connections: int = 100,
+                 keepalive_timeout: float = 60.0,
+                 connect_timeout: Optional[float] = None,
+                 first_byte_timeout: Optional[float] = None,
+                 http2_prior_knowledge: bool = False):
+        try:
+            import httpx
+            client = httpx.AsyncClient(
+                http1=not http2_prior_knowledge,
+                http2=http2 or http2_prior_knowledge,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=keepalive_timeout
+                )
+            )
+        except ImportError as e:
+            raise ImportError("Le transport 'httpx' nécessite le paquet httpx[http2] (pip install 'httpx[http2]')") from e
+        self._httpx = httpx
+        self.client = client
+        self.connect_timeout = connect_timeout
+        self.first_byte_timeout = first_byte_timeout
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _host_stats(self, url: str) -> Dict[str, float]:
+        return self._stats.setdefault(ConcurrencyLimiter.host_of(url), {
+            'requests': 0, 'errors': 0, 'http2_requests': 0,
+            'connections_created': 0, 'connections_reused': 0, 'connect_time': 0.0
+        })
+
+    def _trace(self, stats: Dict[str, float], connect_start: list):
+        async def trace(event_name: str, info: Dict[str, Any]):
+            # Événements httpcore : une connexion n'est ouverte que si le pool n'en a pas de libre
+            if event_name == 'connection.connect_tcp.started':
+                connect_start.append(time.monotonic())
+            elif event_name == 'connection.connect_tcp.complete' and connect_start:
+                stats['connections_created'] += 1
+                stats['connect_time'] += time.monotonic() - connect_start[0]
+        return trace
+
+    def _timeout(self, timeout: Optional[float]):
+        return self._httpx.Timeout(
+            timeout,
+            connect=self.connect_timeout or timeout,
+            read=self.first_byte_timeout or timeout
+        )
+
+    def _record(self, stats: Dict[str, float], connect_start: list, http_version: str):
+        if not connect_start:
+            stats['connections_reused'] += 1
+        if http_version == "HTTP/2":
+            stats['http2_requests'] += 1
+
+    async def post(self, url: str, body: bytes, headers: Dict[str, str], timeout: Optional[float]) -> TransportResponse:
+        stats = self._host_stats(url)
+        stats['requests'] += 1
+        connect_start = []
+        trace = self._trace(stats, connect_start)
+        request_timeout = self._timeout(timeout)
+        try:
+            # httpx n'a pas de durée totale : elle est bornée par asyncio
+            response = await asyncio.wait_for(
+                self.client.post(url, content=body, headers=headers, timeout=request_timeout, extensions={'trace': trace}),
+                timeout
+            )
+        except (asyncio.TimeoutError, self._httpx.TimeoutException) as e:
+            stats['errors'] += 1
+            raise asyncio.TimeoutError() from e
+        except self._httpx.HTTPError as e:
+            stats['errors'] += 1
+            raise TransportError(str(e)) from e
+
+        self._record(stats, connect_start, response.http_version)
+        return TransportResponse(response.status_code, dict(response.headers), response.content, response.http_version)
+
+    @asynccontextmanager
+    async def stream(self, url: str, body: bytes, headers: Dict[str, str], timeout: Optional[float]) -> AsyncIterator[TransportStream]:
+        # La durée totale est bornée par l'appelant, qui lit le flux
+        stats = self._host_stats(url)
+        stats['requests'] += 1
+        connect_start = []
+        try:
+            async with self.client.stream(
+                "POST", url, content=body, headers=headers,
+                timeout=self._timeout(timeout), extensions={'trace': self._trace(stats, connect_start)}
+            ) as response:
+                self._record(stats, connect_start, response.http_version)
+                yield TransportStream(
+                    response.status_code, dict(response.headers), response.aiter_lines(), response.aread, response.http_version
+                )
+        except self._httpx.TimeoutException as e:
+            stats['errors'] += 1
+            raise asyncio.TimeoutError() from e
+        except self._httpx.HTTPError as e:
+            stats['errors'] += 1
+            raise TransportError(str(e)) from e
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return self._stats
+
+    async def close(self):
+        await self.client.aclose()
@@ -2,7 +2,7 @@
 
 import random
 import json
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
 from tree_evaluator.models import Person
 
@@ -32,8 +32,12 @@ from tree_evaluator.questions.advanced import (
 from tree_evaluator.questions.enigma import generate_enigma_questions
 
 
-def generate_questions(people: Dict[str, Person], num_questions: int, language: str = "fr", enigma_percentage: int = 10) -> List[Dict[str, Any]]:
-    """Génère une liste de questions de différents types."""
+def build_question_pool(people: Dict[str, Person], language: str = "fr") -> Dict[str, List[Dict[str, Any]]]:
+    """Génère l'ensemble dédupliqué des questions possibles pour un arbre.
+    
+    Returns:
+        Dictionnaire avec les questions normales (`normal`) et les énigmes (`enigma`).
+    """
     
     # Générer d'abord les questions normales
     normal_questions = []
@@ -61,20 +65,40 @@ def generate_questions(people: Dict[str, Person], num_questions: int, language:
     unique_enigma_map = {json.dumps(q, sort_keys=True): q for q in enigma_questions}
     unique_enigma_questions = list(unique_enigma_map.values())
     
+    return {"normal": unique_normal_questions, "enigma": unique_enigma_questions}
+
+
+def draw_questions(pool: Dict[str, List[Dict[str, Any]]],
+                   num_questions: int,
+                   enigma_percentage: int = 10,
+                   rng: Optional[random.Random] = None,
+                   draw_index: int = 0) -> List[Dict[str, Any]]:
+    """Tire des questions depuis un pool sans le modifier.
+    
+    Args:
+        pool: Pool retourné par `build_question_pool`
+        rng: Générateur aléatoire (par défaut, le module `random` global)
+        draw_index: Rang du tirage ; avec le même état de `rng`, des rangs
+            différents donnent des tirages disjoints
+    """
+    rng = rng or random
+    
     # Calculer le nombre d'énigmes à inclure
     num_enigmas = int(num_questions * enigma_percentage / 100)
     num_normal = num_questions - num_enigmas
     
     # Sélectionner les questions
-    random.shuffle(unique_normal_questions)
-    random.shuffle(unique_enigma_questions)
+    normal_questions = list(pool["normal"])
+    enigma_questions = list(pool["enigma"])
+    rng.shuffle(normal_questions)
+    rng.shuffle(enigma_questions)
     
-    selected_normal = unique_normal_questions[:num_normal]
-    selected_enigmas = unique_enigma_questions[:num_enigmas]
+    selected_normal = normal_questions[draw_index * num_normal:(draw_index + 1) * num_normal]
+    selected_enigmas = enigma_questions[draw_index * num_enigmas:(draw_index + 1) * num_enigmas]
     
-    # Combiner et mélanger
-    all_selected = selected_normal + selected_enigmas
-    random.shuffle(all_selected)
+    # Combiner et mélanger (copies : le pool reste réutilisable)
+    all_selected = [dict(q) for q in selected_normal + selected_enigmas]
+    rng.shuffle(all_selected)
     
     # Assigner les IDs
     for i, q in enumerate(all_selected):
@@ -83,6 +107,12 @@ def generate_questions(people: Dict[str, Person], num_questions: int, language:
     return all_selected
 
 
+def generate_questions(people: Dict[str, Person], num_questions: int, language: str = "fr", enigma_percentage: int = 10) -> List[Dict[str, Any]]:
+    """Génère une liste de questions de différents types."""
+    pool = build_question_pool(people, language)
+    return draw_questions(pool, num_questions, enigma_percentage)
+
+
 # Pour la compatibilité avec l'ancien code, exporter les helpers qui étaient dans ce fichier
 from tree_evaluator.questions.base import (
     format_answer as _format_answer,
@@ -1,38 +1,30 @@
 import random
-from typing import Dict, List
+from typing import Dict, List, Optional
 from tree_evaluator.models import Person
 from tree_evaluator.translations import get_translation
 
-def convert_tree_to_text(people: Dict[str, Person], shuffle: bool = False, language: str = "fr") -> str:
-    """Convertit le dictionnaire de personnes en une description textuelle.
-    
-    Args:
-        people: Dictionnaire des personnes
-        shuffle: Si True, mélange l'ordre des personnes et des informations
-    """
-    if not people:
-        return ""
+def _format_person(person: Person) -> str:
+    """Retourne le nom affiché d'une personne, ex: `Marie (F)`."""
+    return f'{person.first_name} ({person.gender})'
 
-    # Obtenir la liste des personnes
-    people_list = list(people.values())
+def render_person_fragments(people: Dict[str, Person], language: str = "fr") -> Dict[str, List[str]]:
+    """Rend une seule fois les phrases décrivant chaque personne.
     
-    if shuffle:
-        # Mélanger complètement l'ordre des personnes
-        random.shuffle(people_list)
-    else:
-        # Ordre par défaut : par génération puis par prénom
-        people_list = sorted(people_list, key=lambda p: (p.generation, p.first_name))
-
-    description_parts = []
+    Returns:
+        Dictionnaire id de personne -> [attributs, parents?, enfants?],
+        dans l'ordre d'insertion de `people`.
+    """
+    fragments = {}
     
-    for person in people_list:
+    for person in people.values():
         person_parts = []
+        name = _format_person(person)
         
         # Description des attributs
         if language == "en":
             # Format anglais : combine toutes les parties en une seule phrase
             attr_part = (
-                f"{get_translation('has_hair', language).format(name=f'{person.first_name} ({person.gender})', hair_color=person.hair_color)}, "
+                f"{get_translation('has_hair', language).format(name=name, hair_color=person.hair_color)}, "
                 f"{get_translation('has_eyes', language).format(eye_color=person.eye_color)}, "
                 f"{get_translation('wears_hat', language).format(hat_color=person.hat_color)} and "
                 f"{get_translation('works_as', language).format(profession=person.profession)}."
@@ -40,7 +32,7 @@ def convert_tree_to_text(people: Dict[str, Person], shuffle: bool = False, langu
         else:
             # Format français : utilise les conjonctions françaises
             attr_part = (
-                f"{get_translation('has_hair', language).format(name=f'{person.first_name} ({person.gender})', hair_color=person.hair_color)}, "
+                f"{get_translation('has_hair', language).format(name=name, hair_color=person.hair_color)}, "
                 f"{get_translation('has_eyes', language).format(eye_color=person.eye_color)}, "
                 f"{get_translation('wears_hat', language).format(hat_color=person.hat_color)} et "
                 f"{get_translation('works_as', language).format(profession=person.profession)}."
@@ -49,9 +41,9 @@ def convert_tree_to_text(people: Dict[str, Person], shuffle: bool = False, langu
 
         # Description des parents
         if person.parent_ids:
-            parent_names = sorted([f'{people[pid].first_name} ({people[pid].gender})' for pid in person.parent_ids])
+            parent_names = sorted([_format_person(people[pid]) for pid in person.parent_ids])
             parent_part = get_translation('is_child_of', language).format(
-                name=f'{person.first_name} ({person.gender})',
+                name=name,
                 parent1=parent_names[0],
                 parent2=parent_names[1]
             ) + "."
@@ -59,29 +51,84 @@ def convert_tree_to_text(people: Dict[str, Person], shuffle: bool = False, langu
 
         # Description des enfants
         if person.children_ids:
-            children_names = sorted([f'{people[cid].first_name} ({people[cid].gender})' for cid in person.children_ids])
+            children_names = sorted([_format_person(people[cid]) for cid in person.children_ids])
             num_children = len(children_names)
             if num_children == 1:
                 child_part = get_translation('has_children_singular', language).format(
-                    name=f'{person.first_name} ({person.gender})',
+                    name=name,
                     children=children_names[0]
                 ) + "."
             else:
                 child_part = get_translation('has_children_plural', language).format(
-                    name=f'{person.first_name} ({person.gender})',
+                    name=name,
                     count=num_children,
                     children=', '.join(children_names)
                 ) + "."
             person_parts.append(child_part)
         
-        if shuffle:
-            # Mélanger l'ordre des informations pour chaque personne
-            # Mais toujours garder les attributs en premier
-            if len(person_parts) > 1:
-                other_parts = person_parts[1:]
-                random.shuffle(other_parts)
-                person_parts = [person_parts[0]] + other_parts
-        
-        description_parts.extend(person_parts)
+        fragments[person.id] = person_parts
+    
+    return fragments
+
+def assemble_shuffled_description(fragments: Dict[str, List[str]], rng: random.Random) -> str:
+    """Assemble une description mélangée à partir de fragments déjà rendus.
+    
+    Mélange l'ordre des personnes puis, pour chaque personne, l'ordre des
+    phrases de parenté ; la phrase d'attributs reste toujours en premier.
+    """
+    person_ids = list(fragments)
+    rng.shuffle(person_ids)
+    
+    description_parts = []
+    for person_id in person_ids:
+        person_parts = fragments[person_id]
+        if len(person_parts) > 1:
+            other_parts = person_parts[1:]
+            rng.shuffle(other_parts)
+            description_parts.append(person_parts[0])
+            description_parts.extend(other_parts)
+        else:
+            description_parts.extend(person_parts)
+    
+    return "\n".join(description_parts)
+
+def generate_shuffled_descriptions(people: Dict[str, Person], num_variants: int, language: str = "fr", base_seed: int = 0) -> List[str]:
+    """Génère plusieurs descriptions mélangées du même arbre.
+    
+    Les phrases sont rendues une seule fois ; chaque variante n'est qu'une
+    permutation des fragments, déterminée par la graine `base_seed + i`.
+    """
+    if not people:
+        return [""] * num_variants
+    
+    fragments = render_person_fragments(people, language)
+    return [
+        assemble_shuffled_description(fragments, random.Random(base_seed + i))
+        for i in range(num_variants)
+    ]
+
+def convert_tree_to_text(people: Dict[str, Person], shuffle: bool = False, language: str = "fr", shuffle_seed: Optional[int] = None) -> str:
+    """Convertit le dictionnaire de personnes en une description textuelle.
+    
+    Args:
+        people: Dictionnaire des personnes
+        shuffle: Si True, mélange l'ordre des personnes et des informations
+        shuffle_seed: Graine de la variante mélangée (par défaut, le générateur global `random`)
+    """
+    if not people:
+        return ""
+
+    fragments = render_person_fragments(people, language)
+    
+    if shuffle:
+        rng = random.Random(shuffle_seed) if shuffle_seed is not None else random
+        return assemble_shuffled_description(fragments, rng)
+    
+    # Ordre par défaut : par génération puis par prénom
+    people_list = sorted(people.values(), key=lambda p: (p.generation, p.first_name))
+    
+    description_parts = []
+    for person in people_list:
+        description_parts.extend(fragments[person.id])
 
     return "\n".join(description_parts)
@@ -0,0 +1,177 @@
+"""Sauvegarde et rechargement compacts d'un arbre généalogique.
+
+Format binaire versionné, en colonnes :
+
+    en-tête      : magic `FBTREE`, version (uint16), taille des métadonnées (uint32)
+    métadonnées  : JSON UTF-8 (langue, paramètres de génération, état aléatoire...)
+    chaînes      : taille (uint32) puis chaînes UTF-8 séparées par `\\0`
+    personnes    : nombre de personnes (uint32) puis une colonne uint32 par champ
+                   (codes de chaînes pour id, prénom, sexe, profession, couleurs,
+                   puis génération)
+    relations    : parents puis enfants au format CSR (offsets n+1, indices)
+
+Tous les entiers sont en little-endian. Les personnes sont référencées par
+leur indice, dans l'ordre d'insertion du dictionnaire d'origine (l'ordre
+influence les tirages de questions et doit donc être conservé).
+"""
+
+import json
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from tree_evaluator.models import Person
+
+MAGIC = b"FBTREE"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<6sHI")
+_UINT32 = struct.Struct("<I")
+_STRING_FIELDS = ("id", "first_name", "gender", "profession", "hair_color", "eye_color", "hat_color")
+
+
+def _uint32_array(values) -> array:
+    return array("I", values)
+
+
+def _write_column(chunks: List[bytes], column: array):
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    chunks.append(column.tobytes())
+
+
+def _read_column(data: memoryview, offset: int, count: int) -> Tuple[array, int]:
+    column = _uint32_array([])
+    end = offset + count * column.itemsize
+    column.frombytes(data[offset:end])
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column, end
+
+
+def dumps_tree(people: Dict[str, Person], metadata: Optional[Dict[str, Any]] = None) -> bytes:
+    """Sérialise un arbre (et des métadonnées optionnelles) en bytes."""
+    strings: Dict[str, int] = {}
+
+    def code(value: str) -> int:
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    person_list = list(people.values())
+    index_of = {person.id: i for i, person in enumerate(person_list)}
+
+    string_columns = [
+        _uint32_array(code(getattr(person, field)) for person in person_list)
+        for field in _STRING_FIELDS
+    ]
+    generations = _uint32_array(person.generation for person in person_list)
+
+    relation_columns = []
+    for attribute in ("parent_ids", "children_ids"):
+        offsets = _uint32_array([0])
+        indices = _uint32_array([])
+        for person in person_list:
+            indices.extend(index_of[pid] for pid in getattr(person, attribute))
+            offsets.append(len(indices))
+        relation_columns.extend([offsets, indices])
+
+    metadata_bytes = json.dumps(metadata or {}, ensure_ascii=False).encode("utf-8")
+    string_blob = "\0".join(strings).encode("utf-8")
+
+    chunks = [
+        _HEADER.pack(MAGIC, FORMAT_VERSION, len(metadata_bytes)),
+        metadata_bytes,
+        _UINT32.pack(len(string_blob)),
+        string_blob,
+        _UINT32.pack(len(person_list)),
+    ]
+    for column in string_columns + [generations] + relation_columns:
+        _write_column(chunks, column)
+
+    return b"".join(chunks)
+
+
+def loads_tree(data: bytes) -> Tuple[Dict[str, Person], Dict[str, Any]]:
+    """Reconstruit un arbre et ses métadonnées à partir de bytes."""
+    view = memoryview(data)
+    magic, version, metadata_length = _HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError("Fichier d'arbre invalide (signature inconnue).")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Version de format d'arbre non supportée : {version} (attendue : {FORMAT_VERSION}).")
+
+    offset = _HEADER.size
+    metadata = json.loads(bytes(view[offset:offset + metadata_length]).decode("utf-8"))
+    offset += metadata_length
+
+    (string_length,) = _UINT32.unpack_from(view, offset)
+    offset += _UINT32.size
+    string_blob = bytes(view[offset:offset + string_length]).decode("utf-8")
+    strings = string_blob.split("\0") if string_length else []
+    offset += string_length
+
+    (count,) = _UINT32.unpack_from(view, offset)
+    offset += _UINT32.size
+
+    string_columns = []
+    for _ in _STRING_FIELDS:
+        column, offset = _read_column(view, offset, count)
+        string_columns.append([strings[c] for c in column])
+    generations, offset = _read_column(view, offset, count)
+
+    relations = []
+    for _ in ("parent_ids", "children_ids"):
+        offsets, offset = _read_column(view, offset, count + 1)
+        indices, offset = _read_column(view, offset, offsets[-1] if count else 0)
+        relations.append((offsets, indices))
+
+    ids = string_columns[0]
+    (parent_offsets, parent_indices), (child_offsets, child_indices) = relations
+    people: Dict[str, Person] = {}
+    for i in range(count):
+        people[ids[i]] = Person(
+            id=ids[i],
+            first_name=string_columns[1][i],
+            gender=string_columns[2][i],
+            profession=string_columns[3][i],
+            hair_color=string_columns[4][i],
+            eye_color=string_columns[5][i],
+            hat_color=string_columns[6][i],
+            parent_ids=[ids[j] for j in parent_indices[parent_offsets[i]:parent_offsets[i + 1]]],
+            children_ids=[ids[j] for j in child_indices[child_offsets[i]:child_offsets[i + 1]]],
+            generation=generations[i],
+        )
+
+    return people, metadata
+
+
+def save_tree(people: Dict[str, Person], path: Union[str, Path], metadata: Optional[Dict[str, Any]] = None):
+    """Sauvegarde un arbre dans un fichier binaire compact."""
+    with open(path, "wb") as f:
+        f.write(dumps_tree(people, metadata))
+
+
+def load_tree(path: Union[str, Path]) -> Tuple[Dict[str, Person], Dict[str, Any]]:
+    """Charge un arbre sauvegardé avec `save_tree`.
+
+    Returns:
+        Le dictionnaire des personnes et les métadonnées enregistrées.
+    """
+    with open(path, "rb") as f:
+        return loads_tree(f.read())
+
+
+def random_state_to_json(state: tuple) -> List[Any]:
+    """Convertit `random.getstate()` en valeur sérialisable en JSON."""
+    version, internal_state, gauss_next = state
+    return [version, list(internal_state), gauss_next]
+
+
+def random_state_from_json(value: List[Any]) -> tuple:
+    """Reconstruit un état utilisable par `random.setstate()`."""
+    version, internal_state, gauss_next = value
+    return (version, tuple(internal_state), gauss_next)